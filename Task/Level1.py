@@ -5,6 +5,7 @@ import time
 import random
 import re
 import logging
+import ast
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -14,16 +15,80 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 from webdriver_manager.chrome import ChromeDriverManager
+import sys
+import argparse
+from batch import BatchRunner, read_jobs
+from tracing import tracer, traced
+from page_scripts import (SCROLL_STEP_SCRIPT, PAGE_SIZE_SCRIPT, ELEMENT_OUTLINE_SCRIPT, DOM_SUMMARY_SCRIPT,
+                          VALIDATE_SELECTORS_SCRIPT, POLL_FIELDS_SCRIPT)
+from selector_stats import SelectorStats, SelectorHealth
+from urllib.parse import urlsplit
+from tabs import TabScheduler
+from backends import DEFAULT_BLOCKED_URLS, make_backend
+from sessions import SessionStore
+from model_router import ModelRouter, python_syntax_errors
+from resilience import NAVIGATION_POLICY, WEBDRIVER_POLICY, breakers, call_with_retry
+from rate_limit import positive_rate, rate_limiter as default_rate_limiter
+from artifacts import default_store
+from structured_logging import configure_logging
+from metrics import measured, metrics, start_exporters
+from json_capture import match_fields
+from fields import ADAPTIVE_FIELDS, classify_field
+
+try:
+    import orjson
+
+    def json_loads(text):
+        return orjson.loads(text)
+except ImportError:
+    json_loads = json.loads
+
+# Tool used to get extraction rules back as schema-checked JSON instead of free text
+EXTRACTION_RULES_TOOL = {
+    "name": "record_extraction_rules",
+    "description": "Record one CSS selector or XPath expression per requested field.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "rules": {
+                "type": "object",
+                "description": "Map of field name to a single CSS selector or XPath expression",
+                "additionalProperties": {"type": "string"}
+            }
+        },
+        "required": ["rules"]
+    }
+}
+
+# Bounds for the single in-page pass used by try_adaptive_extraction
+ADAPTIVE_MAX_MATCH_CHARS = 200
+ADAPTIVE_TEXT_LIMIT = 20000
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
 
 class BrowserAutomation:
-    def __init__(self, api_key):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(self, api_key, stats_file="selector_stats.json", health_file="selector_health.json", self_heal=True,
+                 backend="webdriver", session_identity=None, session_store=None, model_router=None,
+                 rate_limiter=None, artifacts=None):
+        # Retries are handled by resilience.LLM_POLICY, so the SDK's own retries are disabled
+        self.client = anthropic.Anthropic(api_key=api_key, max_retries=0)
+        self.model_router = model_router or ModelRouter.shared()
+        self.rate_limiter = rate_limiter or default_rate_limiter
+        self.artifacts = artifacts or default_store()
+        self.current_command = None
+        self.last_scheduled_url = None
         self.browser = None
         self.last_result = None
+        # Shared per file, so batch workers don't overwrite each other's stats when they close
+        self.selector_stats = SelectorStats.shared(stats_file)
+        self.selector_health = SelectorHealth.shared(health_file)
+        self.self_heal = self_heal
+        self.backend_kind = backend
+        self.backend = None
+        self.session_identity = session_identity
+        self.session_store = session_store or (SessionStore() if session_identity else None)
+        self.session_restored = False
         self.setup_browser()
+        metrics.track_browser(self)
 
     def setup_browser(self):
         """Initialize the browser with Selenium"""
@@ -35,14 +100,35 @@ class BrowserAutomation:
             chrome_options.add_argument("--disable-blink-features=AutomationControlled")
             chrome_options.add_argument("--disable-notifications")
             chrome_options.add_argument("--ignore-certificate-errors")
+            if self.backend_kind == "cdp":
+                # Network events for the CDP backend are read from the performance log
+                chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
             service = Service(ChromeDriverManager().install())
             self.browser = webdriver.Chrome(service=service, options=chrome_options)
             self.browser.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.backend = make_backend(self.browser, self.backend_kind)
+            if self.backend.supports_network_events:
+                # Fonts and trackers add load time without adding content
+                self.backend.block_urls(DEFAULT_BLOCKED_URLS)
+            if self.session_identity:
+                self.session_restored = self.session_store.load(self.session_identity, self.browser) > 0
             logging.info("Browser initialized successfully")
         except Exception as e:
             logging.error(f"Error setting up browser: {str(e)}")
             raise
 
+    def save_screenshot(self, name="screenshot"):
+        """Queue a screenshot of the current page in the artifact store; returns its path (None on failure)"""
+        try:
+            png = self.browser.get_screenshot_as_png()
+        except Exception as e:
+            logging.error(f"Error taking screenshot: {str(e)}")
+            return None
+        path = self.artifacts.put(png, "screenshot", "png", command=self.current_command,
+                                  metadata={"name": name, "url": self.browser.current_url})
+        logging.info(f"Queued screenshot '{name}' as artifact {path}")
+        return path
+
     def random_sleep(self, min_seconds=1, max_seconds=3):
         """Sleep for a random amount of time to mimic human behavior"""
         import time
@@ -51,6 +137,7 @@ class BrowserAutomation:
             raise ImportError("time module is not properly imported")
         time.sleep(random.uniform(min_seconds, max_seconds))
 
+    @traced("wait_for_page_load")
     def wait_for_page_load(self, timeout=30):
         """Wait for page to fully load, including dynamic content"""
         try:
@@ -60,10 +147,28 @@ class BrowserAutomation:
             WebDriverWait(self.browser, timeout).until(
                 lambda driver: driver.execute_script("return window.performance.timing.loadEventEnd > 0")
             )
-            self.random_sleep(2, 5)
+            if self.backend.supports_network_events:
+                # Wait for late XHR/fetch activity to settle instead of a fixed sleep
+                self.backend.wait_network_idle(timeout=min(timeout, 10))
+            else:
+                self.random_sleep(2, 5)
         except Exception as e:
             logging.warning(f"Wait for page load issue: {str(e)}")
 
+    def navigate(self, url):
+        """Load url once its domain's rate limit allows, with retries, failing fast while the site's circuit breaker is open"""
+        host = urlsplit(url).netloc
+        with tracer.span("rate_limit", host=host) as span:
+            waited = self.rate_limiter.acquire(url)
+            span.set("waited", waited)
+        metrics.observe("rate_limit_wait_seconds", waited or 0.0)
+        self.last_scheduled_url = url
+        start = time.perf_counter()
+        call_with_retry(lambda: self.browser.get(url), NAVIGATION_POLICY, breakers.get(f"domain:{host}"),
+                        f"navigation to {url}")
+        metrics.observe("page_load_seconds", time.perf_counter() - start)
+
+    @traced("handle_popups")
     def handle_popups(self):
         """Handle popups/overlays across various websites"""
         try:
@@ -76,166 +181,489 @@ class BrowserAutomation:
                 "div._2QfC02 button"  # Flipkart login popup
             ]
             for selector in popup_selectors:
-                try:
-                    if selector.startswith('//'):
-                        elements = self.browser.find_elements(By.XPATH, selector)
-                    else:
-                        elements = self.browser.find_elements(By.CSS_SELECTOR, selector)
+                by = By.XPATH if selector.startswith('//') else By.CSS_SELECTOR
+
+                def close_popup():
+                    # Re-find on every attempt so a stale element is replaced
+                    elements = self.browser.find_elements(by, selector)
                     if elements:
                         elements[0].click()
+                    return bool(elements)
+
+                try:
+                    if call_with_retry(close_popup, WEBDRIVER_POLICY, description=f"popup click '{selector}'"):
                         logging.info(f"Closed popup using selector: {selector}")
                         self.random_sleep(1, 2)
-                except Exception:
-                    continue
+                except Exception as e:
+                    logging.debug("Popup selector '%s' not clickable: %s", selector, type(e).__name__,
+                                  extra={"sample": "popup"})
         except Exception as e:
             logging.warning(f"Error handling popups: {str(e)}")
 
-    def scroll_page(self, scroll_pause_time=2):
-        """Scroll page to load lazy-loaded content"""
+    @traced("scroll_page")
+    def scroll_page(self, scroll_pause_time=2, item_selector=None, target_items=None, time_budget=30,
+                    max_steps=50, quiet_period=0.5, stable_rounds=2):
+        """Scroll until lazy-loaded content stops growing, a target item count is reached or time runs out"""
+        report = {"steps": 0, "items": 0, "items_loaded": 0, "height": 0, "reason": "error"}
         try:
-            last_height = self.browser.execute_script("return document.body.scrollHeight")
-            self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            self.random_sleep(scroll_pause_time, scroll_pause_time + 2)
+            start = time.time()
+            initial = self.backend.call_script(PAGE_SIZE_SCRIPT, item_selector)
+            last_height, last_items = initial["height"], initial["items"]
+            report.update(height=last_height, items=last_items)
+            self.browser.set_script_timeout(scroll_pause_time + 5)
+            unchanged = 0
+
+            while report["steps"] < max_steps:
+                if target_items and last_items >= target_items:
+                    report["reason"] = "target_items"
+                    break
+                remaining = time_budget - (time.time() - start)
+                if remaining <= 0:
+                    report["reason"] = "time_budget"
+                    break
+
+                # Each step scrolls and waits in-page for network idle + DOM quiet, capped by scroll_pause_time
+                max_wait = min(scroll_pause_time, remaining)
+                state = self.backend.call_async_script(
+                    SCROLL_STEP_SCRIPT, int(max_wait * 1000), int(quiet_period * 1000), item_selector
+                )
+                report["steps"] += 1
+
+                if state["height"] <= last_height and state["items"] <= last_items and state["pending"] <= 0:
+                    unchanged += 1
+                    if unchanged >= stable_rounds:
+                        report["reason"] = "converged"
+                        break
+                else:
+                    unchanged = 0
+                last_height, last_items = state["height"], state["items"]
+            else:
+                report["reason"] = "max_steps"
+
+            report.update(height=last_height, items=last_items, items_loaded=last_items - initial["items"])
+            logging.info(f"Scrolled {report['steps']} steps, loaded {report['items_loaded']} items "
+                         f"({report['items']} total, stopped: {report['reason']})")
         except Exception as e:
             logging.warning(f"Error during page scrolling: {str(e)}")
 
-    def extract_data(self, url, extraction_rules):
-        """Extract structured data from any webpage, supporting multiple selectors"""
-        logging.info(f"Navigating to {url}")
+        span = tracer.current_span()
+        if span is not None:
+            span.attributes.update({f"scroll.{key}": value for key, value in report.items()})
+        return report
+
+    @traced("extract_data")
+    @measured("extract_data")
+    def extract_data(self, url, extraction_rules, navigate=True, capture_json=False, field_timeout=10, deadline=30,
+                     poll_interval=0.25):
+        """Extract structured data from any webpage, supporting multiple selectors.
+
+        All fields are polled together: each gets field_timeout seconds and the whole extraction
+        deadline seconds (counted once the page is ready), after which partial results are returned.
+        Per-field outcomes are reported under "field_status".
+        """
         try:
-            self.browser.get(url)
-            self.wait_for_page_load()
+            capture_json = capture_json and navigate and self.backend.supports_network_events
+            if capture_json:
+                self.backend.start_capture()
+            if navigate:
+                logging.info(f"Navigating to {url}")
+                with tracer.span("navigate", url=url):
+                    self.navigate(url)
+                self.wait_for_page_load()
             self.handle_popups()
             self.scroll_page()
-            wait = WebDriverWait(self.browser, 20)
-            extracted_data = {}
+            domain = urlsplit(url).netloc
+
+            # Take fields straight from the page's JSON API responses when they contain them
+            json_matches = {}
+            if capture_json:
+                with tracer.span("match_json_responses") as span:
+                    json_matches = match_fields(self.backend.captured_json(), list(extraction_rules),
+                                                page_url=self.browser.current_url)
+                    span.set("matched_fields", len(json_matches))
+                if logging.root.isEnabledFor(logging.DEBUG):
+                    for field_name, match in json_matches.items():
+                        logging.debug("Found '%s' in JSON response %s at %s", field_name, match["source"],
+                                      match["path"])
+
+            # Regenerate rules for fields whose selectors have been failing before spending timeouts on them
+            unhealthy = [f for f in extraction_rules if f not in json_matches
+                         and self.selector_health.needs_healing(domain, f, time.time())]
+            if unhealthy and self.self_heal:
+                self.heal_rules(url, unhealthy)
+            extraction_rules = self.selector_health.apply_promoted(domain, extraction_rules)
+
+            extracted_data = {field_name: str(match["value"]) for field_name, match in json_matches.items()}
+            field_status = {field_name: {"status": "json"} for field_name in json_matches}
+            outstanding = {}
             for field_name, selectors in extraction_rules.items():
-                logging.info(f"Extracting '{field_name}'")
+                if field_name in json_matches:
+                    continue
                 if isinstance(selectors, str):
-                    selector_list = [selectors]
-                elif isinstance(selectors, list):
-                    selector_list = selectors
+                    outstanding[field_name] = [selectors]
+                elif isinstance(selectors, list) and all(isinstance(s, str) for s in selectors):
+                    outstanding[field_name] = selectors
                 else:
                     extracted_data[field_name] = f"Invalid selector format for {field_name}"
+                    field_status[field_name] = {"status": "invalid"}
                     logging.error(f"Invalid selector format for {field_name}")
+
+            request_deadline = time.monotonic() + deadline
+            field_status.update(self._poll_fields(outstanding, extracted_data, field_timeout, request_deadline,
+                                                  poll_interval))
+
+            for field_name in outstanding:
+                status = field_status[field_name]["status"]
+                if status != "deadline":
+                    self.selector_health.record(domain, field_name, status == "ok")
+                if status == "ok":
                     continue
-                for selector in selector_list:
-                    logging.info(f"Trying selector '{selector}' for '{field_name}'")
-                    try:
-                        for attempt in range(3):
-                            try:
-                                if selector.startswith('/'):
-                                    element = wait.until(
-                                        EC.visibility_of_element_located((By.XPATH, selector))
-                                    )
-                                else:
-                                    element = wait.until(
-                                        EC.visibility_of_element_located((By.CSS_SELECTOR, selector))
-                                    )
-                                extracted_data[field_name] = element.text.strip()
-                                logging.info(f"Successfully extracted '{field_name}': {extracted_data[field_name]}")
-                                break
-                            except (StaleElementReferenceException, TimeoutException) as e:
-                                if attempt < 2:
-                                    logging.info(f"Retry attempt {attempt + 1} for '{field_name}' with '{selector}'")
-                                    self.random_sleep(1, 2)
-                                else:
-                                    raise e
-                        if field_name in extracted_data:
-                            break
-                    except Exception as e:
-                        logging.warning(f"Selector '{selector}' failed for '{field_name}': {str(e)}")
-                if field_name not in extracted_data:
+                if time.monotonic() < request_deadline:
                     extracted_data[field_name] = self.try_adaptive_extraction(field_name)
-                    if extracted_data[field_name]:
-                        logging.info(f"Adaptive extraction succeeded for '{field_name}': {extracted_data[field_name]}")
-                    else:
-                        extracted_data[field_name] = f"Could not extract {field_name}"
-                        logging.warning(f"Failed to extract '{field_name}' after all attempts")
-            if all("Could not extract" in str(v) for v in extracted_data.values()):
-                extracted_data["page_source_sample"] = self.browser.page_source[:1000] + "..."
+                if extracted_data.get(field_name):
+                    field_status[field_name]["status"] = "adaptive"
+                    logging.debug("Adaptive extraction succeeded for '%s': %.200s", field_name,
+                                  extracted_data[field_name])
+                else:
+                    extracted_data[field_name] = f"Could not extract {field_name}"
+                    logging.warning(f"Failed to extract '{field_name}' ({status})")
+
+            # Heal fields that just crossed the failure threshold, replacing this run's values if verified
+            failing = [f for f in extraction_rules if f not in json_matches
+                       and self.selector_health.needs_healing(domain, f, time.time())]
+            if failing and self.self_heal and time.monotonic() < request_deadline:
+                for field_name, (selector, text) in self.heal_rules(url, failing).items():
+                    extracted_data[field_name] = text
+                    field_status[field_name] = {"status": "healed", "selector": selector}
+
+            if json_matches:
+                extracted_data["json_sources"] = {
+                    field_name: f"{match['source']}#{match['path']}" for field_name, match in json_matches.items()
+                }
+
+            extracted_data["field_status"] = field_status
+            for status in field_status.values():
+                metrics.inc("selector_results_total", status=status["status"])
+
+            failed_fields = [f for f, v in extracted_data.items() if "Could not extract" in str(v)]
+            # One line per page at INFO; per-field outcomes are logged at DEBUG
+            logging.info("Extracted %d/%d fields from %s", len(field_status) - len(failed_fields), len(field_status),
+                         domain)
+            if failed_fields:
+                extracted_data["diagnostics"] = {
+                    "url": self.browser.current_url,
+                    "title": self.browser.title,
+                    "failed_fields": failed_fields,
+                    "hit_rates": {f: self.selector_health.success_rate(domain, f) for f in failed_fields},
+                    "page_outline": self.get_page_outline(max_elements=40).splitlines()
+                }
             return extracted_data
         except Exception as e:
             logging.error(f"Failed to load page or extract data: {str(e)}")
             return {"error": f"Failed to extract data: {str(e)}"}
 
+    def _poll_fields(self, outstanding, extracted_data, field_timeout, request_deadline, poll_interval):
+        """Poll every outstanding field in one in-page pass per round until each resolves or runs out of time.
+
+        Fills extracted_data for found fields and returns {field: {"status", ...}} where status is
+        "ok", "invalid_selector", "timeout" (field budget spent) or "deadline" (request budget spent).
+        """
+        started = time.monotonic()
+        pending = dict(outstanding)
+        status = {}
+        rounds = 0
+        with tracer.span("poll_fields", fields=len(pending)) as span:
+            while pending:
+                rounds += 1
+                try:
+                    found = call_with_retry(
+                        lambda: self.backend.call_script(POLL_FIELDS_SCRIPT, [[f, s] for f, s in pending.items()]),
+                        WEBDRIVER_POLICY, description="field poll"
+                    )
+                except Exception as e:
+                    logging.warning(f"Field poll failed: {str(e)}")
+                    found = {}
+                now = time.monotonic()
+                elapsed = round(now - started, 3)
+                debug = logging.root.isEnabledFor(logging.DEBUG)
+                for field_name, result in (found or {}).items():
+                    if field_name not in pending or not result:
+                        continue
+                    if "errors" in result:
+                        status[field_name] = {"status": "invalid_selector", "selectors": result["errors"],
+                                              "elapsed": elapsed}
+                        logging.warning(f"No valid selector for '{field_name}': {result['errors']}")
+                    else:
+                        extracted_data[field_name] = result["text"]
+                        status[field_name] = {"status": "ok", "selector": result["selector"], "elapsed": elapsed}
+                        if debug:
+                            logging.debug("Successfully extracted '%s': %.200s", field_name, result["text"])
+                    del pending[field_name]
+
+                for field_name in list(pending):
+                    if now >= request_deadline:
+                        status[field_name] = {"status": "deadline", "elapsed": elapsed}
+                    elif now - started >= field_timeout:
+                        status[field_name] = {"status": "timeout", "elapsed": elapsed}
+                        logging.warning(f"No visible match for '{field_name}' within {field_timeout}s")
+                    else:
+                        continue
+                    del pending[field_name]
+
+                if pending:
+                    time.sleep(max(0.0, min(poll_interval, request_deadline - time.monotonic())))
+            span.set("rounds", rounds)
+        return status
+
+    @traced("extract_data_in_tabs")
+    def extract_data_in_tabs(self, urls, extraction_rules, max_tabs=4, load_timeout=30):
+        """Extract the same fields from many URLs, overlapping page loads across tabs of this browser"""
+        scheduler = TabScheduler(self.browser, max_tabs=max_tabs, load_timeout=load_timeout,
+                                 rate_limiter=self.rate_limiter)
+        results = scheduler.run(
+            urls, lambda url: self.extract_data(url, extraction_rules, navigate=False)
+        )
+        return {
+            entry["url"]: entry["result"] if entry["error"] is None else {"error": entry["error"]}
+            for entry in results
+        }
+
+    @traced("try_adaptive_extraction")
     def try_adaptive_extraction(self, field_name):
-        """Adaptive extraction for any page based on field name"""
+        """Adaptive extraction for any page based on field name, trying this domain's past winners first"""
         try:
-            field_lower = field_name.lower()
-            if "rating" in field_lower or "stars" in field_lower:
-                selectors = [
-                    ".rating", "div[class*='rating']", "span[class*='stars']",
-                    ".stars", "div[class*='stars']", "span[class*='rating']",
-                    ".average-rating", "span[class*='average']",
-                    "//span[contains(text(), 'out of')]", "//div[contains(text(), '/5')]",
-                    "div._3LWZlK", "span.rating-value",
-                    ".a-icon-star", ".review-rating"
-                ]
-                for selector in selectors:
-                    try:
-                        if selector.startswith('//'):
-                            elements = self.browser.find_elements(By.XPATH, selector)
-                        else:
-                            elements = self.browser.find_elements(By.CSS_SELECTOR, selector)
-                        if elements:
-                            text = elements[0].text.strip()
-                            if text and re.search(r'\d+(\.\d+)?', text):
-                                return text
-                    except Exception:
-                        continue
-                page_text = self.browser.find_element(By.TAG_NAME, "body").text
-                rating_patterns = [
-                    r'(\d+\.\d+|\d+) out of 5', r'(\d+\.\d+|\d+)/5',
-                    r'(\d+\.\d+|\d+) stars', r'Rating: (\d+\.\d+|\d+)'
-                ]
-                for pattern in rating_patterns:
-                    match = re.search(pattern, page_text)
-                    if match:
-                        return match.group(1)
+            field_type = classify_field(field_name)
+            if not field_type:
+                return None
+            profile = ADAPTIVE_FIELDS[field_type]
+            domain = urlsplit(self.browser.current_url).netloc
+
+            # Evaluate every candidate selector in a single in-page pass
+            selectors = self.selector_stats.ranked(domain, field_type, profile["selectors"])
+            result = self.backend.evaluate_candidates(selectors, ADAPTIVE_MAX_MATCH_CHARS, ADAPTIVE_TEXT_LIMIT)
+            for selector, text in zip(selectors, result["matches"]):
+                if text and profile["validate"].search(text):
+                    self.selector_stats.record_win(domain, field_type, selector)
+                    logging.debug("Adaptive selector '%s' matched '%s' on %s", selector, field_name, domain,
+                                  extra={"sample": "selector"})
+                    return text
+
+            # Fall back to patterns over the bounded main-content text
+            patterns = self.selector_stats.ranked(domain, field_type, list(profile["patterns"]), kind="pattern")
+            for pattern in patterns:
+                compiled = profile["patterns"].get(pattern) or re.compile(pattern, re.IGNORECASE)
+                match = compiled.search(result["text"])
+                if match:
+                    self.selector_stats.record_win(domain, field_type, pattern, kind="pattern")
+                    return match.group(1) if compiled.groups else match.group(0)
             return None
         except Exception as e:
             logging.error(f"Error in adaptive extraction for {field_name}: {str(e)}")
             return None
 
-    def get_extraction_rules_from_claude(self, url, user_request):
+    def get_page_outline(self, max_elements=150, max_text=60):
+        """Return a compact "tag#id.class: text" outline of the current page"""
+        try:
+            lines = self.backend.call_script(ELEMENT_OUTLINE_SCRIPT, max_elements, max_text)
+            return "\n".join(lines)
+        except Exception as e:
+            logging.warning(f"Could not build page outline: {str(e)}")
+            return ""
+
+    @traced("get_dom_summary")
+    def get_dom_summary(self, max_tokens=1500, max_text=40):
+        """Condense the current page into a token-budgeted DOM skeleton for rule and code generation"""
+        try:
+            # Roughly four characters per token for markup-like text
+            result = self.backend.call_script(DOM_SUMMARY_SCRIPT, max_tokens * 4, max_text)
+            span = tracer.current_span()
+            if span is not None:
+                span.set("summary_chars", len(result["summary"]))
+            return result["summary"]
+        except Exception as e:
+            logging.warning(f"Could not build DOM summary: {str(e)}")
+            return ""
+
+    @traced("heal_rules")
+    def heal_rules(self, url, fields):
+        """Regenerate rules for failing fields and promote the ones that verify on the current page"""
+        domain = urlsplit(url).netloc
+        now = time.time()
+        for field_name in fields:
+            self.selector_health.mark_heal_attempt(domain, field_name, now)
+
+        logging.info(f"Regenerating rules for failing fields on {domain}: {', '.join(fields)}")
+        new_rules = self.get_extraction_rules_from_claude(
+            url, ", ".join(fields), navigate=False, dom_summary=self.get_dom_summary()
+        )
+        candidates = {f: s for f, s in new_rules.items() if f in fields and isinstance(s, str)}
+        if not candidates:
+            logging.warning(f"No usable regenerated rules for {', '.join(fields)}")
+            return {}
+
+        # Verify all regenerated selectors in one pass before promoting any of them
+        result = self.backend.evaluate_candidates(list(candidates.values()), ADAPTIVE_MAX_MATCH_CHARS, 0)
+        healed = {}
+        for (field_name, selector), text in zip(candidates.items(), result["matches"]):
+            field_type = classify_field(field_name)
+            if text and (not field_type or ADAPTIVE_FIELDS[field_type]["validate"].search(text)):
+                self.selector_health.promote(domain, field_name, selector)
+                healed[field_name] = (selector, text)
+            else:
+                logging.warning(f"Regenerated selector '{selector}' for '{field_name}' did not verify")
+        return healed
+
+    @traced("get_extraction_rules_from_claude")
+    def get_extraction_rules_from_claude(self, url, user_request, navigate=True, dom_summary=None, max_repairs=1):
         """Generate extraction rules using Claude with single-string selectors"""
         try:
-            self.browser.get(url)
-            self.wait_for_page_load()
+            if navigate:
+                self.navigate(url)
+                self.wait_for_page_load()
             page_title = self.browser.title
+            if dom_summary is None:
+                dom_summary = self.get_dom_summary()
+            summary_section = ""
+            if dom_summary:
+                summary_section = (
+                    "Use exactly the requested field names as keys. Choose selectors that exist in this condensed "
+                    "DOM skeleton of the live page (tag#id.class paths with text samples; '>' joins single-child "
+                    f"wrappers, repeated siblings are shown once):\n{dom_summary}"
+                )
             prompt = f"""
-            Given the URL '{url}' with page title '{page_title}' and the user request '{user_request}', generate a Python dictionary of extraction rules for Selenium to extract structured data from the webpage. The dictionary should map field names (as strings) to a SINGLE CSS selector or XPath expression (as a string) that targets the requested data. Do NOT return lists of selectors—provide only one selector per field.
+            Given the URL '{url}' with page title '{page_title}' and the user request '{user_request}', generate extraction rules for Selenium to extract structured data from the webpage. The rules should map field names (as strings) to a SINGLE CSS selector or XPath expression (as a string) that targets the requested data. Do NOT return lists of selectors—provide only one selector per field.
             Use these common selector patterns:
             - Ratings: '.rating', 'div[class*=\"rating\"]', 'span[class*=\"stars\"]', '.average-rating', '//span[contains(text(), \"out of 5\")]'
             - Review counts: '.reviews', 'span[class*=\"review\"]', '.review-count', '//span[contains(text(), \"reviews\")]'
             - Product names: 'h1', '.product-name', '.product-title'
             - Prices: '.price', 'span.price', 'div[class*=\"price\"]'
-            Return ONLY the raw Python dictionary as plain text, with proper syntax.
+            {summary_section}
+            Return the rules by calling the {EXTRACTION_RULES_TOOL["name"]} tool.
             """
-            message = self.client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=500,
-                temperature=0,
-                system="You are an expert in web scraping and Selenium.",
-                messages=[{"role": "user", "content": prompt}]
-            )
-            return eval(message.content[0].text)
+            messages = [{"role": "user", "content": prompt}]
+            model = self.model_router.choose("rules", len(prompt))
+            for attempt in range(max_repairs + 1):
+                parsed = {}
+
+                def validate(message):
+                    parsed["rules"], parsed["tool_use_id"], errors = self._parse_extraction_rules(message)
+                    return errors or self._validate_selectors(parsed["rules"])
+
+                message, model, errors = self.model_router.call(self.client, "rules", {
+                    "model": model,
+                    "max_tokens": 500,
+                    "temperature": 0,
+                    "system": "You are an expert in web scraping and Selenium.",
+                    "tools": [EXTRACTION_RULES_TOOL],
+                    "tool_choice": {"type": "tool", "name": EXTRACTION_RULES_TOOL["name"]},
+                    "messages": messages
+                }, validate=validate, input_chars=len(prompt), max_escalations=0)
+                rules, tool_use_id = parsed["rules"], parsed["tool_use_id"]
+                if not errors:
+                    return rules
+
+                logging.warning(f"Invalid extraction rules from Claude (attempt {attempt + 1}): {'; '.join(errors)}")
+                # Ask for a corrected answer, showing the model exactly what was wrong
+                feedback = "The rules were invalid:\n" + "\n".join(f"- {error}" for error in errors) + \
+                           "\nCall the tool again with corrected rules."
+                messages.append({"role": "assistant", "content": message.content})
+                if tool_use_id:
+                    messages.append({"role": "user", "content": [
+                        {"type": "tool_result", "tool_use_id": tool_use_id, "content": feedback, "is_error": True}
+                    ]})
+                else:
+                    messages.append({"role": "user", "content": feedback})
+                # The repair turn goes to a stronger model, if there is one
+                model = self.model_router.escalate(model) or model
+
+            logging.error("Claude did not return valid extraction rules")
+            return {}
         except Exception as e:
             logging.error(f"Error generating rules from Claude: {str(e)}")
-            return {"rating": "div[class*='rating']"}
+            return {}
+
+    def _parse_extraction_rules(self, message):
+        """Pull the rules dict out of a tool_use block (or JSON text); returns (rules, tool_use_id, errors)"""
+        rules = None
+        tool_use_id = None
+        for block in message.content:
+            if getattr(block, "type", None) == "tool_use":
+                tool_use_id = block.id
+                rules = block.input.get("rules") if isinstance(block.input, dict) else None
+                break
+            if getattr(block, "type", None) == "text" and rules is None:
+                text = block.text.strip()
+                text = re.sub(r"^```(?:json|python)?\s*|\s*```$", "", text)
+                try:
+                    parsed = json_loads(text)
+                except ValueError:
+                    try:
+                        parsed = ast.literal_eval(text)
+                    except (ValueError, SyntaxError):
+                        return None, None, ["Response was not valid JSON"]
+                rules = parsed.get("rules", parsed) if isinstance(parsed, dict) else parsed
+
+        if not isinstance(rules, dict) or not rules:
+            return None, tool_use_id, ["'rules' must be a non-empty object mapping field names to selectors"]
+        errors = [
+            f"Field '{field}' must map to a single non-empty selector string"
+            for field, selector in rules.items()
+            if not isinstance(selector, str) or not selector.strip()
+        ]
+        return {field: selector.strip() for field, selector in rules.items() if isinstance(selector, str)}, \
+            tool_use_id, errors
+
+    def _validate_selectors(self, rules):
+        """Check selector syntax in the browser before any timeouts are spent on them"""
+        selectors = list(rules.values())
+        try:
+            results = self.backend.call_script(VALIDATE_SELECTORS_SCRIPT, selectors)
+        except Exception as e:
+            logging.warning(f"Could not pre-check selectors: {str(e)}")
+            return []
+        errors = []
+        for (field, selector), result in zip(rules.items(), results):
+            if not result["valid"]:
+                errors.append(f"Field '{field}': selector '{selector}' is not valid syntax ({result.get('error')})")
+            elif result["count"] == 0:
+                logging.debug("Selector '%s' for '%s' currently matches no elements", selector, field,
+                              extra={"sample": "selector"})
+        return errors
 
+    @traced("get_code_from_claude")
     def get_code_from_claude(self, user_command):
         """Send the user command to Claude API and get back Python code"""
         try:
+            page_section = ""
+            if self.browser and self.browser.current_url not in ("about:blank", "data:,"):
+                dom_summary = self.get_dom_summary(max_tokens=1000)
+                if dom_summary:
+                    page_section = (
+                        f"The browser is currently on {self.browser.current_url}. Condensed DOM skeleton of that page "
+                        f"(tag#id.class paths with text samples), use it to pick selectors:\n{dom_summary}"
+                    )
+
+            session_section = ""
+            if self.session_restored:
+                session_section = (
+                    f"A saved login session for '{self.session_identity}' was restored into the browser. Before "
+                    "logging in, navigate and check whether the user is already authenticated (e.g. `img.avatar-user` "
+                    "on GitHub) and skip the login steps if so."
+                )
+
             prompt = f"""
             Generate Python code for browser automation using Selenium based on this user command: "{user_command}"
 
+            {page_section}
+
+            {session_section}
+
             Only return valid, working Python code that assumes these variables are available:
             - 'browser': A selenium webdriver instance that's already initialized
             - 'random_sleep': A method for random delays (e.g., random_sleep(1, 3))
             - 'wait_for_page_load': A method to wait for page load completion
             - 'handle_popups': A method to close popups/overlays
+            - 'save_screenshot': A method that records a screenshot of the current page (e.g., save_screenshot('login_timeout'))
 
             Use the latest Selenium 4+ syntax:
             - Import `from selenium.webdriver.common.by import By` and use `browser.find_element(By.ID, 'value')`.
@@ -255,7 +683,7 @@ class BrowserAutomation:
             For robust automation:
             - Setup logging with `logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')`.
             - Log every step (e.g., navigation, element interaction, errors).
-            - Save screenshots on errors with `browser.save_screenshot(f'error_{{error_type}}_{{int(time.time())}}.png')`.
+            - Save screenshots on errors with `save_screenshot(f'error_{{error_type}}')`; never write files with `browser.save_screenshot`.
             - Use `WebDriverWait` for all element interactions with at least 10-second timeouts.
             - Verify actions (e.g., after login, check for `img.avatar-user`; after starring, check `button[aria-label*='Unstar']`).
             - Call `wait_for_page_load` and `handle_popups` after navigation or major actions.
@@ -273,18 +701,20 @@ class BrowserAutomation:
 
             Return ONLY the raw Python code as plain text. Do NOT include Markdown code block markers, comments, explanations, function definitions, or any other formatting—just the executable code.
             """
-            message = self.client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=1500,
-                temperature=0,
-                system="You are an expert in Selenium automation.",
-                messages=[{"role": "user", "content": prompt}]
-            )
+            message, model, errors = self.model_router.call(self.client, "code", {
+                "max_tokens": 1500,
+                "temperature": 0,
+                "system": "You are an expert in Selenium automation.",
+                "messages": [{"role": "user", "content": prompt}]
+            }, validate=python_syntax_errors, input_chars=len(prompt))
+            if errors:
+                logging.warning(f"Generated code still invalid after escalation: {'; '.join(errors)}")
             return message.content[0].text
         except Exception as e:
             logging.error(f"Error getting code from Claude: {str(e)}")
             return None
 
+    @traced("execute_code")
     def execute_code(self, code):
         """Execute the generated Python code"""
         if not code:
@@ -295,9 +725,10 @@ class BrowserAutomation:
                 "browser": self.browser,
                 "random_sleep": self.random_sleep,
                 "wait_for_page_load": self.wait_for_page_load,
-                "handle_popups": self.handle_popups
+                "handle_popups": self.handle_popups,
+                "save_screenshot": self.save_screenshot
             }
-            required_vars = ["browser", "random_sleep", "wait_for_page_load", "handle_popups"]
+            required_vars = ["browser", "random_sleep", "wait_for_page_load", "handle_popups", "save_screenshot"]
             for var in required_vars:
                 if not local_vars.get(var):
                     logging.error(f"Required variable '{var}' is not initialized")
@@ -315,28 +746,41 @@ class BrowserAutomation:
             logging.error(f"Error executing code: {str(e)}")
             return f"Error executing code: {str(e)}"
 
+    @traced("run_command")
+    @measured("run_command")
     def run_command(self, user_command):
         """Process user command through Claude and execute the resulting code"""
         logging.info(f"Processing command: {user_command}")
         code = self.get_code_from_claude(user_command)
         if code:
-            logging.info("Generated code:")
-            logging.info("-" * 18)
-            logging.info(code)
-            logging.info("-" * 18)
-            code_filename = f"generated_code_{int(time.time())}.py"
-            with open(code_filename, "w") as f:
-                f.write(code)
-            logging.info(f"Saved generated code to {code_filename}")
-            result = self.execute_code(code)
+            logging.info("Generated %d lines of code", code.count("\n") + 1)
+            logging.debug("Generated code:\n%s", code)
+            code_path = self.artifacts.put(code, "generated_code", "py", command=user_command)
+            logging.info(f"Queued generated code as artifact {code_path}")
+            self.current_command = user_command
+            try:
+                result = self.execute_code(code)
+            finally:
+                self.current_command = None
             logging.info(f"Execution result: {result}")
             return result
         else:
             logging.error("Failed to generate code")
             return "Failed to generate code"
 
+    def save_session(self):
+        """Persist the browser's cookies under the current session identity"""
+        if not self.session_identity or not self.browser:
+            return False
+        return self.session_store.save(self.session_identity, self.browser)
+
     def close(self):
         """Close the browser"""
+        self.save_session()
+        self.selector_stats.save()
+        self.selector_health.save()
+        self.model_router.save()
+        self.artifacts.flush()
         if self.browser:
             try:
                 self.browser.quit()
@@ -345,7 +789,64 @@ class BrowserAutomation:
                 logging.error(f"Error closing browser: {str(e)}")
             self.browser = None
 
+def _batch_extract(automation, job):
+    rules = job.get("rules")
+    if not rules:
+        rules = automation.get_extraction_rules_from_claude(job["url"], job["request"])
+    return {"rules": rules, "data": automation.extract_data(job["url"], rules, capture_json=job.get("capture_json", False))}
+
+
+def _batch_command(automation, job):
+    return automation.run_command(job["command"])
+
+
+BATCH_HANDLERS = {
+    "extract": _batch_extract,
+    "command": _batch_command
+}
+
+
+def batch_main(argv):
+    """Run a JSONL file of extract/command jobs non-interactively"""
+    parser = argparse.ArgumentParser(description="Run browser automation jobs from a JSONL file")
+    parser.add_argument("jobs", help="JSONL job file, or '-' for stdin")
+    parser.add_argument("--api-key", default="", help="Claude API key")
+    parser.add_argument("--output", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="Number of parallel browser instances")
+    parser.add_argument("--trace-file", default=None, help="Write OpenTelemetry JSON traces to this file")
+    parser.add_argument("--backend", default="webdriver", choices=["webdriver", "cdp"],
+                        help="Browser control backend")
+    parser.add_argument("--session", default=None, help="Site identity whose saved cookies to load and update")
+    parser.add_argument("--rate", type=positive_rate, default=1.0, help="Page loads per second allowed per domain")
+    parser.add_argument("--ignore-robots", action="store_true", help="Do not apply robots.txt crawl-delay")
+    parser.add_argument("--log-level", default=None, help="Log level (defaults to LOG_LEVEL or INFO)")
+    parser.add_argument("--log-json", action="store_true", help="Write logs as JSON lines")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--metrics-file", default=None, help="Write a JSON metrics snapshot to this file every minute")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level, args.log_json or None)
+    start_exporters(args.metrics_port, args.metrics_file)
+    default_rate_limiter.configure(args.rate, not args.ignore_robots)
+
+    runner = BatchRunner(
+        lambda: BrowserAutomation(args.api_key, backend=args.backend, session_identity=args.session),
+        BATCH_HANDLERS,
+        workers=args.workers,
+        output=args.output
+    )
+    summary = runner.run(read_jobs(args.jobs))
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    if args.trace_file:
+        tracer.export_otlp(args.trace_file)
+    return summary
+
+
 def main():
+    if len(sys.argv) > 1:
+        return batch_main(sys.argv[1:])
+
+    configure_logging()
+    start_exporters()
     api_key = ""
     automation = BrowserAutomation(api_key)
     try:
@@ -365,6 +866,8 @@ def main():
                 automation.last_result = result
                 print("\nExtracted data:")
                 print(json.dumps(result, indent=2))
+                print("\nTiming:")
+                print(tracer.flame_summary())
             elif choice == "2":
                 user_command = input("Enter browser automation command: ")
                 result = automation.run_command(user_command)
@@ -18,9 +18,7 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException,
 from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 import os
-
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+from structured_logging import configure_logging
 
 
 class BrowserAutomationWithScraper:
@@ -410,6 +408,7 @@ MY QUESTION:
 
 
 def main():
+    configure_logging()
     print("=" * 60)
     print("Claude-Powered Web Automation & Scraper".center(60))
     print("=" * 60)
@@ -18,15 +18,126 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException,
 from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 import os
+import sys
+import argparse
 from crontab import CronTab
 import datetime
+from urllib.parse import urlsplit
+from crawler import Crawler
+from tabs import TabScheduler
+from backends import DEFAULT_BLOCKED_URLS, make_backend
+from sessions import SessionStore
+from streaming import iter_content_events, iter_page_chunks
+from intent import IntentRouter, INTENTS
+from llm_batch import run_message_batch
+from model_router import ModelRouter, python_syntax_errors
+from resilience import NAVIGATION_POLICY, WEBDRIVER_POLICY, breakers, call_with_retry
+from rate_limit import positive_rate, rate_limiter as default_rate_limiter
+from artifacts import default_store
+from structured_logging import configure_logging
+from metrics import measured, metrics, start_exporters
+from compaction import BoilerplateTracker, compact_content, estimate_tokens, fit_to_budget
+from batch import BatchRunner, read_jobs
+from tracing import tracer, traced
+from page_scripts import SCROLL_STEP_SCRIPT, PAGE_SIZE_SCRIPT, DOM_SUMMARY_SCRIPT
+
+# Static code generation instructions, sent as the system prompt (cached when long enough for the model)
+CODEGEN_INSTRUCTIONS = """You are an expert in Selenium automation.
+
+Only return valid, working Python code that assumes these variables are available:
+- 'browser': A selenium webdriver instance that's already initialized
+- 'random_sleep': A method for random delays (e.g., random_sleep(1, 3))
+- 'wait_for_page_load': A method to wait for page load completion
+- 'handle_popups': A method to close popups/overlays
+- 'save_screenshot': A method that records a screenshot of the current page (e.g., save_screenshot('login_timeout'))
+
+Use the latest Selenium 4+ syntax:
+- Import `from selenium.webdriver.common.by import By` and use `browser.find_element(By.ID, 'value')`.
+- For GitHub login, target `input#login_field` for username, `input#password` for password, `input[type='submit'][value='Sign in']` for login button.
+- For GitHub star button, try `button[aria-label*='Star this repository']`, `button.js-toggler-target`, `form#repo-stars-counter-star button`.
+
+Include ALL necessary import statements at the top, including:
+- `from selenium.webdriver.common.by import By`
+- `from selenium.webdriver.support.ui import WebDriverWait`
+- `from selenium.webdriver.support import expected_conditions as EC`
+- `from selenium.webdriver.common.action_chains import ActionChains`
+- `from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException`
+- `import logging`
+- `import time`
+- `import random`
+
+For robust automation:
+- Setup logging with `logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')`.
+- Log every step (e.g., navigation, element interaction, errors).
+- Save screenshots on errors with `save_screenshot(f'error_{error_type}')`; never write files with `browser.save_screenshot`.
+- Use `WebDriverWait` for all element interactions with at least 10-second timeouts.
+- Verify actions (e.g., after login, check for `img.avatar-user`; after starring, check `button[aria-label*='Unstar']`).
+- Call `wait_for_page_load` and `handle_popups` after navigation or major actions.
+- Use `ActionChains` for reliable clicks on interactive elements.
+- Implement JavaScript fallback clicks (`browser.execute_script('arguments[0].click();', element)`).
+- Use multiple selector strategies for critical elements with retries (max 3 attempts).
+- Use `random_sleep` after interactions to handle dynamic content.
+- Wrap code in a try-except block catching `TimeoutException`, `NoSuchElementException`, `StaleElementReferenceException`, and a general `Exception`.
+- Clean up with `random_sleep(2, 5)` in a `finally` block.
+- Do NOT wrap the code in a function definition; provide raw executable code that runs directly.
+
+For GitHub-specific tasks:
+- Verify login success by checking for `img.avatar-user` or `a[href*='/username']`.
+- For starring a repository, confirm the action by checking `button[aria-label*='Unstar']` or star count update.
+
+Return ONLY the raw Python code as plain text. Do NOT include Markdown code block markers, comments, explanations, function definitions, or any other formatting—just the executable code."""
+
+CODEGEN_SCHEDULING_INSTRUCTIONS = """IMPORTANT: This task needs to be scheduled. Follow these additional requirements:
+- Import `from crontab import CronTab` and `import datetime`
+- Get the current time with `current_time = datetime.datetime.now()`
+- Extract the scheduling requirements from the user command
+- Create a Python script file that contains the automation code
+- Set up a cron job to run this script at the specified time using the python-crontab library
+- If no specific time is mentioned, set the task to run 5 minutes from now
+- Log scheduled information including the scheduled time and command
+
+Example cron job setup:
+```python
+# Create script file
+script_filename = f"scheduled_task_{int(time.time())}.py"
+with open(script_filename, "w") as f:
+    f.write("#!/usr/bin/env python\\n")
+    f.write("import logging\\n")
+    f.write("# Rest of imports\\n\\n")
+    f.write("# Your automation code here\\n")
+
+# Make the script executable
+import os
+os.chmod(script_filename, 0o755)
+
+# Setup cron job
+cron = CronTab(user=True)
+job = cron.new(command=f"/usr/bin/python3 {os.path.abspath(script_filename)}")
+
+# Set schedule (examples)
+job.minute.on(30)  # Run at 30 minutes past the hour
+# OR
+job.setall('30 14 * * *')  # Run at 2:30 PM daily
+# OR
+job.every(1).day()  # Run daily
+
+# Write cron job to crontab
+cron.write()
+```"""
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+
+# A URL or bare domain in a command means its code navigates there itself
+SITE_PATTERN = re.compile(r"https?://\S+|\bwww\.\S+|\b[\w-]+\.(?:com|org|net|io|dev|in|co|ai)\b", re.IGNORECASE)
+
+
+def opens_own_page(user_command):
+    """True for commands that name the site they act on, so their code doesn't depend on the page already open"""
+    return bool(SITE_PATTERN.search(user_command))
 
 
 class BrowserAutomationWithScraper:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, backend="webdriver", session_identity=None, session_store=None,
+                 model_router=None, rate_limiter=None, artifacts=None, start_browser=True):
         # Set up API key
         self.api_key = api_key
         if not self.api_key:
@@ -37,18 +148,39 @@ class BrowserAutomationWithScraper:
         if not self.api_key:
             logging.error("No API key provided. You'll need to set one before querying Claude.")
         else:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            # Retries are handled by resilience.LLM_POLICY, so the SDK's own retries are disabled
+            self.client = anthropic.Anthropic(api_key=self.api_key, max_retries=0)
 
         # Initialize browser
         self.browser = None
         self.last_result = None
-        self.setup_browser()
+        self.backend_kind = backend
+        self.backend = None
+        self.session_identity = session_identity
+        self.session_store = session_store or (SessionStore() if session_identity else None)
+        self.session_restored = False
+        if start_browser:
+            self.setup_browser()
 
         # Initialize web scraping attributes
         self.current_url = None
         self.soup = None
         self.content = ""
         self.structured_data = {}
+        self.table_frames = []
+
+        # Local intent classifier for natural language commands, and per-call model selection
+        self.intent_router = IntentRouter()
+        self.model_router = model_router or ModelRouter.shared()
+
+        # Per-domain pacing for page loads, shared across instances by default
+        self.rate_limiter = rate_limiter or default_rate_limiter
+        self.artifacts = artifacts or default_store()
+        self.current_command = None
+        self.last_scheduled_url = None
+
+        # Blocks repeated across pages of a site, dropped from query prompts
+        self.boilerplate = BoilerplateTracker()
 
         # Initialize conversation history
         self.conversation_history = []
@@ -59,6 +191,7 @@ class BrowserAutomationWithScraper:
             "last_query": None,
             "session_start": datetime.datetime.now()
         }
+        metrics.track_browser(self)
 
     def setup_browser(self):
         """Initialize the browser with Selenium"""
@@ -70,18 +203,40 @@ class BrowserAutomationWithScraper:
             chrome_options.add_argument("--disable-blink-features=AutomationControlled")
             chrome_options.add_argument("--disable-notifications")
             chrome_options.add_argument("--ignore-certificate-errors")
+            if self.backend_kind == "cdp":
+                # Network events for the CDP backend are read from the performance log
+                chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
             service = Service(ChromeDriverManager().install())
             self.browser = webdriver.Chrome(service=service, options=chrome_options)
             self.browser.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.backend = make_backend(self.browser, self.backend_kind)
+            if self.backend.supports_network_events:
+                # Fonts and trackers add load time without adding content
+                self.backend.block_urls(DEFAULT_BLOCKED_URLS)
+            if self.session_identity:
+                self.session_restored = self.session_store.load(self.session_identity, self.browser) > 0
             logging.info("Browser initialized successfully")
         except Exception as e:
             logging.error(f"Error setting up browser: {str(e)}")
             raise
 
+    def save_screenshot(self, name="screenshot"):
+        """Queue a screenshot of the current page in the artifact store; returns its path (None on failure)"""
+        try:
+            png = self.browser.get_screenshot_as_png()
+        except Exception as e:
+            logging.error(f"Error taking screenshot: {str(e)}")
+            return None
+        path = self.artifacts.put(png, "screenshot", "png", command=self.current_command,
+                                  metadata={"name": name, "url": self.browser.current_url})
+        logging.info(f"Queued screenshot '{name}' as artifact {path}")
+        return path
+
     def random_sleep(self, min_seconds=1, max_seconds=3):
         """Sleep for a random amount of time to mimic human behavior"""
         time.sleep(random.uniform(min_seconds, max_seconds))
 
+    @traced("wait_for_page_load")
     def wait_for_page_load(self, timeout=30):
         """Wait for page to fully load, including dynamic content"""
         try:
@@ -91,10 +246,34 @@ class BrowserAutomationWithScraper:
             WebDriverWait(self.browser, timeout).until(
                 lambda driver: driver.execute_script("return window.performance.timing.loadEventEnd > 0")
             )
-            self.random_sleep(2, 5)
+            if self.backend.supports_network_events:
+                # Wait for late XHR/fetch activity to settle instead of a fixed sleep
+                self.backend.wait_network_idle(timeout=min(timeout, 10))
+            else:
+                self.random_sleep(2, 5)
         except Exception as e:
             logging.warning(f"Wait for page load issue: {str(e)}")
 
+    def _charge_unscheduled_load(self, url):
+        """Count a page loaded outside navigate() (e.g. by generated code) against its domain's rate limit"""
+        if url and url != self.last_scheduled_url and url.startswith("http"):
+            self.rate_limiter.acquire(url)
+            self.last_scheduled_url = url
+
+    def navigate(self, url):
+        """Load url once its domain's rate limit allows, with retries, failing fast while the site's circuit breaker is open"""
+        host = urlsplit(url).netloc
+        with tracer.span("rate_limit", host=host) as span:
+            waited = self.rate_limiter.acquire(url)
+            span.set("waited", waited)
+        metrics.observe("rate_limit_wait_seconds", waited or 0.0)
+        self.last_scheduled_url = url
+        start = time.perf_counter()
+        call_with_retry(lambda: self.browser.get(url), NAVIGATION_POLICY, breakers.get(f"domain:{host}"),
+                        f"navigation to {url}")
+        metrics.observe("page_load_seconds", time.perf_counter() - start)
+
+    @traced("handle_popups")
     def handle_popups(self):
         """Handle popups/overlays across various websites"""
         try:
@@ -107,150 +286,193 @@ class BrowserAutomationWithScraper:
                 "div._2QfC02 button"  # Flipkart login popup
             ]
             for selector in popup_selectors:
-                try:
-                    if selector.startswith('//'):
-                        elements = self.browser.find_elements(By.XPATH, selector)
-                    else:
-                        elements = self.browser.find_elements(By.CSS_SELECTOR, selector)
+                by = By.XPATH if selector.startswith('//') else By.CSS_SELECTOR
+
+                def close_popup():
+                    # Re-find on every attempt so a stale element is replaced
+                    elements = self.browser.find_elements(by, selector)
                     if elements:
                         elements[0].click()
+                    return bool(elements)
+
+                try:
+                    if call_with_retry(close_popup, WEBDRIVER_POLICY, description=f"popup click '{selector}'"):
                         logging.info(f"Closed popup using selector: {selector}")
                         self.random_sleep(1, 2)
-                except Exception:
-                    continue
+                except Exception as e:
+                    logging.debug("Popup selector '%s' not clickable: %s", selector, type(e).__name__,
+                                  extra={"sample": "popup"})
         except Exception as e:
             logging.warning(f"Error handling popups: {str(e)}")
 
-    def scroll_page(self, scroll_pause_time=2):
-        """Scroll page to load lazy-loaded content"""
+    @traced("scroll_page")
+    def scroll_page(self, scroll_pause_time=2, item_selector=None, target_items=None, time_budget=30,
+                    max_steps=50, quiet_period=0.5, stable_rounds=2):
+        """Scroll until lazy-loaded content stops growing, a target item count is reached or time runs out"""
+        report = {"steps": 0, "items": 0, "items_loaded": 0, "height": 0, "reason": "error"}
         try:
-            last_height = self.browser.execute_script("return document.body.scrollHeight")
-            self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            self.random_sleep(scroll_pause_time, scroll_pause_time + 2)
+            start = time.time()
+            initial = self.backend.call_script(PAGE_SIZE_SCRIPT, item_selector)
+            last_height, last_items = initial["height"], initial["items"]
+            report.update(height=last_height, items=last_items)
+            self.browser.set_script_timeout(scroll_pause_time + 5)
+            unchanged = 0
+
+            while report["steps"] < max_steps:
+                if target_items and last_items >= target_items:
+                    report["reason"] = "target_items"
+                    break
+                remaining = time_budget - (time.time() - start)
+                if remaining <= 0:
+                    report["reason"] = "time_budget"
+                    break
+
+                # Each step scrolls and waits in-page for network idle + DOM quiet, capped by scroll_pause_time
+                max_wait = min(scroll_pause_time, remaining)
+                state = self.backend.call_async_script(
+                    SCROLL_STEP_SCRIPT, int(max_wait * 1000), int(quiet_period * 1000), item_selector
+                )
+                report["steps"] += 1
+
+                if state["height"] <= last_height and state["items"] <= last_items and state["pending"] <= 0:
+                    unchanged += 1
+                    if unchanged >= stable_rounds:
+                        report["reason"] = "converged"
+                        break
+                else:
+                    unchanged = 0
+                last_height, last_items = state["height"], state["items"]
+            else:
+                report["reason"] = "max_steps"
+
+            report.update(height=last_height, items=last_items, items_loaded=last_items - initial["items"])
+            logging.info(f"Scrolled {report['steps']} steps, loaded {report['items_loaded']} items "
+                         f"({report['items']} total, stopped: {report['reason']})")
         except Exception as e:
             logging.warning(f"Error during page scrolling: {str(e)}")
 
+        span = tracer.current_span()
+        if span is not None:
+            span.attributes.update({f"scroll.{key}": value for key, value in report.items()})
+        return report
+
+    def _build_code_request(self, user_command, include_page=True):
+        """Build messages.create parameters for a code generation call.
+
+        The static instructions go in system blocks, which ModelRouter.with_prompt_cache marks for
+        caching once they reach the routed model's minimum cacheable length. With include_page=False
+        the prompt leaves out the current URL and DOM, for code generated before the page is known.
+        """
+        # Include conversation context in the prompt
+        context_str = self._format_context_for_prompt(include_page)
+
+        # Check for scheduling keywords in the user command
+        scheduling_indicators = ["schedule", "cron", "later", "daily", "weekly", "monthly", "every", "periodic",
+                                 "timer"]
+        should_schedule = any(indicator in user_command.lower() for indicator in scheduling_indicators)
+
+        # Give the model the structure of the page it will act on
+        page_section = ""
+        if include_page and self.browser and self.browser.current_url not in ("about:blank", "data:,"):
+            dom_summary = self.get_dom_summary(max_tokens=1000)
+            if dom_summary:
+                page_section = (
+                    "CURRENT PAGE STRUCTURE (condensed DOM skeleton: tag#id.class paths with text samples):\n"
+                    f"{dom_summary}"
+                )
+
+        # Separate blocks so scheduled and unscheduled commands can share a cached first block
+        system = [{"type": "text", "text": CODEGEN_INSTRUCTIONS}]
+        if should_schedule:
+            system.append({"type": "text", "text": CODEGEN_SCHEDULING_INSTRUCTIONS})
+
+        prompt = f"""Generate Python code for browser automation using Selenium based on this user command: "{user_command}"
+
+CONVERSATION CONTEXT:
+{context_str}
+
+{page_section}
+
+Return ONLY the raw Python code."""
+        return {
+            "max_tokens": 1500,
+            "temperature": 0,
+            "system": system,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+
+    @traced("get_code_from_claude")
     def get_code_from_claude(self, user_command):
         """Send the user command to Claude API and get back Python code"""
         try:
-            # Include conversation context in the prompt
-            context_str = self._format_context_for_prompt()
-
-            # Check for scheduling keywords in the user command
-            scheduling_indicators = ["schedule", "cron", "later", "daily", "weekly", "monthly", "every", "periodic",
-                                     "timer"]
-            should_schedule = any(indicator in user_command.lower() for indicator in scheduling_indicators)
-
-            prompt = f"""
-            Generate Python code for browser automation using Selenium based on this user command: "{user_command}"
-
-            CONVERSATION CONTEXT:
-            {context_str}
-
-            Only return valid, working Python code that assumes these variables are available:
-            - 'browser': A selenium webdriver instance that's already initialized
-            - 'random_sleep': A method for random delays (e.g., random_sleep(1, 3))
-            - 'wait_for_page_load': A method to wait for page load completion
-            - 'handle_popups': A method to close popups/overlays
-
-            Use the latest Selenium 4+ syntax:
-            - Import `from selenium.webdriver.common.by import By` and use `browser.find_element(By.ID, 'value')`.
-            - For GitHub login, target `input#login_field` for username, `input#password` for password, `input[type='submit'][value='Sign in']` for login button.
-            - For GitHub star button, try `button[aria-label*='Star this repository']`, `button.js-toggler-target`, `form#repo-stars-counter-star button`.
-
-            Include ALL necessary import statements at the top, including:
-            - `from selenium.webdriver.common.by import By`
-            - `from selenium.webdriver.support.ui import WebDriverWait`
-            - `from selenium.webdriver.support import expected_conditions as EC`
-            - `from selenium.webdriver.common.action_chains import ActionChains`
-            - `from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException`
-            - `import logging`
-            - `import time`
-            - `import random`
-            """
-
-            # Add scheduling instructions if needed
-            if should_schedule:
-                prompt += f"""
-                IMPORTANT: This task needs to be scheduled. Follow these additional requirements:
-                - Import `from crontab import CronTab` and `import datetime`
-                - Get the current time with `current_time = datetime.datetime.now()`
-                - Extract the scheduling requirements from the user command
-                - Create a Python script file that contains the automation code
-                - Set up a cron job to run this script at the specified time using the python-crontab library
-                - If no specific time is mentioned, set the task to run 5 minutes from now
-                - Log scheduled information including the scheduled time and command
-
-                Example cron job setup:
-                ```python
-                # Create script file
-                script_filename = f"scheduled_task_{int(time.time())}.py"
-                with open(script_filename, "w") as f:
-                    f.write("#!/usr/bin/env python\\n")
-                    f.write("import logging\\n")
-                    f.write("# Rest of imports\\n\\n")
-                    f.write("# Your automation code here\\n")
-
-                # Make the script executable
-                import os
-                os.chmod(script_filename, 0o755)
-
-                # Setup cron job
-                cron = CronTab(user=True)
-                job = cron.new(command=f"/usr/bin/python3 {os.path.abspath(script_filename)}")
-
-                # Set schedule (examples)
-                job.minute.on(30)  # Run at 30 minutes past the hour
-                # OR
-                job.setall('30 14 * * *')  # Run at 2:30 PM daily
-                # OR
-                job.every(1).day()  # Run daily
-
-                # Write cron job to crontab
-                cron.write()
-                ```
-                """
-
-            prompt += """
-            For robust automation:
-            - Setup logging with `logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')`.
-            - Log every step (e.g., navigation, element interaction, errors).
-            - Save screenshots on errors with `browser.save_screenshot(f'error_{{error_type}}_{{int(time.time())}}.png')`.
-            - Use `WebDriverWait` for all element interactions with at least 10-second timeouts.
-            - Verify actions (e.g., after login, check for `img.avatar-user`; after starring, check `button[aria-label*='Unstar']`).
-            - Call `wait_for_page_load` and `handle_popups` after navigation or major actions.
-            - Use `ActionChains` for reliable clicks on interactive elements.
-            - Implement JavaScript fallback clicks (`browser.execute_script('arguments[0].click();', element)`).
-            - Use multiple selector strategies for critical elements with retries (max 3 attempts).
-            - Use `random_sleep` after interactions to handle dynamic content.
-            - Wrap code in a try-except block catching `TimeoutException`, `NoSuchElementException`, `StaleElementReferenceException`, and a general `Exception`.
-            - Clean up with `random_sleep(2, 5)` in a `finally` block.
-            - Do NOT wrap the code in a function definition; provide raw executable code that runs directly.
-
-            For GitHub-specific tasks:
-            - Verify login success by checking for `img.avatar-user` or `a[href*='/username']`.
-            - For starring a repository, confirm the action by checking `button[aria-label*='Unstar']` or star count update.
-
-            Return ONLY the raw Python code as plain text. Do NOT include Markdown code block markers, comments, explanations, function definitions, or any other formatting—just the executable code.
-            """
-            message = self.client.messages.create(
-                model="claude-3-5-haiku-20241022",
-                max_tokens=1500,
-                temperature=0,
-                system="You are an expert in Selenium automation.",
-                messages=[{"role": "user", "content": prompt}]
+            params = self._build_code_request(user_command)
+            message, model, errors = self.model_router.call(
+                self.client, "code", params, validate=python_syntax_errors,
+                input_chars=len(params["messages"][0]["content"])
             )
+            if errors:
+                logging.warning(f"Generated code still invalid after escalation: {'; '.join(errors)}")
             return message.content[0].text
         except Exception as e:
             logging.error(f"Error getting code from Claude: {str(e)}")
             return None
 
-    def _format_context_for_prompt(self):
+    @traced("get_code_for_commands")
+    def get_code_for_commands(self, user_commands, use_batch_api=True, workers=4, poll_interval=5, timeout=3600):
+        """Generate code for many commands in one batch; returns a list aligned with user_commands (None on failure).
+
+        The prompts leave out the current page, so this is only meant for commands that open their
+        own page (see opens_own_page); others should be generated live once earlier commands have run.
+        """
+        batch_requests = []
+        for index, user_command in enumerate(user_commands):
+            try:
+                params = self._build_code_request(user_command, include_page=False)
+                model = self.model_router.choose("code", len(params["messages"][0]["content"]))
+                params = self.model_router.with_prompt_cache(dict(params, model=model), model)
+                batch_requests.append({"custom_id": f"command-{index}", "params": params})
+            except Exception as e:
+                logging.error(f"Error building request for command {index}: {str(e)}")
+        models = {request["custom_id"]: request["params"]["model"] for request in batch_requests}
+
+        def record(custom_id, message, latency):
+            # Feed batched results into the router's stats the same way model_router.call() does
+            try:
+                success = message is not None and not python_syntax_errors(message)
+                self.model_router.record("code", models[custom_id], latency, success, message)
+            except Exception as e:
+                logging.warning(f"Could not record result for {custom_id}: {str(e)}")
+
+        messages = run_message_batch(self.client, batch_requests, use_batch_api=use_batch_api, workers=workers,
+                                     poll_interval=poll_interval, timeout=timeout, on_result=record)
+
+        codes = []
+        for index in range(len(user_commands)):
+            message = messages.get(f"command-{index}")
+            codes.append(message.content[0].text if message is not None else None)
+        logging.info(f"Generated code for {sum(code is not None for code in codes)}/{len(codes)} commands")
+        return codes
+
+    @traced("get_dom_summary")
+    def get_dom_summary(self, max_tokens=1500, max_text=40):
+        """Condense the current page into a token-budgeted DOM skeleton for code generation"""
+        try:
+            # Roughly four characters per token for markup-like text
+            result = self.backend.call_script(DOM_SUMMARY_SCRIPT, max_tokens * 4, max_text)
+            span = tracer.current_span()
+            if span is not None:
+                span.set("summary_chars", len(result["summary"]))
+            return result["summary"]
+        except Exception as e:
+            logging.warning(f"Could not build DOM summary: {str(e)}")
+            return ""
+
+    def _format_context_for_prompt(self, include_page=True):
         """Format the conversation context for inclusion in the prompt"""
         context_parts = []
 
         # Add current URL if available
-        if self.browser and self.browser.current_url and self.browser.current_url != "about:blank":
+        if include_page and self.browser and self.browser.current_url and self.browser.current_url != "about:blank":
             current_url = self.browser.current_url
             context_parts.append(f"Current browser URL: {current_url}")
 
@@ -259,6 +481,11 @@ class BrowserAutomationWithScraper:
             visited_urls = ", ".join(self.conversation_context["visited_urls"][-5:])  # Last 5 URLs
             context_parts.append(f"Recently visited URLs: {visited_urls}")
 
+        # Tell the model a logged-in session may already be active
+        if self.session_restored:
+            context_parts.append(f"Restored saved login session: {self.session_identity} "
+                                 "(check whether already logged in before performing any login steps)")
+
         # Add last command if available
         if self.conversation_context["last_command"]:
             context_parts.append(f"Last command: {self.conversation_context['last_command']}")
@@ -270,6 +497,7 @@ class BrowserAutomationWithScraper:
 
         return "\n".join(context_parts)
 
+    @traced("execute_code")
     def execute_code(self, code):
         """Execute the generated Python code"""
         if not code:
@@ -280,9 +508,10 @@ class BrowserAutomationWithScraper:
                 "browser": self.browser,
                 "random_sleep": self.random_sleep,
                 "wait_for_page_load": self.wait_for_page_load,
-                "handle_popups": self.handle_popups
+                "handle_popups": self.handle_popups,
+                "save_screenshot": self.save_screenshot
             }
-            required_vars = ["browser", "random_sleep", "wait_for_page_load", "handle_popups"]
+            required_vars = ["browser", "random_sleep", "wait_for_page_load", "handle_popups", "save_screenshot"]
             for var in required_vars:
                 if not local_vars.get(var):
                     logging.error(f"Required variable '{var}' is not initialized")
@@ -306,8 +535,10 @@ class BrowserAutomationWithScraper:
             logging.error(f"Error executing code: {str(e)}")
             return f"Error executing code: {str(e)}"
 
-    def run_command(self, user_command):
-        """Process user command through Claude and execute the resulting code"""
+    @traced("run_command")
+    @measured("run_command")
+    def run_command(self, user_command, code=None):
+        """Process user command through Claude and execute the resulting code (or code generated in advance)"""
         logging.info(f"Processing command: {user_command}")
 
         # Update context with the current command
@@ -320,17 +551,18 @@ class BrowserAutomationWithScraper:
             "timestamp": datetime.datetime.now().isoformat()
         })
 
-        code = self.get_code_from_claude(user_command)
+        if code is None:
+            code = self.get_code_from_claude(user_command)
         if code:
-            logging.info("Generated code:")
-            logging.info("-" * 18)
-            logging.info(code)
-            logging.info("-" * 18)
-            code_filename = f"generated_code_{int(time.time())}.py"
-            with open(code_filename, "w") as f:
-                f.write(code)
-            logging.info(f"Saved generated code to {code_filename}")
-            result = self.execute_code(code)
+            logging.info("Generated %d lines of code", code.count("\n") + 1)
+            logging.debug("Generated code:\n%s", code)
+            code_path = self.artifacts.put(code, "generated_code", "py", command=user_command)
+            logging.info(f"Queued generated code as artifact {code_path}")
+            self.current_command = user_command
+            try:
+                result = self.execute_code(code)
+            finally:
+                self.current_command = None
 
             # Add to conversation history
             self.conversation_history.append({
@@ -354,8 +586,27 @@ class BrowserAutomationWithScraper:
             logging.error(error_msg)
             return error_msg
 
-    def extract_current_page_content(self):
-        """Extract content from the current page in the browser"""
+    @traced("run_commands")
+    def run_commands(self, user_commands, use_batch_api=True):
+        """Run a backlog of commands in order, generating code in one batch for those that open their own page.
+
+        Other commands depend on the page earlier commands leave behind, so their code is generated
+        live against the current page when their turn comes, as are any whose batched generation failed.
+        """
+        independent = [command for command in user_commands if opens_own_page(command)]
+        codes = {}
+        if independent:
+            codes = dict(zip(independent, self.get_code_for_commands(independent, use_batch_api=use_batch_api)))
+        return [self.run_command(user_command, codes.get(user_command)) for user_command in user_commands]
+
+    @traced("extract_current_page_content")
+    @measured("extract_current_page_content")
+    def extract_current_page_content(self, streaming=False, chunk_size=1_000_000):
+        """Extract content from the current page in the browser.
+
+        With streaming=True the page HTML is pulled in chunk_size pieces and parsed incrementally,
+        so neither the full source nor a parse tree is held in memory (self.soup stays None).
+        """
         if not self.browser:
             logging.error("Browser is not initialized")
             return False
@@ -364,13 +615,32 @@ class BrowserAutomationWithScraper:
             # Get the current URL
             self.current_url = self.browser.current_url
             logging.info(f"Extracting content from current page: {self.current_url}")
-
-            # Get the page source
-            page_source = self.browser.page_source
-            self.soup = BeautifulSoup(page_source, 'html.parser')
-
-            # Extract content
-            result = self._extract_content_from_soup()
+            self._charge_unscheduled_load(self.current_url)
+
+            if streaming:
+                self.soup = None
+                with tracer.span("extract_content_streaming", chunk_size=chunk_size) as span:
+                    result = self._extract_content_from_events(
+                        iter_content_events(iter_page_chunks(self.browser, chunk_size))
+                    )
+                    span.set("content_chars", len(self.content))
+            else:
+                # Get the page source
+                with tracer.span("page_source") as span:
+                    page_source = call_with_retry(self.backend.page_html, WEBDRIVER_POLICY,
+                                                  description="page source")
+                    span.set("bytes", len(page_source))
+                with tracer.span("parse_html", bytes=len(page_source)):
+                    self.soup = BeautifulSoup(page_source, 'html.parser')
+                del page_source
+
+                # Extract content
+                with tracer.span("extract_content") as span:
+                    result = self._extract_content_from_soup()
+                    span.set("content_chars", len(self.content))
+
+            if result:
+                self.boilerplate.observe(self.current_url, self.content)
 
             # Update context if extraction was successful
             if result and self.current_url not in self.conversation_context["extracted_sites"]:
@@ -381,6 +651,30 @@ class BrowserAutomationWithScraper:
             logging.error(f"Error extracting content from current page: {str(e)}")
             return False
 
+    def stream_current_page_content(self, chunk_size=1_000_000, max_element_chars=20000):
+        """Yield content events (headers, paragraphs, list items, table rows) from the current page as it is parsed"""
+        if not self.browser:
+            logging.error("Browser is not initialized")
+            return
+        yield from iter_content_events(iter_page_chunks(self.browser, chunk_size), max_element_chars)
+
+    @traced("extract_pages_in_tabs")
+    def extract_pages_in_tabs(self, urls, max_tabs=4, load_timeout=30, scroll=False):
+        """Extract content from many URLs, overlapping page loads across tabs of this browser"""
+        def extract(url):
+            # The tab scheduler already charged this load to the domain's rate limit
+            self.last_scheduled_url = self.browser.current_url
+            self.handle_popups()
+            if scroll:
+                self.scroll_page()
+            if not self.extract_current_page_content():
+                raise RuntimeError("Failed to extract content")
+            return dict(self.structured_data)
+
+        scheduler = TabScheduler(self.browser, max_tabs=max_tabs, load_timeout=load_timeout,
+                                 rate_limiter=self.rate_limiter)
+        return scheduler.run(urls, extract)
+
     def _extract_content_from_soup(self):
         """Extract and organize content from BeautifulSoup object"""
         if not self.soup:
@@ -426,19 +720,30 @@ class BrowserAutomationWithScraper:
                 lists.append(list_items)
                 main_content.extend(list_items)
 
-        # Extract tables
-        tables = []
+        # Extract tables as typed columnar frames
+        frames = []
         for table in self.soup.find_all('table'):
-            table_rows = []
-            for tr in table.find_all('tr'):
-                row = [td.get_text(strip=True) for td in tr.find_all(['td', 'th'])]
-                if row:
-                    table_rows.append(" | ".join(row))
+            frames.append(self._table_to_frame(table))
+
+        links = [anchor["href"] for anchor in self.soup.find_all("a", href=True)]
+        return self._store_content(title, headers, paragraphs, lists, frames, main_content, links)
 
-            if table_rows:
-                tables.append(table_rows)
-                main_content.append("TABLE:")
-                main_content.extend(table_rows)
+    def _store_content(self, title, headers, paragraphs, lists, frames, main_content, links=None):
+        """Render extracted pieces into self.content/self.structured_data"""
+        tables = []
+        self.table_frames = []
+        for frame in frames:
+            if frame is None or frame.empty:
+                continue
+
+            self.table_frames.append(frame)
+            tables.append(self._frame_to_record(frame))
+
+            # Keep a readable rendering in the text content used for querying
+            main_content.append("TABLE:")
+            main_content.append(" | ".join(str(column) for column in frame.columns))
+            rendered = frame.astype(str).where(frame.notna(), "")
+            main_content.extend(rendered.agg(" | ".join, axis=1).tolist())
 
         # Compile all content into a single string
         self.content = "\n\n".join(main_content)
@@ -450,6 +755,7 @@ class BrowserAutomationWithScraper:
             'paragraphs': paragraphs,
             'lists': lists,
             'tables': tables,
+            'links': links or [],
             'full_content': self.content
         }
 
@@ -462,8 +768,208 @@ class BrowserAutomationWithScraper:
 
         return True
 
-    def query_content(self, user_query, model="claude-3-haiku-20240307"):
-        """Query Claude with the extracted content and user question"""
+    def _extract_content_from_events(self, events):
+        """Build content from streaming parser events, keeping only the extracted text"""
+        title = "No title found"
+        headers, paragraphs, lists, frames, links = [], [], [], [], []
+        main_content = []
+        open_lists = []  # item lists of the <ul>/<ol> elements currently open
+        open_tables = []  # row lists of the <table> elements currently open
+
+        for event in events:
+            kind = event[0]
+            if kind == "title":
+                title = event[1]
+            elif kind == "header":
+                headers.append(f"{'#' * event[1]} {event[2]}")
+                main_content.append(headers[-1])
+            elif kind == "paragraph":
+                paragraphs.append(event[1])
+                main_content.append(event[1])
+            elif kind == "list_start":
+                open_lists.append([])
+            elif kind == "list_item":
+                if open_lists:
+                    open_lists[-1].append(f"- {event[1]}")
+            elif kind == "list_end" and open_lists:
+                list_items = open_lists.pop()
+                if list_items:
+                    lists.append(list_items)
+                    main_content.extend(list_items)
+            elif kind == "table_start":
+                open_tables.append([])
+            elif kind == "table_row":
+                if open_tables:
+                    open_tables[-1].append((event[1], event[2]))
+            elif kind == "table_end" and open_tables:
+                # Tables become frames as soon as they close, so raw rows never pile up
+                frames.append(self._rows_to_frame(open_tables.pop()))
+            elif kind == "link":
+                links.append(event[1])
+
+        return self._store_content(title, headers, paragraphs, lists, frames, main_content, links)
+
+    def _table_to_frame(self, table):
+        """Convert an HTML table into a typed DataFrame, expanding rowspan/colspan cells"""
+        rows = []
+        for tr in table.find_all('tr'):
+            cells = tr.find_all(['td', 'th'], recursive=False) or tr.find_all(['td', 'th'])
+            rows.append((
+                [(cell.get_text(" ", strip=True), self._span_value(cell.get('colspan')),
+                  self._span_value(cell.get('rowspan')), cell.name == 'th') for cell in cells],
+                tr.find_parent('thead') is not None
+            ))
+        return self._rows_to_frame(rows)
+
+    @staticmethod
+    def _fill_rowspans(pending, row, col):
+        """Append the values of rowspans covering col onwards to row; returns the next free column"""
+        while col in pending:
+            remaining, span_text = pending[col]
+            row.append(span_text)
+            if remaining > 1:
+                pending[col] = (remaining - 1, span_text)
+            else:
+                del pending[col]
+            col += 1
+        return col
+
+    def _rows_to_frame(self, rows):
+        """Build a typed DataFrame from (cells, in_thead) rows of (text, colspan, rowspan, is_header) cells"""
+        grid = []
+        header_rows = 0
+        pending = {}  # column index -> (remaining rows, text) for active rowspans
+
+        for cells, in_thead in rows:
+            row = []
+            col = 0
+            for text, colspan, rowspan, _ in cells:
+                # Fill columns still covered by a rowspan from an earlier row
+                col = self._fill_rowspans(pending, row, col)
+                for _ in range(colspan):
+                    row.append(text)
+                    if rowspan > 1:
+                        pending[col] = (rowspan - 1, text)
+                    col += 1
+
+            # Trailing rowspans after the last explicit cell
+            self._fill_rowspans(pending, row, col)
+
+            if not row:
+                continue
+
+            # Header rows: inside <thead>, or leading rows made only of <th> cells
+            all_th = all(is_header for _, _, _, is_header in cells)
+            if header_rows == len(grid) and (in_thead or all_th):
+                header_rows += 1
+            grid.append(row)
+
+        if not grid:
+            return None
+
+        width = max(len(row) for row in grid)
+        grid = [row + [None] * (width - len(row)) for row in grid]
+
+        if header_rows and header_rows < len(grid):
+            columns = self._build_column_names(grid[:header_rows], width)
+            body = grid[header_rows:]
+        else:
+            columns = [f"column_{i}" for i in range(width)]
+            body = grid
+
+        frame = pd.DataFrame(body, columns=columns)
+        return self._coerce_numeric_columns(frame)
+
+    @staticmethod
+    def _span_value(value):
+        """Parse a rowspan/colspan attribute, defaulting to 1 on bad input"""
+        try:
+            return max(1, min(int(value), 1000))
+        except (TypeError, ValueError):
+            return 1
+
+    @staticmethod
+    def _build_column_names(header_rows, width):
+        """Collapse one or more header rows into unique column names"""
+        columns = []
+        seen = {}
+        for i in range(width):
+            parts = []
+            for row in header_rows:
+                text = row[i] or ""
+                if text and (not parts or parts[-1] != text):
+                    parts.append(text)
+            name = " / ".join(parts) or f"column_{i}"
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}_{seen[name]}"
+            else:
+                seen[name] = 0
+            columns.append(name)
+        return columns
+
+    @staticmethod
+    def _coerce_numeric_columns(frame):
+        """Convert columns whose non-empty cells are all numeric, using vectorized string ops"""
+        frame = frame.replace("", None)
+        for column in frame.columns:
+            series = frame[column]
+            present = series.notna()
+            if not present.any():
+                continue
+            cleaned = series.astype("string").str.replace(r"[,\s$€£¥₹%]", "", regex=True)
+            cleaned = cleaned.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+            numeric = pd.to_numeric(cleaned, errors="coerce")
+            if numeric[present].notna().all():
+                frame[column] = numeric
+        return frame
+
+    @staticmethod
+    def _frame_to_record(frame):
+        """Convert a DataFrame into a JSON-serializable dict that keeps column structure"""
+        values = frame.astype(object).where(frame.notna(), None)
+        return {
+            'columns': [str(column) for column in frame.columns],
+            'dtypes': {str(column): str(dtype) for column, dtype in frame.dtypes.items()},
+            'rows': values.values.tolist()
+        }
+
+    def export_tables(self, directory="tables", file_format="csv"):
+        """Export the extracted tables to CSV, Parquet or Arrow (Feather) files"""
+        if not self.table_frames:
+            logging.info("No tables to export")
+            return []
+
+        extensions = {"csv": "csv", "parquet": "parquet", "arrow": "arrow"}
+        if file_format not in extensions:
+            logging.error(f"Unsupported table export format: {file_format}")
+            return []
+
+        os.makedirs(directory, exist_ok=True)
+        written = []
+        for index, frame in enumerate(self.table_frames):
+            filename = os.path.join(directory, f"table_{index}.{extensions[file_format]}")
+            try:
+                if file_format == "csv":
+                    frame.to_csv(filename, index=False)
+                elif file_format == "parquet":
+                    frame.to_parquet(filename, index=False)
+                else:
+                    # Arrow IPC requires string column names and a default index
+                    frame.rename(columns=str).reset_index(drop=True).to_feather(filename)
+                written.append(filename)
+            except ImportError as e:
+                logging.error(f"Exporting to {file_format} requires pyarrow: {str(e)}")
+                return written
+            except Exception as e:
+                logging.error(f"Error exporting table {index}: {str(e)}")
+        logging.info(f"Exported {len(written)} tables to {directory}")
+        return written
+
+    @traced("query_content")
+    @measured("query_content")
+    def query_content(self, user_query, model=None, latency_budget=None, max_input_tokens=12000):
+        """Query Claude with the extracted content (compacted to max_input_tokens) and user question"""
         if not self.api_key:
             logging.error("API key not set. Use set_api_key() method first.")
             return "API key not configured"
@@ -490,28 +996,42 @@ If the answer isn't in the content, say you don't have that information.
 Be concise but thorough, and cite specific parts of the content when appropriate.
 """
 
-        # Truncate content if it's too long (Claude has token limits)
-        max_content_length = 50000  # Conservative estimate for token limits
-        truncated_content = self.content
-        if len(self.content) > max_content_length:
-            truncated_content = self.content[:max_content_length] + "\n[Content truncated due to length]"
-
-        # Construct user message with content and query
-        user_message = f"""WEBPAGE CONTENT:
-{truncated_content}
+        def build_message(content):
+            return f"""WEBPAGE CONTENT:
+{content}
 
 MY QUESTION:
 {user_query}"""
 
         try:
-            # Query Claude API
-            response = self.client.messages.create(
-                model=model,
-                system=system_prompt,
-                messages=[
+            # Drop cross-page boilerplate and duplicates, then fit the prompt to the token budget
+            with tracer.span("compact_content") as span:
+                compacted, stats = compact_content(self.content, self.current_url, self.boilerplate)
+                model = model or self.model_router.choose(
+                    "query", len(system_prompt) + len(compacted), latency_budget
+                )
+                compacted, input_tokens = fit_to_budget(
+                    compacted, max_input_tokens,
+                    lambda content: self._count_tokens(model, system_prompt, build_message(content))
+                )
+                span.attributes.update({f"compaction.{key}": value for key, value in stats.items()})
+                span.set("input_tokens", input_tokens)
+            logging.info(f"Compacted content {stats['chars_before']} -> {len(compacted)} chars "
+                         f"({input_tokens} input tokens)")
+            user_message = build_message(compacted)
+
+            # Query Claude API on the routed model (or the one given)
+            params = {
+                "model": model,
+                "system": system_prompt,
+                "messages": [
                     {"role": "user", "content": user_message}
                 ],
-                max_tokens=1024
+                "max_tokens": 1024
+            }
+            response, model, _ = self.model_router.call(
+                self.client, "query", params, validate=self._answer_errors,
+                input_chars=len(system_prompt) + len(user_message), latency_budget=latency_budget
             )
 
             answer = response.content[0].text
@@ -537,6 +1057,22 @@ MY QUESTION:
 
             return error_msg
 
+    def _count_tokens(self, model, system_prompt, user_message):
+        """Exact input token count from the API, falling back to an estimate"""
+        try:
+            return self.client.messages.count_tokens(
+                model=model, system=system_prompt, messages=[{"role": "user", "content": user_message}]
+            ).input_tokens
+        except Exception as e:
+            logging.debug(f"Token counting unavailable, estimating: {str(e)}")
+            return estimate_tokens(system_prompt) + estimate_tokens(user_message)
+
+    @staticmethod
+    def _answer_errors(message):
+        """Validator for query answers: a non-empty text block"""
+        text = message.content[0].text if message.content else ""
+        return [] if text.strip() else ["Empty answer"]
+
     def save_content(self, filename="scraped_content.json"):
         """Save the structured content to a JSON file"""
         if not self.structured_data:
@@ -569,11 +1105,20 @@ MY QUESTION:
     def set_api_key(self, api_key):
         """Set or update the Claude AI key"""
         self.api_key = api_key
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self.client = anthropic.Anthropic(api_key=api_key, max_retries=0)
         logging.info("API key updated successfully")
 
+    def save_session(self):
+        """Persist the browser's cookies under the current session identity"""
+        if not self.session_identity or not self.browser:
+            return False
+        return self.session_store.save(self.session_identity, self.browser)
+
     def close(self):
         """Close the browser"""
+        self.save_session()
+        self.model_router.save()
+        self.artifacts.flush()
         if self.browser:
             try:
                 self.browser.quit()
@@ -582,6 +1127,41 @@ MY QUESTION:
                 logging.error(f"Error closing browser: {str(e)}")
             self.browser = None
 
+    @traced("classify_intent_with_claude")
+    def classify_intent_with_claude(self, user_input, route, latency_budget=1.5):
+        """Ask Claude for the intent of an ambiguous command; returns None if unavailable"""
+        if not self.api_key:
+            return None
+
+        prompt = f"""Classify this command for a browser assistant into exactly one intent:
+query - a question about the page that is already open
+extract - (re)extract the content of the current page
+automate - navigate, click, type or otherwise drive the browser
+
+A page is {"currently" if self.content else "NOT"} extracted: {self.current_url or "none"}
+Local classifier scores: {json.dumps(route["scores"])}
+
+Command: {user_input}
+
+Reply with only the intent word."""
+
+        def parse(message):
+            answer = message.content[0].text.strip().lower() if message.content else ""
+            return next((intent for intent in INTENTS if intent in answer), None)
+
+        try:
+            response, _, errors = self.model_router.call(
+                self.client, "intent", {"messages": [{"role": "user", "content": prompt}], "max_tokens": 5},
+                validate=lambda message: [] if parse(message) else ["Unrecognized intent"],
+                input_chars=len(prompt), latency_budget=latency_budget
+            )
+            if not errors:
+                return parse(response)
+            logging.warning(f"Unrecognized intent from Claude: {response.content[0].text if response.content else ''}")
+        except Exception as e:
+            logging.error(f"Error classifying intent with Claude: {str(e)}")
+        return None
+
     def process_natural_language_command(self, user_input):
         """Process a natural language command and determine the appropriate action"""
         # Add to conversation history
@@ -591,22 +1171,21 @@ MY QUESTION:
             "timestamp": datetime.datetime.now().isoformat()
         })
 
-        # Define keywords for each type of action
-        automation_keywords = ["go to", "navigate", "click", "fill", "search", "login", "download", "submit",
-                               "automate", "browse"]
-        extraction_keywords = ["extract", "scrape", "get content", "get text", "get data"]
-        query_keywords = ["what", "who", "when", "where", "why", "how", "tell me", "explain", "find"]
-
-        # Check if there's a current page and the input looks like a question about it
+        # Classify locally; only ambiguous commands cost an LLM call
         has_current_page = self.current_url is not None and self.content
-        looks_like_question = any(
-            user_input.lower().startswith(kw.lower()) for kw in query_keywords) or user_input.endswith("?")
-
-        if has_current_page and looks_like_question:
+        with tracer.span("route_intent") as span:
+            route = self.intent_router.classify(user_input)
+            intent = route["intent"]
+            span.set("confidence", route["confidence"])
+        if not self.intent_router.is_confident(route):
+            intent = self.classify_intent_with_claude(user_input, route) or intent
+        logging.info(f"Routed as '{intent}' (local confidence {route['confidence']:.2f})")
+
+        if intent == "query" and has_current_page:
             # This appears to be a question about the current page
             logging.info(f"Processing as a query about the current page: {user_input}")
             response = self.query_content(user_input)
-        elif any(kw.lower() in user_input.lower() for kw in extraction_keywords):
+        elif intent == "extract":
             # This appears to be a content extraction request
             logging.info(f"Processing as a content extraction request: {user_input}")
             if self.extract_current_page_content():
@@ -614,7 +1193,7 @@ MY QUESTION:
             else:
                 response = "Failed to extract content. See logs for details."
         else:
-            # Default to automation command
+            # Automation commands, and questions when no page has been extracted yet
             logging.info(f"Processing as an automation command: {user_input}")
             response = self.run_command(user_input)
 
@@ -628,7 +1207,202 @@ MY QUESTION:
         return response
 
 
+def crawl_main(args):
+    """Run a bulk crawl from seed URLs, streaming extracted pages to a JSONL file"""
+    seeds = list(args.seeds)
+    if args.delay is not None:
+        # Pacing is done by the shared per-domain rate limiter that navigate() waits on
+        default_rate_limiter.configure(default_rate=1.0 / args.delay)
+    if args.seed_file:
+        with open(args.seed_file, "r", encoding="utf-8") as f:
+            seeds.extend(line.strip() for line in f if line.strip())
+
+    automations = [
+        BrowserAutomationWithScraper(args.api_key, backend=args.backend, session_identity=args.session)
+        for _ in range(max(1, args.workers))
+    ]
+    try:
+        crawler = Crawler(
+            automations,
+            output_file=args.output,
+            state_file=args.state_file,
+            follow=args.follow,
+            include=args.include,
+            exclude=args.exclude,
+            max_depth=args.max_depth,
+            max_pages=args.max_pages,
+            max_per_domain=args.max_per_domain,
+            max_frontier=args.max_frontier,
+            scroll=args.scroll
+        )
+        crawler.add_seeds(seeds)
+        stats = crawler.run()
+        print(json.dumps(stats, indent=2))
+    finally:
+        for automation in automations:
+            automation.close()
+
+
+def _batch_open(automation, job):
+    """Navigate to the job's URL, if any, before running it"""
+    url = job.get("url")
+    if url:
+        automation.navigate(url)
+        automation.wait_for_page_load()
+        automation.handle_popups()
+
+
+def _batch_command(automation, job):
+    return automation.run_command(job["command"], job.get("code"))
+
+
+def _batch_extract(automation, job):
+    _batch_open(automation, job)
+    if not automation.extract_current_page_content():
+        raise RuntimeError("Failed to extract content")
+    return {
+        "url": automation.current_url,
+        "title": automation.structured_data.get("title"),
+        "headers": automation.structured_data.get("headers"),
+        "tables": automation.structured_data.get("tables"),
+        "content_length": len(automation.content)
+    }
+
+
+def _batch_ask(automation, job):
+    if job.get("url") or not automation.content:
+        _batch_open(automation, job)
+        if not automation.extract_current_page_content():
+            raise RuntimeError("Failed to extract content")
+    return automation.query_content(job["question"])
+
+
+BATCH_HANDLERS = {
+    "command": _batch_command,
+    "extract": _batch_extract,
+    "ask": _batch_ask
+}
+
+
+def _drop_supplied_code(jobs, allow_job_code=False):
+    """Yield jobs with any "code" field removed, unless running supplied code was explicitly allowed.
+
+    The job file is untrusted input, so by default its command jobs are generated through the normal path.
+    """
+    for job in jobs:
+        if "code" in job and not allow_job_code:
+            logging.warning(f"Ignoring supplied code for job {job.get('id')}; pass --allow-job-code to run it")
+            job = dict(job)
+            del job["code"]
+        yield job
+
+
+def _pregenerate_code(api_key, jobs, use_batch_api=True):
+    """Generate code up front, in one LLM batch, for the command jobs that open their own page.
+
+    Prompts are built without a browser, since none of these depend on the page a worker has open.
+    """
+    command_jobs = [job for job in jobs if job.get("type") == "command" and "code" not in job
+                    and opens_own_page(job.get("command", ""))]
+    if command_jobs:
+        automation = BrowserAutomationWithScraper(api_key, start_browser=False)
+        try:
+            codes = automation.get_code_for_commands([job["command"] for job in command_jobs],
+                                                     use_batch_api=use_batch_api)
+        finally:
+            automation.close()
+        for job, code in zip(command_jobs, codes):
+            # Jobs whose generation failed keep no code and fall back to a live call
+            if code:
+                job["code"] = code
+    return jobs
+
+
+def batch_main(args):
+    """Run a JSONL file of jobs non-interactively and print a throughput/latency summary"""
+    runner = BatchRunner(
+        lambda: BrowserAutomationWithScraper(args.api_key, backend=args.backend, session_identity=args.session),
+        BATCH_HANDLERS,
+        workers=args.workers,
+        output=args.output
+    )
+    jobs = _drop_supplied_code(read_jobs(args.jobs), args.allow_job_code)
+    if args.llm_batch:
+        jobs = _pregenerate_code(args.api_key, list(jobs), use_batch_api=not args.no_batch_api)
+    summary = runner.run(jobs)
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return summary
+
+
+def cli_main(argv):
+    """Non-interactive command line entry point"""
+    parser = argparse.ArgumentParser(description="Claude-Powered Web Automation & Scraper")
+    parser.add_argument("--api-key", default=None, help="Claude API key (defaults to ANTHROPIC_API_KEY)")
+    parser.add_argument("--trace-file", default=None, help="Write OpenTelemetry JSON traces to this file")
+    parser.add_argument("--backend", default="webdriver", choices=["webdriver", "cdp"],
+                        help="Browser control backend")
+    parser.add_argument("--session", default=None, help="Site identity whose saved cookies to load and update")
+    parser.add_argument("--rate", type=positive_rate, default=1.0, help="Page loads per second allowed per domain")
+    parser.add_argument("--ignore-robots", action="store_true", help="Do not apply robots.txt crawl-delay")
+    parser.add_argument("--log-level", default=None, help="Log level (defaults to LOG_LEVEL or INFO)")
+    parser.add_argument("--log-json", action="store_true", help="Write logs as JSON lines")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--metrics-file", default=None, help="Write a JSON metrics snapshot to this file every minute")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser("crawl", help="Crawl pages starting from seed URLs")
+    crawl_parser.add_argument("seeds", nargs="*", help="Seed URLs")
+    crawl_parser.add_argument("--seed-file", help="File with one seed URL per line")
+    crawl_parser.add_argument("--output", default="crawl_output.jsonl", help="JSONL output file")
+    crawl_parser.add_argument("--state-file", default=None, help="Checkpoint file used to resume (default: <output>.state.json)")
+    crawl_parser.add_argument("--follow", default="same-host", choices=["none", "same-host", "same-domain", "seeds", "any"],
+                              help="Which discovered links to follow")
+    crawl_parser.add_argument("--include", default=None, help="Only follow links matching this regex")
+    crawl_parser.add_argument("--exclude", default=None, help="Never follow links matching this regex")
+    crawl_parser.add_argument("--max-depth", type=int, default=2)
+    crawl_parser.add_argument("--max-pages", type=int, default=1000,
+                              help="Pages to crawl in this run (a resumed crawl gets a fresh budget)")
+    crawl_parser.add_argument("--max-frontier", type=int, default=100000, help="Maximum number of queued URLs")
+    crawl_parser.add_argument("--delay", type=positive_rate, default=None,
+                              help="Minimum seconds between requests to one domain (sets --rate to 1/delay)")
+    crawl_parser.add_argument("--max-per-domain", type=int, default=1, help="Concurrent pages per domain")
+    crawl_parser.add_argument("--workers", type=int, default=1, help="Number of browser instances")
+    crawl_parser.add_argument("--scroll", action="store_true", help="Scroll each page to load lazy content")
+    crawl_parser.set_defaults(handler=crawl_main)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Run jobs from a JSONL file ({\"type\": \"command\"|\"extract\"|\"ask\", ...})")
+    batch_parser.add_argument("jobs", help="JSONL job file, or '-' for stdin")
+    batch_parser.add_argument("--output", default="-", help="JSONL results file (default: stdout)")
+    batch_parser.add_argument("--workers", type=int, default=1, help="Number of parallel browser instances")
+    batch_parser.add_argument("--llm-batch", action="store_true",
+                              help="Generate code up front, in one Message Batches request, for command jobs that name "
+                                   "the site they act on")
+    batch_parser.add_argument("--no-batch-api", action="store_true",
+                              help="With --llm-batch, send the requests concurrently instead of via the Batches API")
+    batch_parser.add_argument("--allow-job-code", action="store_true",
+                              help="Run the Python \"code\" given in command jobs instead of generating it. "
+                                   "Only use with job files you trust")
+    batch_parser.set_defaults(handler=batch_main)
+
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level, args.log_json or None)
+    start_exporters(args.metrics_port, args.metrics_file)
+    default_rate_limiter.configure(args.rate, not args.ignore_robots)
+    try:
+        return args.handler(args)
+    finally:
+        if args.trace_file:
+            tracer.export_otlp(args.trace_file)
+
+
 def main():
+    if len(sys.argv) > 1:
+        return cli_main(sys.argv[1:])
+
+    configure_logging()
+    start_exporters()
+
     print("=" * 60)
     print("Claude-Powered Web Automation & Scraper - Conversational".center(60))
     print("=" * 60)
@@ -663,6 +1437,9 @@ def main():
                 print("- Querying content: Ask any question about the current page")
                 print("- Save content: 'Save the extracted content'")
                 print("- Save history: 'Save conversation history'")
+                print("- Timing of the last request: 'timing'")
+                print("- Per-model latency, token and success stats: 'models'")
+                print("- Live process metrics (Prometheus format): 'metrics'")
                 print("- Exit: 'exit', 'quit', or 'bye'")
                 continue
 
@@ -672,6 +1449,18 @@ def main():
                 automation.save_content(filename)
                 continue
 
+            if user_input.lower() == 'timing':
+                print(tracer.flame_summary())
+                continue
+
+            if user_input.lower() == 'models':
+                print(json.dumps(automation.model_router.report(), indent=2))
+                continue
+
+            if user_input.lower() == 'metrics':
+                print(metrics.render())
+                continue
+
             if user_input.lower() == 'save history':
                 filename = input(
                     "Enter filename to save conversation history (default: conversation_history.json): ").strip() or "conversation_history.json"
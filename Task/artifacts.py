@@ -0,0 +1,194 @@
+import atexit
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from metrics import metrics
+from tracing import tracer
+
+
+class ArtifactStore:
+    """Content-addressed store for generated code, screenshots and other run artifacts.
+
+    put() only hashes the data and queues it; a background thread compresses (zstd, or gzip
+    without zstandard; PNG screenshots become lossless WebP when Pillow is available), writes
+    the file, appends an index.jsonl entry linking it to its command and trace, and applies
+    size/age retention.
+    """
+
+    def __init__(self, directory="artifacts", max_bytes=500 * 1024 * 1024, max_age_days=14, retention_every=50):
+        self.directory = directory
+        self.index_file = os.path.join(directory, "index.jsonl")
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.retention_every = retention_every
+        self.queue = queue.Queue()
+        self.writes = 0
+        self.thread = threading.Thread(target=self._writer, name="artifact-writer", daemon=True)
+        self.thread.start()
+        self.queue.put(("retention", None))
+
+    def _extension(self, kind, extension):
+        if extension == "png" and Image is not None:
+            return "webp"
+        if extension in ("png", "jpg", "jpeg", "webp", "gz", "zst"):
+            return extension
+        return f"{extension}.{'zst' if zstandard is not None else 'gz'}"
+
+    def put(self, data, kind, extension, command=None, metadata=None):
+        """Queue data for writing and return its relative path; never touches the disk on the caller's thread"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        path = os.path.join(kind, digest[:2], f"{digest}.{self._extension(kind, extension)}")
+        span = tracer.current_span()
+        entry = {
+            "id": digest,
+            "path": path,
+            "kind": kind,
+            "bytes": len(data),
+            "created": time.time(),
+            "command": command,
+            "trace_id": span.trace_id if span is not None else None,
+            "metadata": metadata or {}
+        }
+        self.queue.put(("write", (data, entry)))
+        return path
+
+    def _encode(self, data, path):
+        if path.endswith(".webp"):
+            output = io.BytesIO()
+            Image.open(io.BytesIO(data)).save(output, "WEBP", lossless=True)
+            return output.getvalue()
+        if path.endswith(".zst"):
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        if path.endswith(".gz"):
+            return gzip.compress(data, compresslevel=6)
+        return data
+
+    def _write(self, data, entry):
+        full_path = os.path.join(self.directory, entry["path"])
+        exists = os.path.exists(full_path)
+        metrics.inc("cache_lookups_total", cache="artifacts", result="hit" if exists else "miss")
+        if not exists:
+            # Identical content is stored once; later puts only add index entries
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            encoded = self._encode(data, entry["path"])
+            temp_file = f"{full_path}.tmp"
+            with open(temp_file, "wb") as f:
+                f.write(encoded)
+            os.replace(temp_file, full_path)
+        entry["stored_bytes"] = os.path.getsize(full_path)
+        with open(self.index_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def _read_index(self):
+        entries = []
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        return entries
+
+    def _apply_retention(self):
+        """Drop artifacts past max_age, then the oldest until the store fits in max_bytes"""
+        entries = self._read_index()
+        if not entries:
+            return
+        cutoff = time.time() - self.max_age
+        newest = {}
+        sizes = {}
+        for entry in entries:
+            newest[entry["path"]] = max(newest.get(entry["path"], 0), entry["created"])
+            sizes[entry["path"]] = entry.get("stored_bytes", 0)
+        keep = {path for path, created in newest.items() if created >= cutoff}
+        total = sum(sizes[path] for path in keep)
+        for path in sorted(keep, key=lambda p: newest[p]):
+            if total <= self.max_bytes:
+                break
+            keep.discard(path)
+            total -= sizes[path]
+
+        removed = [path for path in newest if path not in keep]
+        for path in removed:
+            try:
+                os.remove(os.path.join(self.directory, path))
+            except FileNotFoundError:
+                pass
+        if removed:
+            temp_file = f"{self.index_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    if entry["path"] in keep:
+                        f.write(json.dumps(entry) + "\n")
+            os.replace(temp_file, self.index_file)
+            logging.info(f"Artifact retention removed {len(removed)} files ({total} bytes kept)")
+
+    def _writer(self):
+        while True:
+            task, payload = self.queue.get()
+            try:
+                if task == "stop":
+                    return
+                os.makedirs(self.directory, exist_ok=True)
+                if task == "write":
+                    self._write(*payload)
+                    self.writes += 1
+                    if self.writes % self.retention_every == 0:
+                        self._apply_retention()
+                elif task == "retention":
+                    self._apply_retention()
+            except Exception as e:
+                logging.error(f"Artifact store error ({task}): {str(e)}")
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """Block until every queued artifact has been written"""
+        self.queue.join()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(("stop", None))
+            self.thread.join(timeout=10)
+
+    def find(self, command=None, trace_id=None, kind=None):
+        """Index entries matching a command, trace and/or kind (after pending writes finish)"""
+        self.flush()
+        return [entry for entry in self._read_index()
+                if (command is None or entry["command"] == command)
+                and (trace_id is None or entry["trace_id"] == trace_id)
+                and (kind is None or entry["kind"] == kind)]
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    """Process-wide store shared by every automation instance, created on first use"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore()
+            atexit.register(_default_store.close)
+        return _default_store
@@ -0,0 +1,197 @@
+import base64
+import json
+import logging
+import time
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from page_scripts import EVALUATE_CANDIDATES_SCRIPT
+
+# Third-party resources that are safe to drop when only page content matters
+DEFAULT_BLOCKED_URLS = [
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*doubleclick.net*", "*google-analytics.com*", "*googletagmanager.com*", "*facebook.net*"
+]
+
+
+class WebDriverBackend:
+    """Page access through classic WebDriver commands"""
+
+    name = "webdriver"
+    supports_network_events = False
+
+    def __init__(self, browser):
+        self.browser = browser
+
+    def page_html(self):
+        return self.browser.page_source
+
+    def call_script(self, script, *args):
+        """Run a page_scripts snippet with JSON-serializable arguments and return its result"""
+        return self.browser.execute_script(script, *args)
+
+    def call_async_script(self, script, *args):
+        """Run an async page_scripts snippet, whose last argument is the callback it reports its result to"""
+        return self.browser.execute_async_script(script, *args)
+
+    def evaluate_candidates(self, selectors, max_chars, text_limit):
+        """First-match text for each selector plus a bounded slice of main-content text"""
+        return self.call_script(EVALUATE_CANDIDATES_SCRIPT, selectors, max_chars, text_limit)
+
+    def wait_network_idle(self, timeout=10, idle_time=0.5):
+        """Without network events, the best available signal is document.readyState"""
+        try:
+            WebDriverWait(self.browser, timeout).until(
+                lambda driver: driver.execute_script("return document.readyState") == "complete"
+            )
+            return True
+        except Exception:
+            return False
+
+    def block_urls(self, patterns):
+        logging.warning("Request blocking requires the CDP backend")
+        return False
+
+    def drain_events(self):
+        return []
+
+    def start_capture(self):
+        logging.warning("Network response capture requires the CDP backend")
+        return False
+
+    def captured_json(self, max_bodies=50, max_bytes=2_000_000):
+        return []
+
+
+class CdpBackend(WebDriverBackend):
+    """Page access through Chrome DevTools Protocol commands sent with execute_cdp_cmd.
+
+    Each command is still one WebDriver round trip, so scripts cost about the same as with
+    WebDriverBackend. What this backend adds is the network layer: idle detection, JSON
+    response capture and request blocking. Network events are read from Chrome's performance
+    log, which needs the goog:loggingPrefs {"performance": "ALL"} capability set in setup_browser.
+    """
+
+    name = "cdp"
+    supports_network_events = True
+
+    def __init__(self, browser):
+        super().__init__(browser)
+        self.inflight = set()
+        self.last_activity = time.monotonic()
+        self.capturing = False
+        self.captured = {}
+        self.browser.execute_cdp_cmd("Network.enable", {})
+
+    def evaluate(self, expression):
+        """Evaluate a JavaScript expression in the page and return its JSON value"""
+        result = self.browser.execute_cdp_cmd("Runtime.evaluate", {
+            "expression": expression,
+            "returnByValue": True,
+            "awaitPromise": True
+        })
+        if "exceptionDetails" in result:
+            raise RuntimeError(result["exceptionDetails"].get("text", "JavaScript evaluation failed"))
+        return result["result"].get("value")
+
+    def call_script(self, script, *args):
+        """Run a page_scripts snippet (written for execute_script) through Runtime.evaluate"""
+        return self.evaluate(f"(function() {{{script}}}).apply(null, {json.dumps(list(args))})")
+
+    def call_async_script(self, script, *args):
+        """Run an async snippet through Runtime.evaluate, resolving a promise where it calls its callback"""
+        return self.evaluate(
+            f"new Promise(function(resolve) {{ (function() {{{script}}}).apply(null, "
+            f"{json.dumps(list(args))}.concat([resolve])); }})"
+        )
+
+    def page_html(self):
+        """Serialized DOM in one round trip"""
+        return self.evaluate("document.documentElement.outerHTML")
+
+    def block_urls(self, patterns):
+        """Block matching requests at the network layer (fonts, trackers, ...)"""
+        self.browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+        logging.info(f"Blocking {len(patterns)} URL patterns")
+        return True
+
+    def drain_events(self):
+        """Read pending Network.* events from the performance log and update in-flight tracking"""
+        try:
+            entries = self.browser.get_log("performance")
+        except Exception as e:
+            logging.debug(f"Performance log unavailable: {str(e)}")
+            return []
+        events = []
+        for entry in entries:
+            message = json.loads(entry["message"]).get("message", {})
+            method = message.get("method", "")
+            if not method.startswith("Network."):
+                continue
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+            if method == "Network.requestWillBeSent":
+                self.inflight.add(request_id)
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                self.inflight.discard(request_id)
+                if request_id in self.captured:
+                    self.captured[request_id]["finished"] = method == "Network.loadingFinished"
+            elif method == "Network.responseReceived" and self.capturing:
+                response = params.get("response", {})
+                # Only the page's own API calls; JSON loaded as scripts, prefetches etc. is skipped
+                if (params.get("type") in ("XHR", "Fetch") and "json" in response.get("mimeType", "")
+                        and response.get("status", 0) < 400):
+                    self.captured[request_id] = {"url": response.get("url"), "finished": False}
+            self.last_activity = time.monotonic()
+            events.append(message)
+        return events
+
+    def start_capture(self):
+        """Start recording JSON responses; call before navigating"""
+        self.drain_events()
+        self.captured = {}
+        self.capturing = True
+        return True
+
+    def captured_json(self, max_bodies=50, max_bytes=2_000_000):
+        """Fetch and parse bodies of the JSON responses recorded since start_capture()"""
+        self.drain_events()
+        self.capturing = False
+        payloads = []
+        for request_id, info in list(self.captured.items())[:max_bodies]:
+            if not info["finished"]:
+                continue
+            try:
+                result = self.browser.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                body = result["body"]
+                if result.get("base64Encoded"):
+                    body = base64.b64decode(body).decode("utf-8", errors="replace")
+                if len(body) > max_bytes:
+                    continue
+                payloads.append((info["url"], json.loads(body)))
+            except Exception as e:
+                logging.debug(f"Could not read response body for {info['url']}: {str(e)}")
+        logging.info(f"Captured {len(payloads)} JSON responses")
+        return payloads
+
+    def wait_network_idle(self, timeout=10, idle_time=0.5):
+        """Wait until no requests have been in flight for idle_time seconds"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            self.drain_events()
+            if not self.inflight and time.monotonic() - self.last_activity >= idle_time:
+                return True
+            time.sleep(0.05)
+        logging.debug(f"Network not idle after {timeout}s ({len(self.inflight)} requests in flight)")
+        self.inflight.clear()
+        return False
+
+
+def make_backend(browser, kind="webdriver"):
+    """Create the page backend named by kind, falling back to WebDriver if CDP is unavailable"""
+    if kind == "cdp":
+        try:
+            return CdpBackend(browser)
+        except Exception as e:
+            logging.warning(f"CDP backend unavailable, using WebDriver: {str(e)}")
+    return WebDriverBackend(browser)
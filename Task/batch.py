@@ -0,0 +1,147 @@
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+
+
+def read_jobs(path):
+    """Yield job dicts from a JSONL file ('-' reads from stdin), skipping blank and invalid lines"""
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                logging.error(f"Skipping invalid job on line {line_number}: {str(e)}")
+                continue
+            if not isinstance(job, dict):
+                logging.error(f"Skipping invalid job on line {line_number}: expected a JSON object, "
+                              f"got {type(job).__name__}")
+                continue
+            job.setdefault("id", line_number)
+            yield job
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def percentile(values, pct):
+    """Return the pct-th percentile of values using linear interpolation"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class BatchRunner:
+    """Run JSONL jobs against a pool of automation instances, one instance per worker thread"""
+
+    def __init__(self, factory, handlers, workers=1, output=None):
+        self.factory = factory
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.output = output
+        self.latencies = {}
+        self.errors = 0
+        self.completed = 0
+        self.lock = threading.Lock()
+
+    def _run_job(self, automation, job):
+        job_type = job.get("type")
+        handler = self.handlers.get(job_type)
+        if handler is None:
+            raise ValueError(f"Unknown job type '{job_type}' (expected one of: {', '.join(self.handlers)})")
+        return handler(automation, job)
+
+    def _write(self, sink, record):
+        with self.lock:
+            sink.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            sink.flush()
+
+    def _worker(self, jobs, sink):
+        automation = None
+        try:
+            automation = self.factory()
+        except Exception as e:
+            logging.error(f"Worker failed to start: {str(e)}")
+
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            start = time.perf_counter()
+            record = {"id": job.get("id"), "type": job.get("type")}
+            try:
+                if automation is None:
+                    raise RuntimeError("automation instance is not available")
+                record["result"] = self._run_job(automation, job)
+                record["status"] = "ok"
+            except Exception as e:
+                logging.error(f"Job {job.get('id')} failed: {str(e)}")
+                record["status"] = "error"
+                record["error"] = str(e)
+            elapsed = time.perf_counter() - start
+            record["elapsed"] = round(elapsed, 3)
+            with self.lock:
+                self.completed += 1
+                if record["status"] == "error":
+                    self.errors += 1
+                self.latencies.setdefault(job.get("type"), []).append(elapsed)
+            self._write(sink, record)
+
+        if automation is not None:
+            automation.close()
+
+    def run(self, jobs):
+        """Process all jobs and return a throughput/latency summary"""
+        job_queue = queue.Queue(maxsize=self.workers * 4)
+        sink = open(self.output, "w", encoding="utf-8") if self.output and self.output != "-" else sys.stdout
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._worker, args=(job_queue, sink), daemon=True)
+            for _ in range(self.workers)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for job in jobs:
+                job_queue.put(job)
+            for _ in threads:
+                job_queue.put(None)
+            for thread in threads:
+                thread.join()
+        finally:
+            if sink is not sys.stdout:
+                sink.close()
+        return self.summary(time.perf_counter() - start)
+
+    def summary(self, elapsed):
+        """Summarize throughput and latency percentiles overall and per job type"""
+        all_latencies = [value for values in self.latencies.values() for value in values]
+
+        def stats(values):
+            return {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 3),
+                "p90": round(percentile(values, 90), 3),
+                "p99": round(percentile(values, 99), 3),
+                "max": round(max(values), 3) if values else 0.0
+            }
+
+        return {
+            "jobs": self.completed,
+            "errors": self.errors,
+            "workers": self.workers,
+            "elapsed": round(elapsed, 3),
+            "jobs_per_second": round(self.completed / elapsed, 3) if elapsed else 0.0,
+            "latency": stats(all_latencies),
+            "by_type": {job_type: stats(values) for job_type, values in self.latencies.items()}
+        }
@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from compaction import BoilerplateTracker, compact_content, estimate_tokens, fit_to_budget
+
+NAV = ["Home", "Electronics", "Mobiles", "Laptops", "Fashion", "Home & Kitchen", "Beauty", "Toys", "Sports",
+       "Books", "Grocery", "Offers", "Gift Cards", "Sell on Site", "Customer Service", "Track Order"]
+FOOTER = [
+    "About Us | Careers | Press | Corporate Information",
+    "Payments: Credit Card, Debit Card, Net Banking, UPI, Cash on Delivery",
+    "Registered Office Address: 42 Example Street, Bengaluru, 560103, India",
+    "We use cookies to improve your experience. By continuing you agree to our cookie policy.",
+    "© 2007-2024 Example Retail Pvt. Ltd. All rights reserved."
+]
+FACTS = [
+    "The battery lasts {n} hours on a single charge.",
+    "The warranty period is {n} months from the date of purchase.",
+    "Delivery to your pincode takes {n} business days.",
+    "The device weighs {n}0 grams.",
+    "Returns are accepted within {n} days of delivery."
+]
+
+
+def build_page(index, rng):
+    """Extracted-content string in the format _store_content produces, plus the facts it contains"""
+    blocks = [f"# Product {index} - Example Phone {index} Pro"]
+    blocks.extend(f"- {item}" for item in NAV)
+    facts = [fact.format(n=rng.randint(2, 24)) for fact in FACTS]
+    for fact in facts:
+        blocks.append(f"{fact}   Customers   often   ask  about   this.")
+    # List items that differ only in their numbers are separate facts and must all survive
+    variants = [f"- {size} GB: Rs {rng.randint(50, 99)},{rng.randint(100, 999)}" for size in (128, 256, 512)]
+    blocks.extend(variants)
+    facts.extend(variants)
+    # Review snippets repeated with different case, spacing and punctuation
+    for review in range(30):
+        blocks.append(rng.choice(["- Great phone, value for money!", "- great phone,  value for money",
+                                  "- Great phone - value for money."]))
+        if review % 3 == 0:
+            blocks.append(f"- Battery could be better {review % 2 + 1}")
+    blocks.append("TABLE:")
+    blocks.append("Spec | Value")
+    blocks.extend(f"Spec {row} | {rng.randint(1, 99)}" for row in range(20))
+    blocks.extend(FOOTER)
+    blocks.extend(["You might also like"] * 3)
+    return f"https://shop.example.com/p/{index}", "\n\n".join(blocks), facts
+
+
+def legacy_prompt_content(content, max_content_length=50000):
+    """What query_content sent before compaction: the raw content, cut at 50k characters"""
+    if len(content) > max_content_length:
+        return content[:max_content_length] + "\n[Content truncated due to length]"
+    return content
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Input tokens per question before and after content compaction")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--budget", type=int, default=12000, help="Input token budget passed to fit_to_budget")
+    parser.add_argument("--exact", action="store_true",
+                        help="Count tokens with the Anthropic count_tokens API (needs ANTHROPIC_API_KEY)")
+    parser.add_argument("--model", default="claude-3-haiku-20240307")
+    args = parser.parse_args()
+
+    count_tokens = estimate_tokens
+    if args.exact:
+        import anthropic
+        client = anthropic.Anthropic()
+
+        def count_tokens(text):
+            return client.messages.count_tokens(
+                model=args.model, messages=[{"role": "user", "content": text}]
+            ).input_tokens
+
+    rng = random.Random(7)
+    tracker = BoilerplateTracker()
+    before_tokens = after_tokens = facts_total = facts_kept = 0
+    compaction_time = 0.0
+    for index in range(args.pages):
+        url, content, facts = build_page(index, rng)
+        tracker.observe(url, content)
+
+        start = time.perf_counter()
+        compacted, _ = compact_content(content, url, tracker)
+        compacted, tokens = fit_to_budget(compacted, args.budget, count_tokens)
+        compaction_time += time.perf_counter() - start
+
+        before_tokens += count_tokens(legacy_prompt_content(content))
+        after_tokens += tokens
+        facts_total += len(facts)
+        # Answer quality proxy: every fact a question could ask about must survive compaction
+        facts_kept += sum(fact in compacted for fact in facts)
+
+    report = {
+        "pages": args.pages,
+        "token_counting": "exact" if args.exact else "estimate",
+        "mean_input_tokens_before": round(before_tokens / args.pages),
+        "mean_input_tokens_after": round(after_tokens / args.pages),
+        "token_reduction": round(1 - after_tokens / before_tokens, 3) if before_tokens else 0.0,
+        "fact_recall": round(facts_kept / facts_total, 3) if facts_total else 1.0,
+        "mean_compaction_ms": round(compaction_time / args.pages * 1000, 2)
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+CANNED_RULES = '{"title": "h1.product-title", "rating": "div._3LWZlK", "price": "div._30jeq3", "reviews": "span._2_R_DZ"}'
+
+CANNED_CODE = """from selenium.webdriver.common.by import By
+import logging
+try:
+    browser.get("{base_url}/product.html")
+    wait_for_page_load()
+    handle_popups()
+    title = browser.find_element(By.TAG_NAME, "h1").text
+    logging.info(f"Found title: {{title}}")
+except Exception as e:
+    logging.error(f"Automation failed: {{str(e)}}")
+finally:
+    random_sleep(0, 0)"""
+
+CANNED_ANSWER = "The product is rated 4.6 out of 5 and costs ₹69,999."
+
+
+def build_table_page(rows, cols):
+    """Generate a large HTML table with a header row, a colspan header and numeric cells"""
+    header = "".join(f"<th>Column {c}</th>" for c in range(cols))
+    body = "".join(
+        "<tr>" + f"<td>Item {r}</td>" + "".join(f"<td>{(r * cols + c) * 1.5:,.2f}</td>" for c in range(1, cols)) + "</tr>"
+        for r in range(rows)
+    )
+    return (f"<!DOCTYPE html><html><head><title>Large Table ({rows} rows)</title></head><body>"
+            f"<h1>Price Comparison</h1><table><thead><tr><th colspan=\"{cols}\">Comparison</th></tr>"
+            f"<tr>{header}</tr></thead><tbody>{body}</tbody></table></body></html>")
+
+
+def build_reviews(page, per_page=10):
+    return {
+        "page": page,
+        "reviews": [
+            {"id": page * per_page + i, "rating": 1 + (page + i) % 5, "text": f"Review number {page * per_page + i}"}
+            for i in range(per_page)
+        ]
+    }
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves fixture pages, a JSON reviews API and a stub of the Anthropic Messages API"""
+
+    llm_latency = 0.0
+    llm_calls = 0
+
+    def log_message(self, format, *args):
+        logging.debug(f"fixture server: {format % args}")
+
+    def _send(self, status, body, content_type):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path == "/table.html":
+            rows = int(query.get("rows", ["1000"])[0])
+            cols = int(query.get("cols", ["8"])[0])
+            return self._send(200, build_table_page(rows, cols), "text/html; charset=utf-8")
+        if parts.path == "/api/reviews":
+            page = int(query.get("page", ["0"])[0])
+            return self._send(200, json.dumps(build_reviews(page)), "application/json")
+
+        filename = os.path.normpath(os.path.join(FIXTURES_DIR, parts.path.lstrip("/") or "product.html"))
+        if not filename.startswith(FIXTURES_DIR) or not os.path.isfile(filename):
+            return self._send(404, "<html><head><title>Not Found</title></head><body><h1>404</h1></body></html>",
+                              "text/html; charset=utf-8")
+        with open(filename, "rb") as f:
+            return self._send(200, f.read(), "text/html; charset=utf-8")
+
+    def do_POST(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if parts.path.rstrip("/") != "/v1/messages":
+            return self._send(404, json.dumps({"type": "error", "error": {"type": "not_found_error"}}),
+                              "application/json")
+
+        type(self).llm_calls += 1
+        if self.llm_latency:
+            time.sleep(self.llm_latency)
+
+        system = payload.get("system") or ""
+        if not isinstance(system, str):
+            system = " ".join(block.get("text", "") for block in system)
+        if "web scraping" in system:
+            text = CANNED_RULES
+        elif "Selenium automation" in system:
+            text = CANNED_CODE.format(base_url=f"http://{self.headers.get('Host')}")
+        else:
+            text = CANNED_ANSWER
+
+        content = [{"type": "text", "text": text}]
+        stop_reason = "end_turn"
+        if payload.get("tools") and text == CANNED_RULES:
+            content = [{
+                "type": "tool_use",
+                "id": f"toolu_fixture_{self.llm_calls}",
+                "name": payload["tools"][0]["name"],
+                "input": {"rules": json.loads(CANNED_RULES)}
+            }]
+            stop_reason = "tool_use"
+
+        response = {
+            "id": f"msg_fixture_{self.llm_calls}",
+            "type": "message",
+            "role": "assistant",
+            "model": payload.get("model", "fixture-model"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": max(1, length // 4), "output_tokens": max(1, len(text) // 4)}
+        }
+        return self._send(200, json.dumps(response), "application/json")
+
+
+def start_server(port=0, llm_latency=0.0):
+    """Start the fixture server on a background thread; returns (server, base_url)"""
+    FixtureHandler.llm_latency = llm_latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    logging.info(f"Fixture server listening on {base_url}")
+    return server, base_url
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    parser = argparse.ArgumentParser(description="Serve benchmark fixture pages and a stub Anthropic API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds of delay per stub LLM call")
+    args = parser.parse_args()
+    server, base_url = start_server(args.port, args.llm_latency)
+    print(f"Serving fixtures at {base_url} (set ANTHROPIC_BASE_URL={base_url} to use the stub LLM)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
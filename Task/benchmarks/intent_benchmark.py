@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from intent import IntentRouter, LABELED_EXAMPLES
+from batch import percentile
+
+# Held-out commands (not in intent.LABELED_EXAMPLES), all issued with a page already extracted
+LABELED_COMMANDS = [
+    ("find the shipping cost", "query"),
+    ("find the delivery date", "query"),
+    ("search this page for the refund policy", "query"),
+    ("search the content for the word warranty", "query"),
+    ("what's the battery life", "query"),
+    ("how long is the warranty", "query"),
+    ("who is the seller", "query"),
+    ("give me the total number of ratings", "query"),
+    ("summarise the reviews", "query"),
+    ("what colours are available?", "query"),
+    ("list the top 3 products", "query"),
+    ("which one has the best rating", "query"),
+    ("tell me about the return window", "query"),
+    ("is it in stock", "query"),
+    ("does the page mention emi options", "query"),
+    ("cheapest option?", "query"),
+    ("show me the table of specs", "query"),
+    ("the discount percentage", "query"),
+    ("get me the rating", "query"),
+    ("highlight the main conclusions", "query"),
+    ("extract the page again", "extract"),
+    ("scrape this", "extract"),
+    ("grab all the text", "extract"),
+    ("get data from this site", "extract"),
+    ("refresh content please", "extract"),
+    ("capture the current page content", "extract"),
+    ("parse the page", "extract"),
+    ("pull the content from here", "extract"),
+    ("extract", "extract"),
+    ("scrape the page content now", "extract"),
+    ("go to flipkart.com", "automate"),
+    ("open https://news.ycombinator.com", "automate"),
+    ("navigate to the reviews tab", "automate"),
+    ("click on add to cart", "automate"),
+    ("search for running shoes", "automate"),
+    ("search amazon for headphones", "automate"),
+    ("fill in the email field", "automate"),
+    ("log into gmail", "automate"),
+    ("download the invoice pdf", "automate"),
+    ("scroll to the bottom", "automate"),
+    ("go to the next page", "automate"),
+    ("press the submit button", "automate"),
+    ("sign in with google", "automate"),
+    ("visit bbc.com", "automate"),
+    ("type my address into the form", "automate"),
+    ("book the 7pm slot", "automate"),
+    ("select size 10", "automate"),
+    ("go back to the previous page", "automate"),
+    ("open the first search result", "automate"),
+    ("browse the deals section", "automate"),
+]
+
+# Chit-chat and noise with no page intent: the router should hand these off, never act on them
+OUT_OF_DOMAIN = ["hello", "hello there", "thanks", "ok", "good morning", "asdf", "cool", "yes please", "hmm", "lol"]
+
+_overlap = {text for text, _ in LABELED_COMMANDS + [(text, None) for text in OUT_OF_DOMAIN]} & {
+    text for text, _ in LABELED_EXAMPLES}
+assert not _overlap, f"Benchmark commands also appear in intent.LABELED_EXAMPLES: {sorted(_overlap)}"
+
+
+def legacy_route(user_input, has_current_page=True):
+    """The substring keyword routing process_natural_language_command used before IntentRouter"""
+    extraction_keywords = ["extract", "scrape", "get content", "get text", "get data"]
+    query_keywords = ["what", "who", "when", "where", "why", "how", "tell me", "explain", "find"]
+    looks_like_question = any(
+        user_input.lower().startswith(kw.lower()) for kw in query_keywords) or user_input.endswith("?")
+    if has_current_page and looks_like_question:
+        return "query"
+    if any(kw.lower() in user_input.lower() for kw in extraction_keywords):
+        return "extract"
+    return "automate"
+
+
+def evaluate(route, commands, repeats):
+    """Route every command repeats times; returns per-1000 misroute rates and latency"""
+    wrong = misrouted_to_llm_codegen = handoffs = total = 0
+    latencies = []
+    for _ in range(repeats):
+        for text, expected in commands:
+            start = time.perf_counter()
+            intent, handed_off = route(text)
+            latencies.append(time.perf_counter() - start)
+            total += 1
+            handoffs += handed_off
+            if intent != expected:
+                wrong += 1
+                if intent == "automate":
+                    # run_command: a code generation call plus browser navigation
+                    misrouted_to_llm_codegen += 1
+    per_1000 = 1000 / total
+    return {
+        "commands": total,
+        "misrouted_per_1000": round(wrong * per_1000, 1),
+        "misrouted_run_command_per_1000": round(misrouted_to_llm_codegen * per_1000, 1),
+        "llm_handoffs_per_1000": round(handoffs * per_1000, 1),
+        "p50_us": round(percentile(latencies, 50) * 1e6, 1),
+        "p95_us": round(percentile(latencies, 95) * 1e6, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy keyword routing with the local intent router")
+    parser.add_argument("--repeats", type=int, default=20, help="Passes over the labeled command set")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Router confidence threshold")
+    args = parser.parse_args()
+
+    router = IntentRouter(threshold=args.threshold)
+
+    def route_with_router(text):
+        # Low-confidence commands go to a cheap classification call; they are counted as
+        # handoffs and scored on the local guess, so misroutes here are an upper bound.
+        result = router.classify(text)
+        return result["intent"], not router.is_confident(result)
+
+    report = {
+        "legacy_keywords": evaluate(lambda text: (legacy_route(text), False), LABELED_COMMANDS, args.repeats),
+        "intent_router": evaluate(route_with_router, LABELED_COMMANDS, args.repeats),
+        # Out-of-domain input acted on without a handoff (legacy routing sends all of it to run_command)
+        "out_of_domain_acted_on": {
+            "legacy_keywords": sum(legacy_route(text) == "automate" for text in OUT_OF_DOMAIN),
+            "intent_router": sum(router.is_confident(router.classify(text)) for text in OUT_OF_DOMAIN),
+            "commands": len(OUT_OF_DOMAIN)
+        }
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
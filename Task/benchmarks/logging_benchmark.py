@@ -0,0 +1,85 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+
+from structured_logging import TEXT_FORMAT, configure_logging, shutdown_logging
+
+FIELDS = [(f"field_{index}", f"div.product span.value-{index}", "₹1,299.00 " * 20) for index in range(10)]
+SELECTORS = [f"div[class*='candidate-{index}']" for index in range(15)]
+
+
+def legacy_extraction_logs():
+    """The log calls one extract_data pass made before: eager f-strings, per-selector INFO lines"""
+    for field_name, selector, text in FIELDS:
+        for candidate in SELECTORS:
+            logging.debug(f"Adaptive selector '{candidate}' matched '{field_name}' on shop.example.com")
+        logging.info(f"Selector '{selector}' for '{field_name}' currently matches no elements")
+        logging.info(f"Successfully extracted '{field_name}': {text}")
+
+
+def extraction_logs():
+    """The same events as logged now: per-field events at DEBUG behind one level check, one INFO summary"""
+    debug = logging.root.isEnabledFor(logging.DEBUG)
+    for field_name, selector, text in FIELDS:
+        for candidate in SELECTORS:
+            logging.debug("Adaptive selector '%s' matched '%s' on %s", candidate, field_name, "shop.example.com",
+                          extra={"sample": "selector"})
+        logging.debug("Selector '%s' for '%s' currently matches no elements", selector, field_name,
+                      extra={"sample": "selector"})
+        if debug:
+            logging.debug("Successfully extracted '%s': %.200s", field_name, text)
+    logging.info("Extracted %d/%d fields from %s", len(FIELDS), len(FIELDS), "shop.example.com")
+
+
+def time_passes(func, passes):
+    """Microseconds of calling-thread CPU time per pass, so work done by the writer thread is excluded"""
+    start = time.thread_time()
+    for _ in range(passes):
+        func()
+    return (time.thread_time() - start) / passes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caller-side logging cost of one extract_data pass")
+    parser.add_argument("--passes", type=int, default=2000)
+    parser.add_argument("--level", default="INFO")
+    args = parser.parse_args()
+
+    report = {"level": args.level, "passes": args.passes}
+    with tempfile.TemporaryDirectory() as directory:
+        log_file = os.path.join(directory, "legacy.log")
+        root = logging.getLogger()
+        logging.basicConfig(level=args.level, format=TEXT_FORMAT, filename=log_file, force=True)
+        report["legacy_sync_us"] = round(time_passes(legacy_extraction_logs, args.passes), 2)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+
+        for name, options in (("sync_text_us", {"async_mode": False}),
+                              ("async_text_us", {}),
+                              ("async_json_us", {"json_output": True})):
+            configure_logging(args.level, filename=os.path.join(directory, f"{name}.log"), **options)
+            report[name] = round(time_passes(extraction_logs, args.passes), 2)
+            shutdown_logging()
+
+        logging.disable(logging.CRITICAL)
+        report["logging_disabled_us"] = round(time_passes(extraction_logs, args.passes), 2)
+        logging.disable(logging.NOTSET)
+
+    report["overhead_vs_disabled_us"] = round(report["async_text_us"] - report["logging_disabled_us"], 2)
+    legacy_gap = report["legacy_sync_us"] - report["logging_disabled_us"]
+    if legacy_gap > 0:
+        report["gap_closed"] = round(1 - report["overhead_vs_disabled_us"] / legacy_gap, 3)
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
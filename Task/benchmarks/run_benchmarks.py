@@ -0,0 +1,212 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARK_DIR))
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fixture_server import start_server, FixtureHandler
+from batch import percentile
+from rate_limit import rate_limiter
+
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+
+def no_sleep(*args, **kwargs):
+    """Replacement for random_sleep so human-mimicking delays don't dominate the measurements"""
+    return None
+
+
+def measure(name, func, iterations, setup=None):
+    """Run func repeatedly and collect latency, throughput and Python memory statistics"""
+    latencies = []
+    failures = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if setup:
+            setup()
+        tracemalloc.reset_peak()
+        call_start = time.perf_counter()
+        try:
+            result = func()
+            if result is False or (isinstance(result, dict) and "error" in result):
+                failures += 1
+        except Exception as e:
+            logging.error(f"Benchmark '{name}' iteration failed: {str(e)}")
+            failures += 1
+        latencies.append(time.perf_counter() - call_start)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = {
+        "iterations": iterations,
+        "failures": failures,
+        "mean": round(sum(latencies) / len(latencies), 4),
+        "p50": round(percentile(latencies, 50), 4),
+        "p95": round(percentile(latencies, 95), 4),
+        "max": round(max(latencies), 4),
+        "throughput": round(iterations / total, 3) if total else 0.0,
+        "peak_python_mb": round(peak / 1024 / 1024, 2)
+    }
+    logging.info(f"{name}: p50={stats['p50']}s p95={stats['p95']}s peak={stats['peak_python_mb']}MB")
+    return stats
+
+
+def process_rss_mb():
+    """Resident set size of this process in MB, where the platform reports it"""
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024, 1)
+    except ImportError:
+        return None
+
+
+def run_benchmarks(base_url, iterations, table_rows, keep_sleeps=False):
+    import Level1
+    import Level3
+
+    # The fixture server is local; per-domain pacing would only measure the limiter
+    rate_limiter.configure(default_rate=1000.0, respect_robots=False)
+
+    results = {}
+    simple = Level1.BrowserAutomation(os.environ["ANTHROPIC_API_KEY"])
+    scraper = Level3.BrowserAutomationWithScraper(os.environ["ANTHROPIC_API_KEY"])
+    if not keep_sleeps:
+        simple.random_sleep = no_sleep
+        scraper.random_sleep = no_sleep
+
+    try:
+        rules = {"title": "h1.product-title", "rating": "div._3LWZlK", "price": "div._30jeq3"}
+        results["extract_data.product"] = measure(
+            "extract_data.product",
+            lambda: simple.extract_data(f"{base_url}/product.html", rules),
+            iterations
+        )
+        results["get_extraction_rules_from_claude"] = measure(
+            "get_extraction_rules_from_claude",
+            lambda: simple.get_extraction_rules_from_claude(f"{base_url}/product.html", "rating, price"),
+            iterations
+        )
+
+        pages = {
+            "product": f"{base_url}/product.html",
+            "popup": f"{base_url}/popup.html",
+            "infinite_scroll": f"{base_url}/scroll.html?pages=10",
+            "large_table": f"{base_url}/table.html?rows={table_rows}&cols=8"
+        }
+        for label, url in pages.items():
+            def load(url=url):
+                scraper.browser.get(url)
+                scraper.wait_for_page_load()
+                scraper.handle_popups()
+                scraper.scroll_page()
+            name = f"extract_current_page_content.{label}"
+            results[name] = measure(name, scraper.extract_current_page_content, iterations, setup=load)
+
+        scraper.browser.get(pages["product"])
+        scraper.extract_current_page_content()
+        results["query_content"] = measure(
+            "query_content",
+            lambda: scraper.query_content("What is the rating of this product?"),
+            iterations
+        )
+        results["run_command"] = measure(
+            "run_command",
+            lambda: scraper.run_command("Open the product page and read the title"),
+            iterations
+        )
+    finally:
+        simple.close()
+        scraper.close()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions where p50 latency or peak memory grew beyond the tolerance"""
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p50", "peak_python_mb"):
+            before, after = previous.get(metric), stats.get(metric)
+            if before and after and after > before * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    parser = argparse.ArgumentParser(description="Offline benchmarks against local fixtures and a stub LLM")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--table-rows", type=int, default=5000, help="Rows in the large table fixture")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds of delay per stub LLM call")
+    parser.add_argument("--keep-sleeps", action="store_true", help="Keep random_sleep delays in the measurements")
+    parser.add_argument("--output", default=None, help="Write results JSON to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    server, base_url = start_server(llm_latency=args.llm_latency)
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+    os.environ["ANTHROPIC_API_KEY"] = "fixture-key"
+
+    # Generated code files are written to the working directory; keep them out of the repo
+    original_dir = os.getcwd()
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    os.chdir(work_dir)
+    try:
+        start = time.time()
+        results = run_benchmarks(base_url, args.iterations, args.table_rows, args.keep_sleeps)
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "llm_latency": args.llm_latency,
+            "llm_calls": FixtureHandler.llm_calls,
+            "max_rss_mb": process_rss_mb(),
+            "elapsed": round(time.time() - start, 2),
+            "results": results
+        }
+    finally:
+        os.chdir(original_dir)
+        server.shutdown()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions compared to baseline:")
+            for regression in regressions:
+                print(f"- {regression}")
+            return 1
+        print("\nNo regressions compared to baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import re
+import threading
+from difflib import SequenceMatcher
+from urllib.parse import urlsplit
+
+TABLE_MARKER = "TABLE:"
+TRUNCATION_NOTE = "[Content truncated to fit the token budget]"
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) used when exact counting is unavailable"""
+    return (len(text) + 3) // 4
+
+
+def split_blocks(content):
+    return [block for block in content.split("\n\n") if block.strip()]
+
+
+def is_table_block(block):
+    return block == TABLE_MARKER or " | " in block
+
+
+def block_key(block):
+    """Fingerprint of a block that ignores case, whitespace and punctuation (numbers still count)"""
+    normalized = re.sub(r"[\W_]+", " ", block.lower()).strip()
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class BoilerplateTracker:
+    """Finds blocks repeated across pages of the same site (navigation, footers, cookie banners).
+
+    A block is boilerplate once it has been seen on at least min_pages distinct pages of a host
+    and on at least min_share of the host's pages, so facts shared by a few pages survive, as
+    does content the first couple of pages of a site happen to have in common.
+    Table blocks are never counted, so repeated column headers survive.
+    """
+
+    def __init__(self, min_pages=5, min_share=0.5, max_hosts=100, max_blocks=20000):
+        self.min_pages = min_pages
+        self.min_share = min_share
+        self.max_hosts = max_hosts
+        self.max_blocks = max_blocks
+        self.lock = threading.Lock()
+        self.hosts = {}  # host -> {"pages": set of urls, "blocks": {key: set of urls}}
+
+    def observe(self, url, content):
+        host = urlsplit(url or "").netloc
+        if not host:
+            return
+        keys = {block_key(block) for block in split_blocks(content) if not is_table_block(block)}
+        with self.lock:
+            if host not in self.hosts and len(self.hosts) >= self.max_hosts:
+                self.hosts.pop(next(iter(self.hosts)))
+            site = self.hosts.setdefault(host, {"pages": set(), "blocks": {}})
+            site["pages"].add(url)
+            for key in keys:
+                if key in site["blocks"] or len(site["blocks"]) < self.max_blocks:
+                    site["blocks"].setdefault(key, set()).add(url)
+
+    def is_boilerplate(self, url, block):
+        site = self.hosts.get(urlsplit(url or "").netloc)
+        if not site or len(site["pages"]) < self.min_pages or is_table_block(block):
+            return False
+        seen_on = len(site["blocks"].get(block_key(block), ()))
+        return seen_on >= max(self.min_pages, self.min_share * len(site["pages"]))
+
+
+def dedupe_list_items(blocks, similarity=0.9, window=20):
+    """Drop list items ("- ...") that repeat or nearly repeat one of the last window kept items.
+
+    Items are compared ignoring case and whitespace only, and two items with different numbers
+    are never near-duplicates ("- 256 GB: Rs 89,900" and "- 512 GB: Rs 99,900" both stay).
+    """
+    kept = []
+    recent = []
+    for block in blocks:
+        if not block.startswith("- "):
+            kept.append(block)
+            continue
+        normalized = re.sub(r"\s+", " ", block[2:].lower()).strip()
+        numbers = re.findall(r"\d+", normalized)
+        if any(normalized == other or (numbers == other_numbers
+                                       and abs(len(normalized) - len(other)) <= len(other) * (1 - similarity)
+                                       and SequenceMatcher(None, normalized, other).ratio() >= similarity)
+               for other, other_numbers in recent):
+            continue
+        kept.append(block)
+        recent.append((normalized, numbers))
+        if len(recent) > window:
+            recent.pop(0)
+    return kept
+
+
+def compact_content(content, url=None, boilerplate=None, similarity=0.9):
+    """Shrink extracted page content for an LLM prompt; returns (text, stats)"""
+    blocks = [re.sub(r"[ \t\r\f\v]+", " ", block).strip() for block in split_blocks(content)]
+    original = len(blocks)
+
+    removed_boilerplate = 0
+    if boilerplate is not None and url:
+        filtered = [block for block in blocks if not boilerplate.is_boilerplate(url, block)]
+        removed_boilerplate = len(blocks) - len(filtered)
+        blocks = filtered
+
+    # Exact duplicate paragraphs/headers (list items are handled by the fuzzy pass)
+    seen = set()
+    unique = []
+    for block in blocks:
+        if block.startswith("- ") or is_table_block(block):
+            unique.append(block)
+        elif block not in seen:
+            seen.add(block)
+            unique.append(block)
+    removed_duplicates = len(blocks) - len(unique)
+
+    blocks = dedupe_list_items(unique, similarity)
+    removed_list_items = len(unique) - len(blocks)
+
+    # Single newlines are enough between blocks
+    text = "\n".join(blocks)
+    stats = {
+        "blocks": original,
+        "boilerplate_removed": removed_boilerplate,
+        "duplicates_removed": removed_duplicates,
+        "list_items_removed": removed_list_items,
+        "chars_before": len(content),
+        "chars_after": len(text)
+    }
+    return text, stats
+
+
+def fit_to_budget(text, budget_tokens, count_tokens=None, max_rounds=3):
+    """Trim text at line boundaries until count_tokens(text) fits budget_tokens; returns (text, tokens)"""
+    count_tokens = count_tokens or estimate_tokens
+    tokens = count_tokens(text)
+    rounds = 0
+    while tokens > budget_tokens and rounds < max_rounds and text:
+        # Scale by the observed chars-per-token ratio, with a small safety margin
+        keep = int(len(text) * budget_tokens / tokens * 0.97)
+        cut = text.rfind("\n", 0, keep)
+        text = text[:cut if cut > 0 else keep] + "\n" + TRUNCATION_NOTE
+        tokens = count_tokens(text)
+        rounds += 1
+    if tokens > budget_tokens:
+        logging.warning(f"Content still {tokens} tokens after trimming (budget {budget_tokens})")
+    return text, tokens
@@ -0,0 +1,380 @@
+import base64
+import collections
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from urls import normalize_url, registered_domain
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter used to remember seen URLs in bounded memory"""
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        """Add an item; returns False if it was (probably) already present"""
+        added = False
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, item):
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+    def to_dict(self):
+        """Parameters and count only; the bit array is saved separately as raw bytes"""
+        return {"capacity": self.capacity, "error_rate": self.error_rate, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data, bits=None):
+        bloom = cls(data["capacity"], data["error_rate"])
+        if bits is None and "bits" in data:
+            # Checkpoints written before the binary sidecar embedded the bits as base64
+            bits = base64.b64decode(data["bits"])
+        if bits is not None:
+            bloom.bits = bytearray(bits)
+        bloom.count = data.get("count", 0)
+        return bloom
+
+
+class CrawlFrontier:
+    """Per-domain URL queues with deduplication and per-domain concurrency limits.
+
+    Request pacing is left to the shared rate_limiter, which navigate() already waits on.
+    """
+
+    def __init__(self, max_size=100_000, max_per_domain=1, bloom=None):
+        self.max_size = max_size
+        self.max_per_domain = max_per_domain
+        self.seen = bloom or BloomFilter()
+        self.queues = collections.OrderedDict()
+        self.active = collections.Counter()
+        self.in_flight = {}
+        self.size = 0
+        self.dropped = 0
+        self.lock = threading.Condition()
+
+    def push(self, url, depth=0, force=False):
+        """Queue a URL if it has not been seen before; returns True if queued"""
+        url = normalize_url(url)
+        if not url:
+            return False
+        with self.lock:
+            if not self.seen.add(url) and not force:
+                return False
+            if self.size >= self.max_size:
+                self.dropped += 1
+                return False
+            domain = urlsplit(url).netloc
+            self.queues.setdefault(domain, collections.deque()).append((url, depth))
+            self.size += 1
+            self.lock.notify()
+            return True
+
+    def pop(self, stop_event=None):
+        """Return the next (url, depth) whose domain is below max_per_domain, blocking until one is; None when drained"""
+        with self.lock:
+            while True:
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                for domain in list(self.queues):
+                    queue = self.queues[domain]
+                    if self.active[domain] >= self.max_per_domain:
+                        continue
+                    url, depth = queue.popleft()
+                    self.size -= 1
+                    if queue:
+                        # Rotate so other domains get a turn
+                        self.queues.move_to_end(domain)
+                    else:
+                        del self.queues[domain]
+                    self.active[domain] += 1
+                    self.in_flight[url] = depth
+                    return url, depth
+                if not self.queues and not self.in_flight:
+                    return None
+                self.lock.wait(timeout=1.0)
+
+    def done(self, url):
+        """Mark a URL returned by pop() as finished"""
+        with self.lock:
+            self.in_flight.pop(url, None)
+            self.active[urlsplit(url).netloc] -= 1
+            self.lock.notify_all()
+
+    def to_dict(self):
+        with self.lock:
+            pending = [[url, depth] for url, depth in self.in_flight.items()]
+            for queue in self.queues.values():
+                pending.extend([url, depth] for url, depth in queue)
+            return {"pending": pending, "dropped": self.dropped, "bloom": self.seen.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data, bloom_bits=None, **kwargs):
+        frontier = cls(bloom=BloomFilter.from_dict(data["bloom"], bloom_bits), **kwargs)
+        frontier.dropped = data.get("dropped", 0)
+        for url, depth in data["pending"]:
+            frontier.push(url, depth, force=True)
+        return frontier
+
+
+class Crawler:
+    """Multi-page crawler that drives BrowserAutomationWithScraper instances over a URL frontier"""
+
+    def __init__(self, automations, output_file="crawl_output.jsonl", state_file=None,
+                 follow="same-host", include=None, exclude=None, max_depth=2, max_pages=1000,
+                 max_per_domain=1, max_frontier=100_000, bloom_capacity=1_000_000,
+                 checkpoint_every=25, scroll=False):
+        self.automations = automations if isinstance(automations, list) else [automations]
+        self.output_file = output_file
+        self.state_file = state_file or f"{output_file}.state.json"
+        self.bloom_file = f"{self.state_file}.bloom"
+        self.follow = follow
+        self.include = re.compile(include) if include else None
+        self.exclude = re.compile(exclude) if exclude else None
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.checkpoint_every = checkpoint_every
+        self.scroll = scroll
+        self.pages_done = 0
+        self.pages_failed = 0
+        self.stop_event = threading.Event()
+        self.sink = None
+        self.sink_lock = threading.Lock()
+        self.checkpoint_lock = threading.Lock()
+        self.seeds = set()
+
+        frontier_options = {"max_size": max_frontier, "max_per_domain": max_per_domain}
+        if os.path.exists(self.state_file):
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            bloom_bits = None
+            if os.path.exists(self.bloom_file):
+                with open(self.bloom_file, "rb") as f:
+                    bloom_bits = f.read()
+            self.frontier = CrawlFrontier.from_dict(state["frontier"], bloom_bits, **frontier_options)
+            self.pages_done = state.get("pages_done", 0)
+            self.pages_failed = state.get("pages_failed", 0)
+            self.seeds = set(state.get("seeds", []))
+            self._truncate_output(state.get("output_offset"))
+            logging.info(f"Resuming crawl from {self.state_file} ({self.frontier.size} URLs pending, "
+                         f"{self.pages_done} pages already done)")
+        else:
+            self.frontier = CrawlFrontier(bloom=BloomFilter(bloom_capacity), **frontier_options)
+
+        # max_pages and checkpoint_every count pages crawled in this run, not ones from a resumed checkpoint
+        self.start_count = self.pages_done + self.pages_failed
+        self.last_checkpoint = 0
+
+    def _truncate_output(self, offset):
+        """Drop records written after the checkpoint; those pages are still pending and get crawled again"""
+        if offset is None or not os.path.exists(self.output_file):
+            return
+        size = os.path.getsize(self.output_file)
+        if size > offset:
+            with open(self.output_file, "r+b") as f:
+                f.truncate(offset)
+            logging.info(f"Removed {size - offset} bytes of output written after the last checkpoint")
+
+    def add_seeds(self, seed_urls):
+        """Queue seed URLs at depth 0"""
+        for url in seed_urls:
+            normalized = normalize_url(url)
+            if normalized:
+                self.seeds.add(urlsplit(normalized).netloc)
+                self.frontier.push(normalized, 0)
+
+    def should_follow(self, source_url, link):
+        """Apply the link-follow policy to a discovered link"""
+        if self.follow == "none":
+            return False
+        source_host = urlsplit(source_url).netloc
+        link_host = urlsplit(link).netloc
+        if self.follow == "same-host" and link_host != source_host:
+            return False
+        if self.follow == "same-domain" and registered_domain(link_host) != registered_domain(source_host):
+            return False
+        if self.follow == "seeds" and link_host not in self.seeds:
+            return False
+        if self.include and not self.include.search(link):
+            return False
+        if self.exclude and self.exclude.search(link):
+            return False
+        return True
+
+    def crawl_page(self, automation, url, depth):
+        """Load one URL, extract its content and return (record, links)"""
+        start = time.time()
+        automation.navigate(url)
+        automation.wait_for_page_load()
+        automation.handle_popups()
+        if self.scroll:
+            automation.scroll_page()
+        if not automation.extract_current_page_content():
+            raise RuntimeError("content extraction failed")
+
+        final_url = automation.current_url
+        links = []
+        if depth < self.max_depth and self.follow != "none":
+            # Links come from the extracted content, so this works in streaming mode (no soup) too
+            for href in automation.structured_data.get("links") or []:
+                link = normalize_url(urljoin(final_url, href))
+                if link and self.should_follow(final_url, link):
+                    links.append(link)
+
+        record = {
+            "url": url,
+            "final_url": final_url,
+            "depth": depth,
+            "title": automation.structured_data.get("title"),
+            "headers": automation.structured_data.get("headers"),
+            "tables": automation.structured_data.get("tables"),
+            "content": automation.content,
+            "links_found": len(links),
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "elapsed": round(time.time() - start, 3)
+        }
+
+        # Don't keep the parsed tree alive between pages
+        automation.soup = None
+        return record, links
+
+    def write_record(self, sink, record, url=None, failed=False):
+        """Append a record, count it and mark its URL done, as one step a checkpoint can't split"""
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self.sink_lock:
+            sink.write(line)
+            sink.flush()
+            if failed:
+                self.pages_failed += 1
+            else:
+                self.pages_done += 1
+            if url is not None:
+                self.frontier.done(url)
+
+    def checkpoint(self):
+        """Atomically persist frontier and counters so the crawl can resume after a crash.
+
+        The output file's length is saved with the frontier, taken under the same locks, so a
+        resumed crawl can cut off records of pages that are still pending in the saved state.
+        The Bloom filter bits go to a raw binary sidecar next to the JSON state. It is written
+        first, so a crash between the two writes leaves a filter that has seen at least every
+        URL in the saved state.
+        """
+        with self.checkpoint_lock:
+            with self.sink_lock, self.frontier.lock:
+                state = {
+                    "frontier": self.frontier.to_dict(),
+                    "pages_done": self.pages_done,
+                    "pages_failed": self.pages_failed,
+                    "seeds": sorted(self.seeds),
+                    "output_offset": os.fstat(self.sink.fileno()).st_size if self.sink is not None else None
+                }
+                bloom_bits = bytes(self.frontier.seen.bits)
+
+            temp_file = f"{self.bloom_file}.tmp"
+            with open(temp_file, "wb") as f:
+                f.write(bloom_bits)
+            os.replace(temp_file, self.bloom_file)
+
+            temp_file = f"{self.state_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(temp_file, self.state_file)
+
+    def _worker(self, automation, sink):
+        while not self.stop_event.is_set():
+            item = self.frontier.pop(self.stop_event)
+            if item is None:
+                return
+            url, depth = item
+            try:
+                record, links = self.crawl_page(automation, url, depth)
+                for link in links:
+                    self.frontier.push(link, depth + 1)
+                self.write_record(sink, record, url)
+                logging.info(f"Crawled {url} (depth {depth}, {len(links)} links, {self.frontier.size} queued)")
+            except Exception as e:
+                logging.warning(f"Failed to crawl {url}: {str(e)}")
+                try:
+                    self.write_record(sink, {"url": url, "depth": depth, "error": str(e)}, url, failed=True)
+                except Exception as write_error:
+                    logging.error(f"Could not record failure for {url}: {str(write_error)}")
+                    self.frontier.done(url)
+
+            with self.sink_lock:
+                finished = self.pages_done + self.pages_failed - self.start_count
+                if finished >= self.max_pages:
+                    self.stop_event.set()
+                # Several workers can finish between two checks, so compare against the last checkpoint
+                checkpoint_due = finished - self.last_checkpoint >= self.checkpoint_every
+                if checkpoint_due:
+                    self.last_checkpoint = finished
+            if checkpoint_due:
+                self.checkpoint()
+
+    def run(self):
+        """Crawl until the frontier drains or max_pages is reached; returns crawl statistics"""
+        start = time.time()
+        with open(self.output_file, "a", encoding="utf-8") as sink:
+            self.sink = sink
+            threads = [
+                threading.Thread(target=self._worker, args=(automation, sink), daemon=True)
+                for automation in self.automations
+            ]
+            try:
+                for thread in threads:
+                    thread.start()
+                while any(thread.is_alive() for thread in threads):
+                    for thread in threads:
+                        thread.join(timeout=0.5)
+            except KeyboardInterrupt:
+                logging.info("Crawl interrupted, saving state...")
+                self.stop_event.set()
+                for thread in threads:
+                    thread.join()
+            finally:
+                self.checkpoint()
+                self.sink = None
+
+        elapsed = time.time() - start
+        crawled = self.pages_done + self.pages_failed - self.start_count
+        stats = {
+            "pages_done": self.pages_done,
+            "pages_failed": self.pages_failed,
+            "pending": self.frontier.size,
+            "dropped": self.frontier.dropped,
+            "seen": self.frontier.seen.count,
+            "elapsed": round(elapsed, 2),
+            "pages_per_minute": round(crawled / elapsed * 60, 2) if elapsed else 0.0
+        }
+        logging.info(f"Crawl finished: {stats}")
+        return stats
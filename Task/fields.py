@@ -0,0 +1,65 @@
+import re
+
+# Field types understood by try_adaptive_extraction: keywords that identify the field,
+# default selectors, text patterns (group 1 is the value) and a validator for matched text
+ADAPTIVE_FIELDS = {
+    "rating": {
+        "keywords": ["rating", "stars", "score"],
+        "selectors": [
+            ".rating", "div[class*='rating']", "span[class*='stars']",
+            ".stars", "div[class*='stars']", "span[class*='rating']",
+            ".average-rating", "span[class*='average']",
+            "//span[contains(text(), 'out of')]", "//div[contains(text(), '/5')]",
+            "div._3LWZlK", "span.rating-value",
+            ".a-icon-star", ".review-rating"
+        ],
+        "patterns": [
+            r'(\d+\.\d+|\d+) out of 5', r'(\d+\.\d+|\d+)/5',
+            r'(\d+\.\d+|\d+) stars', r'Rating: (\d+\.\d+|\d+)'
+        ],
+        "validate": r'\d+(\.\d+)?'
+    },
+    "review_count": {
+        "keywords": ["review", "ratings count", "rating count", "num ratings", "ratingcount", "ratingscount"],
+        "selectors": [
+            ".review-count", "span[class*='review']", ".reviews", "#acrCustomerReviewText",
+            "span._2_R_DZ", "//span[contains(text(), 'reviews')]", "//span[contains(text(), 'Ratings')]"
+        ],
+        "patterns": [r'([\d,]+)\s+(?:customer\s+)?reviews', r'([\d,]+)\s+ratings'],
+        "validate": r'\d'
+    },
+    "price": {
+        "keywords": ["price", "cost", "mrp", "amount"],
+        "selectors": [
+            ".price", "span.price", "div[class*='price']", "span[class*='price']",
+            ".a-price .a-offscreen", "div._30jeq3", "[itemprop='price']"
+        ],
+        "patterns": [r'(?:₹|\$|€|£|Rs\.?)\s?([\d,]+(?:\.\d{1,2})?)', r'Price:?\s*([\d,]+(?:\.\d{1,2})?)'],
+        "validate": r'\d'
+    },
+    "title": {
+        "keywords": ["title", "name", "product", "heading"],
+        "selectors": ["h1", ".product-title", ".product-name", "#productTitle", "span.B_NuCI", "[itemprop='name']"],
+        "patterns": [],
+        "validate": r'\w'
+    },
+    "availability": {
+        "keywords": ["availability", "stock", "available"],
+        "selectors": ["#availability", ".availability", "[class*='stock']", "[itemprop='availability']"],
+        "patterns": [r'\b(in stock|out of stock|currently unavailable|sold out|available)\b'],
+        "validate": r'(?i)stock|available|sold out'
+    }
+}
+
+for _profile in ADAPTIVE_FIELDS.values():
+    _profile["patterns"] = {pattern: re.compile(pattern, re.IGNORECASE) for pattern in _profile["patterns"]}
+    _profile["validate"] = re.compile(_profile["validate"])
+
+
+def classify_field(field_name):
+    """Map a requested field name to one of the ADAPTIVE_FIELDS types"""
+    field_lower = field_name.lower().replace("_", " ")
+    for field_type in ("review_count", "rating", "price", "availability", "title"):
+        if any(keyword in field_lower for keyword in ADAPTIVE_FIELDS[field_type]["keywords"]):
+            return field_type
+    return None
@@ -0,0 +1,204 @@
+import math
+import re
+
+INTENTS = ("query", "extract", "automate")
+
+# Phrases that strongly suggest an intent. All of them are compiled into a single regex,
+# so one scan of the input finds every hit.
+INTENT_KEYWORDS = {
+    "query": ["what", "who", "when", "where", "why", "how much", "how many", "how", "which", "is there",
+              "are there", "does", "tell me", "explain", "summarize", "summary", "list the", "find the",
+              "show me the", "compare", "according to", "this page", "on the page", "mention"],
+    "extract": ["extract", "scrape", "get content", "get text", "get data", "grab", "capture", "re-extract",
+                "reload content", "refresh content", "parse", "pull the content", "read the page",
+                "save content", "dump"],
+    "automate": ["go to", "navigate", "open", "visit", "click", "fill", "type", "search for", "search",
+                 "login", "log in", "sign in", "download", "submit", "automate", "browse", "scroll",
+                 "press", "select", "add to cart", "checkout", "go back", "next page", "book", "upload"]
+}
+
+URL_PATTERN = re.compile(r"(https?://|www\.)\S+|\b[a-z0-9-]+\.(com|org|net|io|in|co|dev|ai)\b")
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Labeled commands used to train the classifier at import time (a few milliseconds)
+LABELED_EXAMPLES = [
+    ("what is the price of this product", "query"),
+    ("what does this page say about shipping", "query"),
+    ("who wrote this article", "query"),
+    ("when was this published", "query"),
+    ("where is the company located", "query"),
+    ("why is the product out of stock", "query"),
+    ("how many reviews does it have", "query"),
+    ("how much does the premium plan cost", "query"),
+    ("find the price", "query"),
+    ("find the rating on this page", "query"),
+    ("find the author's name", "query"),
+    ("tell me the main points", "query"),
+    ("summarize this page", "query"),
+    ("give me a summary of the article", "query"),
+    ("explain the return policy", "query"),
+    ("list the features mentioned", "query"),
+    ("which plan is the cheapest", "query"),
+    ("is there a free trial", "query"),
+    ("does it ship internationally", "query"),
+    ("compare the two models in the table", "query"),
+    ("search this page for warranty details", "query"),
+    ("look for the phone number in the content", "query"),
+    ("show me the specifications", "query"),
+    ("what are the top rated items", "query"),
+    ("according to the page what is the deadline", "query"),
+    ("any mention of discounts", "query"),
+    ("price?", "query"),
+    ("rating of the product", "query"),
+    ("the author", "query"),
+    ("key takeaways", "query"),
+    ("what's the contact email", "query"),
+    ("what are the opening hours", "query"),
+    ("extract the content", "extract"),
+    ("extract this page", "extract"),
+    ("scrape the current page", "extract"),
+    ("scrape it", "extract"),
+    ("get content from this page", "extract"),
+    ("get text of the page", "extract"),
+    ("get data from here", "extract"),
+    ("grab the page content", "extract"),
+    ("capture the page", "extract"),
+    ("re-extract the page", "extract"),
+    ("refresh content", "extract"),
+    ("reload content from the page", "extract"),
+    ("parse this page", "extract"),
+    ("pull the content", "extract"),
+    ("read the page", "extract"),
+    ("extract everything", "extract"),
+    ("scrape the table", "extract"),
+    ("dump the page text", "extract"),
+    ("extract content again", "extract"),
+    ("get the page data", "extract"),
+    ("go to amazon.com", "automate"),
+    ("go to https://example.com and click login", "automate"),
+    ("navigate to the pricing page", "automate"),
+    ("open github.com", "automate"),
+    ("visit wikipedia and search for python", "automate"),
+    ("click the next button", "automate"),
+    ("click on sign up", "automate"),
+    ("fill the form with my details", "automate"),
+    ("type hello into the search box", "automate"),
+    ("search for laptops on flipkart", "automate"),
+    ("search google for web scraping", "automate"),
+    ("login with my credentials", "automate"),
+    ("log in to my account", "automate"),
+    ("sign in to linkedin", "automate"),
+    ("download the report", "automate"),
+    ("submit the form", "automate"),
+    ("automate the checkout", "automate"),
+    ("browse to the news section", "automate"),
+    ("scroll down", "automate"),
+    ("press enter", "automate"),
+    ("select the blue variant", "automate"),
+    ("add this to cart", "automate"),
+    ("go back", "automate"),
+    ("open the next page", "automate"),
+    ("book a table for two", "automate"),
+    ("upload my resume", "automate"),
+    ("open youtube and play lofi music", "automate"),
+    ("go to the second result", "automate"),
+    ("check out with the saved card", "automate"),
+    ("find flights from delhi to mumbai on makemytrip", "automate"),
+    ("take me to the homepage", "automate"),
+]
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class IntentRouter:
+    """Local intent classifier: keyword automaton hits plus a multinomial naive Bayes model.
+
+    classify() returns {"intent", "confidence", "scores", "keywords"}; confidence is the
+    posterior of the winning intent, and callers should defer to an LLM below threshold.
+    """
+
+    def __init__(self, examples=None, threshold=0.6, alpha=0.5, evidence_prior=2.0):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.evidence_prior = evidence_prior
+        phrases = sorted(
+            ((phrase, intent) for intent, words in INTENT_KEYWORDS.items() for phrase in words),
+            key=lambda item: -len(item[0])
+        )
+        self.phrase_intents = {phrase: intent for phrase, intent in phrases}
+        self.keyword_pattern = re.compile(r"\b(" + "|".join(re.escape(phrase) for phrase, _ in phrases) + r")\b")
+        self.train(examples or LABELED_EXAMPLES)
+
+    def keyword_hits(self, text):
+        """Intent for every keyword phrase found in text, longest phrase first at each position"""
+        return [(match.group(1), self.phrase_intents[match.group(1)])
+                for match in self.keyword_pattern.finditer(text.lower())]
+
+    def features(self, text):
+        tokens = tokenize(text)
+        features = list(tokens)
+        features.extend(f"{a}_{b}" for a, b in zip(tokens, tokens[1:]))
+        if tokens:
+            features.append(f"first:{tokens[0]}")
+        features.extend(f"kw:{intent}" for _, intent in self.keyword_hits(text))
+        if text.strip().endswith("?"):
+            features.append("end:question")
+        if URL_PATTERN.search(text.lower()):
+            features.append("has:url")
+        return features
+
+    def train(self, examples):
+        """Fit class priors and per-feature log likelihoods from (text, intent) pairs"""
+        counts = {intent: {} for intent in INTENTS}
+        totals = {intent: 0 for intent in INTENTS}
+        docs = {intent: 0 for intent in INTENTS}
+        vocabulary = set()
+        for text, intent in examples:
+            docs[intent] += 1
+            for feature in self.features(text):
+                counts[intent][feature] = counts[intent].get(feature, 0) + 1
+                totals[intent] += 1
+                vocabulary.add(feature)
+
+        size = len(vocabulary) or 1
+        self.vocabulary = vocabulary
+        self.feature_counts = {feature: sum(counts[intent].get(feature, 0) for intent in INTENTS)
+                               for feature in vocabulary}
+        self.log_priors = {intent: math.log((docs[intent] + 1) / (len(examples) + len(INTENTS)))
+                           for intent in INTENTS}
+        self.log_likelihoods = {}
+        self.log_unseen = {}
+        for intent in INTENTS:
+            denominator = totals[intent] + self.alpha * size
+            self.log_likelihoods[intent] = {feature: math.log((count + self.alpha) / denominator)
+                                            for feature, count in counts[intent].items()}
+            self.log_unseen[intent] = math.log(self.alpha / denominator)
+
+    def classify(self, text):
+        features = [feature for feature in self.features(text) if feature in self.vocabulary]
+        log_scores = {}
+        for intent in INTENTS:
+            likelihoods = self.log_likelihoods[intent]
+            unseen = self.log_unseen[intent]
+            log_scores[intent] = self.log_priors[intent] + sum(likelihoods.get(f, unseen) for f in features)
+
+        top = max(log_scores.values())
+        exp_scores = {intent: math.exp(score - top) for intent, score in log_scores.items()}
+        total = sum(exp_scores.values())
+        scores = {intent: round(value / total, 4) for intent, value in exp_scores.items()}
+        intent = max(scores, key=scores.get)
+        # Shrink confidence when the input shares little training evidence, so out-of-domain
+        # input such as "hello" (one word seen once) is handed off instead of trusted
+        evidence = sum(self.feature_counts[feature] for feature in features)
+        confidence = scores[intent] * evidence / (evidence + self.evidence_prior)
+        return {
+            "intent": intent,
+            "confidence": round(confidence, 4),
+            "scores": scores,
+            "keywords": [phrase for phrase, _ in self.keyword_hits(text)]
+        }
+
+    def is_confident(self, result):
+        return result["confidence"] >= self.threshold
@@ -0,0 +1,100 @@
+import logging
+import re
+from urllib.parse import urlsplit
+
+from fields import classify_field
+from urls import registered_domain
+
+# Keys that commonly hold each kind of field in site JSON APIs (compared after normalize_key)
+FIELD_KEY_ALIASES = {
+    "rating": ["rating", "averagerating", "avgrating", "ratingvalue", "overallrating", "stars", "averagestars"],
+    "review_count": ["reviewcount", "reviewscount", "numreviews", "totalreviews", "ratingcount", "ratingscount",
+                     "numratings", "totalratings"],
+    "price": ["price", "sellingprice", "finalprice", "saleprice", "currentprice", "offerprice", "lowprice"],
+    "title": ["title", "name", "productname", "producttitle", "headline"],
+    "availability": ["availability", "instock", "stockstatus", "available", "availabilitystatus"]
+}
+
+SCALARS = (str, int, float, bool)
+
+
+def normalize_key(key):
+    return re.sub(r"[^a-z0-9]", "", str(key).lower())
+
+
+def candidate_keys(field_name):
+    """Normalized JSON keys that may hold the requested field, most specific first"""
+    keys = [normalize_key(field_name)]
+    field_type = classify_field(field_name)
+    if field_type:
+        keys.extend(alias for alias in FIELD_KEY_ALIASES[field_type] if alias not in keys)
+    return keys
+
+
+def same_site(url, page_url):
+    """True when url is served from the page's own site (api.example.com counts for www.example.com)"""
+    host = urlsplit(url).hostname or ""
+    page_host = urlsplit(page_url).hostname or ""
+    return bool(host) and registered_domain(host) == registered_domain(page_host)
+
+
+def _scalar(value):
+    """Reduce a JSON value to a scalar, unwrapping {"value": ...}/{"amount": ...} objects"""
+    if isinstance(value, SCALARS) and value != "":
+        return value
+    if isinstance(value, dict):
+        for key in ("value", "amount", "average", "text", "displayValue", "formattedValue"):
+            if isinstance(value.get(key), SCALARS) and value.get(key) != "":
+                return value[key]
+    return None
+
+
+def _walk(node, path, depth, index, budget):
+    """Index every key in a JSON tree by normalized name, keeping the shallowest occurrence"""
+    if budget[0] <= 0 or depth > 12:
+        return
+    budget[0] -= 1
+    if isinstance(node, dict):
+        for key, value in node.items():
+            normalized = normalize_key(key)
+            child_path = f"{path}.{key}" if path else str(key)
+            scalar = _scalar(value)
+            if scalar is not None and (normalized not in index or index[normalized][1] > depth):
+                index[normalized] = (scalar, depth, child_path)
+            _walk(value, child_path, depth + 1, index, budget)
+    elif isinstance(node, list):
+        for i, item in enumerate(node[:50]):
+            _walk(item, f"{path}[{i}]", depth + 1, index, budget)
+
+
+def match_fields(payloads, field_names, page_url=None, min_fields=2, max_nodes=100_000):
+    """Find values for requested fields in captured JSON payloads.
+
+    payloads is a list of (url, parsed_json). Returns {field: {"value", "source", "path"}} for matched fields.
+    Analytics, config and ad payloads often have keys like "name" or "price" too, so a payload is only
+    used when it comes from page_url's site and holds at least min_fields of the requested fields
+    (or all of them, if fewer were requested).
+    """
+    required = min(min_fields, len(field_names))
+    indexes = []
+    for url, payload in payloads:
+        if page_url and not same_site(url, page_url):
+            logging.debug(f"Ignoring JSON response from another site: {url}")
+            continue
+        index = {}
+        _walk(payload, "", 0, index, [max_nodes])
+        matched = sum(any(key in index for key in candidate_keys(field_name)) for field_name in field_names)
+        if matched < required:
+            logging.debug(f"Ignoring JSON response {url}: only {matched} of {len(field_names)} fields present")
+            continue
+        indexes.append((url, index))
+
+    matches = {}
+    for field_name in field_names:
+        for key in candidate_keys(field_name):
+            found = [(index[key], url) for url, index in indexes if key in index]
+            if found:
+                (value, depth, path), url = min(found, key=lambda item: item[0][1])
+                matches[field_name] = {"value": value, "source": url, "path": path}
+                break
+    return matches
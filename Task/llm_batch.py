@@ -0,0 +1,115 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resilience import LLM_POLICY, CircuitOpenError, breakers, call_with_retry
+from tracing import tracer
+
+
+def submit_message_batch(client, requests):
+    """Create a Message Batches API job (half price, asynchronous) for a list of {"custom_id", "params"} dicts"""
+    batch = call_with_retry(lambda: client.messages.batches.create(requests=requests), LLM_POLICY,
+                            breakers.get("llm:batches"), "batch submission")
+    logging.info(f"Submitted message batch {batch.id} with {len(requests)} requests")
+    return batch
+
+
+def collect_message_batch(client, batch, requests, poll_interval=5, timeout=3600, on_result=None):
+    """Wait for a submitted batch and read its results; returns {custom_id: message or None}.
+
+    on_result(custom_id, message or None, seconds since collection started) is called once per
+    request. If the batch times out or reading results fails, the results read so far are kept
+    and every other request is reported as failed; nothing is sent again.
+    """
+    start = time.monotonic()
+    messages = {request["custom_id"]: None for request in requests}
+    models = {request["custom_id"]: request["params"]["model"] for request in requests}
+    reported = set()
+    try:
+        deadline = start + timeout
+        while batch.processing_status != "ended":
+            if time.monotonic() > deadline:
+                client.messages.batches.cancel(batch.id)
+                raise TimeoutError(f"Message batch {batch.id} did not finish within {timeout}s")
+            time.sleep(poll_interval)
+            batch = client.messages.batches.retrieve(batch.id)
+
+        for entry in client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                messages[entry.custom_id] = entry.result.message
+                tracer.record_llm_usage(entry.result.message, models.get(entry.custom_id))
+            else:
+                logging.error(f"Batch request {entry.custom_id} {entry.result.type}")
+            reported.add(entry.custom_id)
+            if on_result is not None:
+                on_result(entry.custom_id, messages.get(entry.custom_id), time.monotonic() - start)
+    except Exception as e:
+        logging.error(f"Message batch {batch.id} failed after {len(reported)}/{len(requests)} results: {str(e)}")
+
+    if on_result is not None:
+        for custom_id in messages:
+            if custom_id not in reported:
+                on_result(custom_id, None, time.monotonic() - start)
+    return messages
+
+
+def run_concurrently(client, requests, workers=4, on_result=None):
+    """Local stand-in for the Batches API: requests run in parallel.
+
+    on_result is called for every request except those an open circuit breaker rejected, since
+    those never reached the model.
+
+    When the first request carries a prompt cache breakpoint it is sent alone first, so the
+    others can read the prefix it writes to the cache.
+    """
+    messages = {}
+
+    def send(request):
+        start = time.monotonic()
+        message = None
+        rejected = False
+        try:
+            with tracer.span("llm_call", custom_id=request["custom_id"]):
+                model = request["params"]["model"]
+                message = call_with_retry(lambda: client.messages.create(**request["params"]), LLM_POLICY,
+                                          breakers.get(f"llm:{model}"), f"request {request['custom_id']}")
+                tracer.record_llm_usage(message, request["params"]["model"])
+        except CircuitOpenError as e:
+            logging.error(f"Request {request['custom_id']} skipped: {str(e)}")
+            rejected = True
+        except Exception as e:
+            logging.error(f"Request {request['custom_id']} failed: {str(e)}")
+        if on_result is not None and not rejected:
+            on_result(request["custom_id"], message, time.monotonic() - start)
+        return request["custom_id"], message
+
+    if not requests:
+        return messages
+    remaining = requests
+    system = requests[0]["params"].get("system")
+    if isinstance(system, list) and any("cache_control" in block for block in system):
+        custom_id, message = send(requests[0])
+        messages[custom_id] = message
+        remaining = requests[1:]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for custom_id, message in executor.map(send, remaining):
+            messages[custom_id] = message
+    return messages
+
+
+def run_message_batch(client, requests, use_batch_api=True, workers=4, poll_interval=5, timeout=3600,
+                      on_result=None):
+    """Send a list of {"custom_id", "params"} requests, preferring the Batches API.
+
+    Requests are sent concurrently instead only when the batch could not be submitted; once a
+    batch exists its requests are never sent a second time.
+    """
+    with tracer.span("llm_batch", requests=len(requests), batch_api=use_batch_api):
+        if use_batch_api:
+            try:
+                batch = submit_message_batch(client, requests)
+            except Exception as e:
+                logging.warning(f"Message Batches API unavailable, sending requests concurrently: {str(e)}")
+            else:
+                return collect_message_batch(client, batch, requests, poll_interval, timeout, on_result)
+        return run_concurrently(client, requests, workers, on_result)
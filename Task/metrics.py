@@ -0,0 +1,294 @@
+import atexit
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms keyed by name and labels, rendered in Prometheus text format.
+
+    Metrics are created on first use; describe() only adds help text and histogram buckets.
+    Collectors registered with add_collector() are called at scrape time and return
+    (name, labels, value) gauge samples for state that is cheaper to read than to track.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}  # name -> {"type", "help", "buckets", "values": {label key: value}}
+        self.collectors = []
+        self.browsers = weakref.WeakValueDictionary()
+        self.browser_ids = 0
+
+    def describe(self, name, kind, help_text, buckets=None):
+        with self.lock:
+            self._metric(name, kind).update(help=help_text, buckets=tuple(buckets or DEFAULT_BUCKETS))
+
+    def _metric(self, name, kind):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = {"type": kind, "help": "", "buckets": DEFAULT_BUCKETS, "values": {}}
+        return metric
+
+    def inc(self, name, amount=1, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            values = self._metric(name, "counter")["values"]
+            values[key] = values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self._metric(name, "gauge")["values"][_label_key(labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self.lock:
+            metric = self._metric(name, "histogram")
+            entry = metric["values"].get(key)
+            if entry is None:
+                entry = metric["values"][key] = {"buckets": [0] * len(metric["buckets"]), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(metric["buckets"]):
+                if value <= bound:
+                    entry["buckets"][index] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def track_browser(self, automation):
+        """Include an automation instance in the browser pool and memory gauges while it is alive"""
+        with self.lock:
+            self.browser_ids += 1
+            automation.metrics_id = str(self.browser_ids)
+            self.browsers[automation.metrics_id] = automation
+
+    def _collect(self):
+        samples = []
+        for collector in list(self.collectors):
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                logging.debug(f"Metrics collector failed: {str(e)}")
+        return samples
+
+    def snapshot(self):
+        """Plain dict of every metric, including collector gauges, for JSON output"""
+        collected = self._collect()
+        with self.lock:
+            result = {}
+            for name, metric in self.metrics.items():
+                result[name] = {
+                    "type": metric["type"],
+                    "values": [dict(labels=dict(key), value=value) for key, value in metric["values"].items()]
+                }
+                if metric["type"] == "histogram":
+                    for entry in result[name]["values"]:
+                        entry["value"] = dict(entry["value"], buckets=list(entry["value"]["buckets"]),
+                                              bounds=list(metric["buckets"]))
+        for name, labels, value in collected:
+            result.setdefault(name, {"type": "gauge", "values": []})["values"].append(
+                {"labels": labels, "value": value})
+        return result
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        collected = {}
+        for name, labels, value in self._collect():
+            collected.setdefault(name, []).append((_label_key(labels), value))
+
+        lines = []
+        with self.lock:
+            for name in sorted(self.metrics):
+                metric = self.metrics[name]
+                if metric["help"]:
+                    lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key, value in sorted(metric["values"].items()):
+                    if metric["type"] != "histogram":
+                        lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+                        continue
+                    # Bucket counts are already cumulative (observe() adds to every bucket the value fits)
+                    for bound, count in zip(metric["buckets"], value["buckets"]):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', _format_value(bound))])} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(value['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(key)} {value['count']}")
+        for name in sorted(collected):
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in sorted(collected[name]):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def outcome(result):
+    """Classify a method's return value as "ok" or "error" using the automation classes' conventions"""
+    if result is None or result is False:
+        return "error"
+    if isinstance(result, dict) and "error" in result:
+        return "error"
+    if isinstance(result, str) and result.startswith(("Error", "Failed", "No code")):
+        return "error"
+    return "ok"
+
+
+def measured(operation):
+    """Decorator recording duration and outcome of an automation method, and marking its browser busy"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            self.active_operations = getattr(self, "active_operations", 0) + 1
+            start = time.perf_counter()
+            result_outcome = "error"
+            try:
+                result = func(self, *args, **kwargs)
+                result_outcome = outcome(result)
+                return result
+            finally:
+                self.active_operations -= 1
+                metrics.observe("operation_duration_seconds", time.perf_counter() - start, operation=operation)
+                metrics.inc("operations_total", operation=operation, outcome=result_outcome)
+        return wrapper
+    return decorator
+
+
+def _process_tree_rss(pid):
+    process = psutil.Process(pid)
+    return sum(p.memory_info().rss for p in [process] + process.children(recursive=True))
+
+
+def browser_pool_samples():
+    """Open and busy browsers, plus resident memory of each browser's driver process tree (needs psutil)"""
+    automations = list(metrics.browsers.items())
+    open_browsers = [(browser_id, a) for browser_id, a in automations if getattr(a, "browser", None) is not None]
+    samples = [
+        ("browsers_open", {}, len(open_browsers)),
+        ("browsers_busy", {}, sum(getattr(a, "active_operations", 0) > 0 for _, a in open_browsers))
+    ]
+    if psutil is not None:
+        for browser_id, automation in open_browsers:
+            service = getattr(automation.browser, "service", None)
+            process = getattr(service, "process", None)
+            if process is None:
+                continue
+            try:
+                samples.append(("browser_memory_bytes", {"browser": browser_id}, _process_tree_rss(process.pid)))
+            except Exception as e:
+                logging.debug(f"Could not read memory for browser {browser_id}: {str(e)}")
+    return samples
+
+
+# Shared by every module in the process so one endpoint reports everything
+metrics = MetricsRegistry()
+metrics.add_collector(browser_pool_samples)
+
+metrics.describe("operation_duration_seconds", "histogram",
+                 "Duration of extract_data, extract_current_page_content, query_content and run_command")
+metrics.describe("operations_total", "counter", "Automation operations by outcome")
+metrics.describe("page_load_seconds", "histogram", "Time for browser.get to return, retries included")
+metrics.describe("rate_limit_wait_seconds", "histogram", "Time spent waiting for a domain's rate limit",
+                 buckets=(0.0, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0))
+metrics.describe("selector_results_total", "counter", "Extracted fields by how they were found (or why not)")
+metrics.describe("retries_total", "counter", "Retried operations by retry policy")
+metrics.describe("circuit_rejections_total", "counter", "Calls rejected because a circuit breaker was open")
+metrics.describe("llm_requests_total", "counter", "LLM calls by task, model and outcome")
+metrics.describe("llm_latency_seconds", "histogram", "LLM call latency, retries included")
+metrics.describe("llm_tokens_total", "counter", "LLM tokens by model and kind (input, output, cache_read)")
+metrics.describe("cache_lookups_total", "counter", "Cache lookups by cache and result (hit or miss)")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        return
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread; returns the server (call shutdown() to stop it)"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def write_snapshot(filename):
+    """Atomically write the current metrics as JSON"""
+    temp_file = f"{filename}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        json.dump({"timestamp": time.time(), "metrics": metrics.snapshot()}, f, indent=2, default=str)
+    os.replace(temp_file, filename)
+
+
+def start_snapshots(filename, interval=60):
+    """Write a snapshot every interval seconds on a daemon thread, and once more at exit; set the returned event to stop"""
+    stop = threading.Event()
+
+    def write():
+        try:
+            write_snapshot(filename)
+        except Exception as e:
+            logging.warning(f"Could not write metrics snapshot: {str(e)}")
+
+    def run():
+        while not stop.wait(interval):
+            write()
+
+    threading.Thread(target=run, name="metrics-snapshot", daemon=True).start()
+    atexit.register(write)
+    return stop
+
+
+def start_exporters(port=None, snapshot_file=None, interval=60):
+    """Start the HTTP endpoint and/or snapshot writer; defaults come from METRICS_PORT and METRICS_FILE"""
+    port = port or os.getenv("METRICS_PORT")
+    snapshot_file = snapshot_file or os.getenv("METRICS_FILE")
+    if port:
+        try:
+            start_http_server(int(port))
+        except OSError as e:
+            logging.error(f"Could not start metrics endpoint on port {port}: {str(e)}")
+    if snapshot_file:
+        start_snapshots(snapshot_file, interval)
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from compaction import estimate_tokens
+from metrics import metrics
+from resilience import LLM_POLICY, CircuitOpenError, breakers, call_with_retry
+from tracing import tracer
+
+# Model tiers from cheapest/fastest to strongest, with rough default latencies used until stats exist
+# and the shortest prompt prefix (tokens) each model will cache
+MODEL_TIERS = [
+    {"model": "claude-3-haiku-20240307", "latency": 1.0, "min_cache_tokens": 2048},
+    {"model": "claude-3-5-haiku-20241022", "latency": 2.5, "min_cache_tokens": 2048},
+    {"model": "claude-3-5-sonnet-20241022", "latency": 6.0, "min_cache_tokens": 1024}
+]
+
+# Starting tier per task type, and the input size (characters) above which a task starts one tier higher
+TASK_POLICIES = {
+    "intent": {"tier": 0, "large_input": None},
+    "query": {"tier": 0, "large_input": 40000},
+    "rules": {"tier": 1, "large_input": None},
+    "code": {"tier": 1, "large_input": 12000}
+}
+
+
+class ModelRouter:
+    """Picks a Claude model per call and escalates to a stronger one when the output fails validation.
+
+    Per task and model it keeps call, success, latency and token totals (persisted as JSON); a
+    model whose success rate for a task falls below min_success is skipped in favour of the next tier.
+    """
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, stats_file="model_stats.json", tiers=None, policies=None, min_success=0.7, min_samples=10):
+        self.stats_file = stats_file
+        self.tiers = tiers or MODEL_TIERS
+        self.policies = policies or TASK_POLICIES
+        self.min_success = min_success
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+        self.stats = {}
+        if stats_file and os.path.exists(stats_file):
+            try:
+                with open(stats_file, "r", encoding="utf-8") as f:
+                    self.stats = json.load(f).get("stats", {})
+            except Exception as e:
+                logging.warning(f"Could not load model stats from {stats_file}: {str(e)}")
+
+    @classmethod
+    def shared(cls, stats_file="model_stats.json"):
+        """One router per stats file for the whole process, so parallel workers update and save the same stats"""
+        with cls._shared_lock:
+            if stats_file not in cls._shared:
+                cls._shared[stats_file] = cls(stats_file)
+            return cls._shared[stats_file]
+
+    def _entry(self, task, model):
+        return self.stats.get(task, {}).get(model)
+
+    def success_rate(self, task, model):
+        entry = self._entry(task, model)
+        if not entry or entry["calls"] < self.min_samples:
+            return None
+        return entry["successes"] / entry["calls"]
+
+    def expected_latency(self, task, index):
+        entry = self._entry(task, self.tiers[index]["model"])
+        if entry and entry["calls"]:
+            return entry["latency"] / entry["calls"]
+        return self.tiers[index]["latency"]
+
+    def choose(self, task, input_chars=0, latency_budget=None):
+        """Pick the model for a call from the task type, input size and optional latency budget (seconds)"""
+        policy = self.policies.get(task, {"tier": 1, "large_input": None})
+        index = policy["tier"]
+        if policy["large_input"] and input_chars > policy["large_input"]:
+            index += 1
+        index = min(index, len(self.tiers) - 1)
+
+        # Skip tiers that have proven unreliable for this task
+        while index < len(self.tiers) - 1:
+            rate = self.success_rate(task, self.tiers[index]["model"])
+            if rate is None or rate >= self.min_success:
+                break
+            index += 1
+
+        # Step down until the expected latency fits the budget
+        if latency_budget is not None:
+            while index > 0 and self.expected_latency(task, index) > latency_budget:
+                index -= 1
+        return self.tiers[index]["model"]
+
+    def with_prompt_cache(self, params, model):
+        """Copy of params with cache breakpoints on the system blocks whose prefix is long enough for model to cache.
+
+        Shorter prefixes are sent unmarked, since the API would ignore the breakpoint anyway.
+        """
+        system = params.get("system")
+        if not isinstance(system, list):
+            return params
+        minimum = next((tier.get("min_cache_tokens", 2048) for tier in self.tiers if tier["model"] == model), 2048)
+        blocks = []
+        prefix_tokens = 0
+        for block in system:
+            block = {key: value for key, value in block.items() if key != "cache_control"}
+            prefix_tokens += estimate_tokens(block.get("text", ""))
+            if prefix_tokens >= minimum:
+                block["cache_control"] = {"type": "ephemeral"}
+            blocks.append(block)
+        return dict(params, system=blocks)
+
+    def escalate(self, model):
+        """The next stronger model after model, or None if it is already the strongest"""
+        models = [tier["model"] for tier in self.tiers]
+        if model not in models:
+            return models[-1] if models else None
+        index = models.index(model)
+        return models[index + 1] if index + 1 < len(models) else None
+
+    def record(self, task, model, latency, success, message=None):
+        usage = getattr(message, "usage", None)
+        self._record_metrics(task, model, latency, "ok" if success else ("invalid" if message else "error"), usage)
+        with self.lock:
+            entry = self.stats.setdefault(task, {}).setdefault(model, {
+                "calls": 0, "successes": 0, "latency": 0.0, "input_tokens": 0, "output_tokens": 0
+            })
+            entry["calls"] += 1
+            entry["successes"] += 1 if success else 0
+            entry["latency"] += latency
+            if usage is not None:
+                entry["input_tokens"] += getattr(usage, "input_tokens", 0) or 0
+                entry["output_tokens"] += getattr(usage, "output_tokens", 0) or 0
+
+    @staticmethod
+    def _record_metrics(task, model, latency, outcome, usage):
+        metrics.inc("llm_requests_total", task=task, model=model, outcome=outcome)
+        metrics.observe("llm_latency_seconds", latency, model=model)
+        if usage is None:
+            return
+        metrics.inc("llm_tokens_total", getattr(usage, "input_tokens", 0) or 0, model=model, kind="input")
+        metrics.inc("llm_tokens_total", getattr(usage, "output_tokens", 0) or 0, model=model, kind="output")
+        cached = getattr(usage, "cache_read_input_tokens", 0) or 0
+        metrics.inc("llm_tokens_total", cached, model=model, kind="cache_read")
+        metrics.inc("cache_lookups_total", cache="llm_prompt", result="hit" if cached else "miss")
+
+    def call(self, client, task, params, validate=None, input_chars=0, latency_budget=None, max_escalations=1):
+        """Send a messages.create request on the routed model, escalating while validate(message) reports errors.
+
+        validate returns a list of error strings (empty when the output is usable).
+        Returns (message, model, errors) for the last attempt.
+        """
+        model = params.get("model") or self.choose(task, input_chars, latency_budget)
+        message, errors = None, []
+        for attempt in range(max_escalations + 1):
+            with tracer.span("llm_call", task=task, attempt=attempt, prompt_chars=input_chars):
+                start = time.monotonic()
+                try:
+                    message = call_with_retry(
+                        lambda: client.messages.create(**self.with_prompt_cache(dict(params, model=model), model)),
+                        LLM_POLICY, breakers.get(f"llm:{model}"), f"{task} call to {model}"
+                    )
+                except CircuitOpenError:
+                    # The model was never called, so this says nothing about how well it does the task
+                    raise
+                except Exception:
+                    self.record(task, model, time.monotonic() - start, False)
+                    raise
+                tracer.record_llm_usage(message, model)
+                errors = validate(message) if validate else []
+                self.record(task, model, time.monotonic() - start, not errors, message)
+            if not errors:
+                return message, model, []
+
+            stronger = self.escalate(model)
+            if stronger is None or attempt == max_escalations:
+                break
+            logging.warning(f"{task} output from {model} failed validation ({'; '.join(errors)}); retrying on {stronger}")
+            model = stronger
+        return message, model, errors
+
+    def report(self):
+        """Per task and model: calls, success rate, mean latency and mean tokens"""
+        with self.lock:
+            stats = json.loads(json.dumps(self.stats))
+        report = {}
+        for task, models in stats.items():
+            for model, entry in models.items():
+                calls = entry["calls"] or 1
+                report.setdefault(task, {})[model] = {
+                    "calls": entry["calls"],
+                    "success_rate": round(entry["successes"] / calls, 3),
+                    "mean_latency": round(entry["latency"] / calls, 3),
+                    "mean_input_tokens": round(entry["input_tokens"] / calls),
+                    "mean_output_tokens": round(entry["output_tokens"] / calls)
+                }
+        return report
+
+    def save(self):
+        """Atomically write stats to disk"""
+        if not self.stats_file:
+            return
+        with self.lock:
+            data = json.dumps({"stats": self.stats}, indent=2)
+        try:
+            temp_file = f"{self.stats_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_file, self.stats_file)
+        except Exception as e:
+            logging.warning(f"Could not save model stats to {self.stats_file}: {str(e)}")
+
+
+def python_syntax_errors(message):
+    """Validator for code generation: the first text block must compile as Python"""
+    try:
+        compile(message.content[0].text, "<generated>", "exec")
+        return []
+    except SyntaxError as e:
+        return [f"Generated code is not valid Python: {e.msg} (line {e.lineno})"]
+    except (AttributeError, IndexError):
+        return ["Response contained no text"]
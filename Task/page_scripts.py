@@ -0,0 +1,263 @@
+# JavaScript snippets executed in the page through Selenium.
+# Each one does its work in a single round-trip and returns plain JSON-able values.
+
+# Scrolls to the bottom, then waits in-page until the network is idle and the DOM has stopped
+# changing (or max_wait_ms passes). Installs a fetch/XHR counter and MutationObserver once per page.
+# Arguments: max_wait_ms, quiet_ms, item_selector (or null), callback
+SCROLL_STEP_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var maxWait = arguments[0], quietMs = arguments[1], selector = arguments[2];
+var m = window.__scrollMonitor;
+if (!m) {
+    m = window.__scrollMonitor = {pending: 0, lastMutation: Date.now()};
+    new MutationObserver(function () { m.lastMutation = Date.now(); })
+        .observe(document.documentElement, {childList: true, subtree: true});
+    if (window.fetch) {
+        var originalFetch = window.fetch;
+        window.fetch = function () {
+            m.pending++;
+            return originalFetch.apply(this, arguments).finally(function () {
+                m.pending--;
+                m.lastMutation = Date.now();
+            });
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        m.pending++;
+        this.addEventListener('loadend', function () { m.pending--; m.lastMutation = Date.now(); });
+        return originalSend.apply(this, arguments);
+    };
+}
+function countItems() {
+    return selector ? document.querySelectorAll(selector).length : document.getElementsByTagName('*').length;
+}
+window.scrollTo(0, document.body.scrollHeight);
+var start = Date.now();
+(function poll() {
+    var now = Date.now();
+    var quiet = m.pending <= 0 && now - m.lastMutation >= quietMs && now - start >= quietMs;
+    if (quiet || now - start >= maxWait) {
+        done({height: document.body.scrollHeight, items: countItems(), pending: m.pending, waited: now - start});
+    } else {
+        setTimeout(poll, 50);
+    }
+})();
+"""
+
+# Returns the current scroll height and item count without scrolling.
+# Arguments: item_selector (or null)
+PAGE_SIZE_SCRIPT = """
+var selector = arguments[0];
+return {
+    height: document.body.scrollHeight,
+    items: selector ? document.querySelectorAll(selector).length : document.getElementsByTagName('*').length
+};
+"""
+
+# Evaluates every candidate selector in one pass and returns the first match's text for each,
+# plus a bounded slice of the main content text for pattern matching.
+# Arguments: selectors (CSS, or XPath when starting with '/'), max_chars_per_match, text_limit
+EVALUATE_CANDIDATES_SCRIPT = """
+var selectors = arguments[0], maxChars = arguments[1], textLimit = arguments[2];
+var matches = [];
+for (var i = 0; i < selectors.length; i++) {
+    var selector = selectors[i], element = null;
+    try {
+        if (selector.charAt(0) === '/') {
+            element = document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        } else {
+            element = document.querySelector(selector);
+        }
+    } catch (e) {
+        element = null;
+    }
+    matches.push(element ? (element.innerText || element.textContent || '').trim().slice(0, maxChars) : null);
+}
+var root = document.querySelector('main, [role=main], #content, #main') || document.body;
+return {matches: matches, text: root ? (root.innerText || '').slice(0, textLimit) : ''};
+"""
+
+# Lists elements that carry text, as "tag#id.class: text" lines, for diagnosis and rule regeneration.
+# Arguments: max_elements, max_text_chars
+ELEMENT_OUTLINE_SCRIPT = """
+var maxElements = arguments[0], maxText = arguments[1];
+var lines = [], seen = {};
+var elements = document.body ? document.body.querySelectorAll('*') : [];
+for (var i = 0; i < elements.length && lines.length < maxElements; i++) {
+    var el = elements[i];
+    if (['SCRIPT', 'STYLE', 'NOSCRIPT', 'SVG', 'PATH'].indexOf(el.tagName) !== -1) continue;
+    var own = '';
+    for (var j = 0; j < el.childNodes.length; j++) {
+        if (el.childNodes[j].nodeType === 3) own += el.childNodes[j].textContent;
+    }
+    own = own.replace(/\\s+/g, ' ').trim();
+    if (!own) continue;
+    var label = el.tagName.toLowerCase() + (el.id ? '#' + el.id : '') +
+        (typeof el.className === 'string' && el.className.trim() ? '.' + el.className.trim().split(/\\s+/).join('.') : '');
+    var line = label + ': ' + own.slice(0, maxText);
+    if (seen[line]) continue;
+    seen[line] = true;
+    lines.push(line);
+}
+return lines;
+"""
+
+# Condenses the live DOM into an indented skeleton of tag#id.class paths with short text samples.
+# Single-child wrappers are collapsed into one "a > b > c" line and runs of 3+ siblings with the same
+# tag/class signature are shown once with a repeat count. Output stops at max_chars.
+# Arguments: max_chars, max_text_chars
+DOM_SUMMARY_SCRIPT = """
+var maxChars = arguments[0], maxText = arguments[1];
+var SKIP = {SCRIPT: 1, STYLE: 1, NOSCRIPT: 1, SVG: 1, PATH: 1, META: 1, LINK: 1, TEMPLATE: 1, BR: 1, HR: 1};
+var KEEP_EMPTY = {INPUT: 1, BUTTON: 1, SELECT: 1, TEXTAREA: 1, IMG: 1, A: 1, FORM: 1, IFRAME: 1};
+var ATTRS = ['name', 'type', 'role', 'aria-label', 'placeholder', 'itemprop', 'data-testid', 'href', 'value'];
+var lines = [], used = 0, truncated = false;
+
+function classes(el) {
+    return typeof el.className === 'string' && el.className.trim() ? el.className.trim().split(/\\s+/) : [];
+}
+function label(el) {
+    var text = el.tagName.toLowerCase() + (el.id ? '#' + el.id : '');
+    var cls = classes(el).slice(0, 3);
+    if (cls.length) text += '.' + cls.join('.');
+    for (var i = 0; i < ATTRS.length; i++) {
+        var value = el.getAttribute(ATTRS[i]);
+        if (value) text += '[' + ATTRS[i] + '="' + value.slice(0, 40) + '"]';
+    }
+    return text;
+}
+function ownText(el) {
+    var text = '';
+    for (var i = 0; i < el.childNodes.length; i++) {
+        if (el.childNodes[i].nodeType === 3) text += el.childNodes[i].textContent;
+    }
+    text = text.replace(/\\s+/g, ' ').trim();
+    return text.length > maxText ? text.slice(0, maxText) + '...' : text;
+}
+function signature(el) {
+    return el.tagName + '.' + classes(el).sort().join('.');
+}
+function emit(line) {
+    if (used + line.length + 1 > maxChars) {
+        truncated = true;
+        return false;
+    }
+    lines.push(line);
+    used += line.length + 1;
+    return true;
+}
+function hasContent(el) {
+    return KEEP_EMPTY[el.tagName] || el.children.length > 0 || (el.textContent || '').trim().length > 0;
+}
+function walk(el, depth) {
+    if (truncated || depth > 30 || SKIP[el.tagName] || el.hidden || !hasContent(el)) return;
+    var chain = label(el), text = ownText(el);
+    while (!text && el.children.length === 1 && !SKIP[el.children[0].tagName]) {
+        el = el.children[0];
+        chain += ' > ' + label(el);
+        text = ownText(el);
+    }
+    var indent = new Array(depth + 1).join('  ');
+    if (!emit(indent + chain + (text ? ': "' + text + '"' : ''))) return;
+
+    var counts = {}, shown = {};
+    for (var i = 0; i < el.children.length; i++) {
+        var sig = signature(el.children[i]);
+        counts[sig] = (counts[sig] || 0) + 1;
+    }
+    for (var j = 0; j < el.children.length && !truncated; j++) {
+        var child = el.children[j], childSig = signature(child);
+        if (counts[childSig] >= 3) {
+            if (shown[childSig]) continue;
+            shown[childSig] = true;
+            walk(child, depth + 1);
+            emit(indent + '  ... ' + (counts[childSig] - 1) + ' more ' + label(child) + ' (repeated structure)');
+        } else {
+            walk(child, depth + 1);
+        }
+    }
+}
+
+if (document.body) walk(document.body, 0);
+if (truncated) lines.push('[summary truncated]');
+return {title: document.title, url: location.href, summary: lines.join('\\n')};
+"""
+
+# Checks selector syntax in the browser's own engine and counts matches, without any waiting.
+# Arguments: selectors (CSS, or XPath when starting with '/')
+VALIDATE_SELECTORS_SCRIPT = """
+var selectors = arguments[0];
+return selectors.map(function (selector) {
+    try {
+        if (selector.charAt(0) === '/') {
+            var result = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            return {valid: true, count: result.snapshotLength};
+        }
+        return {valid: true, count: document.querySelectorAll(selector).length};
+    } catch (e) {
+        return {valid: false, count: 0, error: String(e.message || e)};
+    }
+});
+"""
+
+# Serializes the document once inside the page and hands it out in slices, so Python only
+# ever holds one chunk. Arguments: offset, length. Offset 0 (re)serializes; returns null when done.
+PAGE_CHUNK_SCRIPT = """
+var offset = arguments[0], length = arguments[1];
+if (offset === 0 || window.__pageHtml === undefined) {
+    window.__pageHtml = document.documentElement.outerHTML;
+}
+var html = window.__pageHtml;
+if (offset >= html.length) {
+    delete window.__pageHtml;
+    return null;
+}
+// Offsets are in UTF-16 code units; never end a chunk between the halves of a surrogate pair
+var end = Math.min(offset + length, html.length);
+if (end < html.length && end - offset > 1) {
+    var code = html.charCodeAt(end - 1);
+    if (code >= 0xD800 && code <= 0xDBFF) {
+        end -= 1;
+    }
+}
+return [html.substring(offset, end), end];
+"""
+
+PAGE_CHUNK_CLEANUP_SCRIPT = "delete window.__pageHtml;"
+
+# Checks every outstanding field in one round-trip: for each field, the first of its selectors
+# whose element is visible, with its text. Invalid selectors are reported so they are not retried.
+# Arguments: [[field, [selectors...]], ...]
+# Returns {field: {selector, text} | {errors: [...]} | null}
+POLL_FIELDS_SCRIPT = """
+var fields = arguments[0], found = {};
+function visible(el) {
+    if (!el.getClientRects().length) return false;
+    var style = window.getComputedStyle(el);
+    return style.visibility !== 'hidden' && style.display !== 'none';
+}
+for (var i = 0; i < fields.length; i++) {
+    var name = fields[i][0], selectors = fields[i][1], errors = [];
+    found[name] = null;
+    for (var j = 0; j < selectors.length; j++) {
+        var selector = selectors[j], element = null;
+        try {
+            if (selector.charAt(0) === '/') {
+                element = document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            } else {
+                element = document.querySelector(selector);
+            }
+        } catch (e) {
+            errors.push(selector);
+            continue;
+        }
+        if (element && element.nodeType === 1 && visible(element)) {
+            found[name] = {selector: selector, text: (element.innerText || '').trim()};
+            break;
+        }
+    }
+    if (!found[name] && errors.length === selectors.length) found[name] = {errors: errors};
+}
+return found;
+"""
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from metrics import metrics
+
+
+def positive_rate(value):
+    """Parse and validate a requests-per-second rate (also usable as an argparse type)"""
+    rate = float(value)
+    if not rate > 0:
+        raise ValueError(f"rate must be greater than 0, got {value!r}")
+    return rate
+
+
+class TokenBucket:
+    """Allows rate acquisitions per second on average, with bursts of up to burst"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = positive_rate(rate)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def is_full(self, now=None):
+        """True when the bucket has refilled completely, i.e. it is indistinguishable from a new one"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+    def acquire(self, timeout=None):
+        """Block until a token is available; returns seconds waited, or None if timeout passed first"""
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start
+                wait = (1 - self.tokens) / self.rate
+            if timeout is not None and now + wait - start > timeout:
+                return None
+            time.sleep(wait)
+
+
+class RobotsCache:
+    """Fetches and caches robots.txt per origin; unreachable or missing files allow everything"""
+
+    def __init__(self, user_agent="*", ttl=3600, fetch_timeout=5, max_entries=10000):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fetch_timeout = fetch_timeout
+        self.lock = threading.Lock()
+        self.parsers = {}  # origin -> (fetched_at, parser or None)
+
+    def _parser(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self.lock:
+            cached = self.parsers.get(origin)
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            metrics.inc("cache_lookups_total", cache="robots", result="hit")
+            return cached[1]
+        metrics.inc("cache_lookups_total", cache="robots", result="miss")
+
+        parser = None
+        try:
+            request = urllib.request.Request(f"{origin}/robots.txt", headers={"User-Agent": self.user_agent})
+            with urllib.request.urlopen(request, timeout=self.fetch_timeout) as response:
+                parser = RobotFileParser()
+                parser.parse(response.read().decode("utf-8", errors="replace").splitlines())
+        except Exception as e:
+            logging.debug(f"No robots.txt for {origin}: {str(e)}")
+        with self.lock:
+            now = time.monotonic()
+            if len(self.parsers) >= self.max_entries:
+                self._evict(now)
+            self.parsers[origin] = (now, parser)
+        return parser
+
+    def _evict(self, now):
+        """Drop expired entries, then the oldest ones if the cache is still full (lock held)"""
+        for origin in [o for o, (fetched, _) in self.parsers.items() if now - fetched >= self.ttl]:
+            del self.parsers[origin]
+        excess = len(self.parsers) - self.max_entries + 1
+        if excess > 0:
+            for origin in sorted(self.parsers, key=lambda o: self.parsers[o][0])[:excess]:
+                del self.parsers[origin]
+
+    def max_rate(self, url):
+        """Highest request rate (per second) robots.txt allows for url's site, or None if unrestricted"""
+        parser = self._parser(url)
+        if parser is None:
+            return None
+        rates = []
+        delay = parser.crawl_delay(self.user_agent)
+        if delay and float(delay) > 0:
+            rates.append(1.0 / float(delay))
+        request_rate = parser.request_rate(self.user_agent)
+        if request_rate and request_rate.seconds and request_rate.requests > 0:
+            rates.append(request_rate.requests / request_rate.seconds)
+        return min(rates) if rates else None
+
+
+class DomainRateLimiter:
+    """One token bucket per host, so each site is throttled while different sites run in parallel.
+
+    A host's rate is rates[host] (or default_rate), lowered to its robots.txt crawl-delay /
+    request-rate when respect_robots is set.
+    """
+
+    def __init__(self, default_rate=1.0, burst=2, rates=None, respect_robots=True, user_agent="*", max_buckets=10000):
+        self.default_rate = positive_rate(default_rate)
+        self.burst = burst
+        self.rates = {host: positive_rate(rate) for host, rate in (rates or {}).items()}
+        self.max_buckets = max_buckets
+        self.robots = RobotsCache(user_agent) if respect_robots else None
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def configure(self, default_rate=None, respect_robots=None):
+        """Change the default rate and robots.txt handling; existing buckets are rebuilt on next use"""
+        with self.lock:
+            if default_rate is not None:
+                self.default_rate = positive_rate(default_rate)
+            if respect_robots is not None:
+                self.robots = (self.robots or RobotsCache()) if respect_robots else None
+            self.buckets.clear()
+
+    def set_rate(self, host, rate):
+        rate = positive_rate(rate)
+        with self.lock:
+            self.rates[host] = rate
+            self.buckets.pop(host, None)
+
+    def _bucket(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+        if bucket is not None:
+            return host, bucket
+
+        # Looked up outside the lock so a slow robots.txt only delays its own host
+        rate = self.rates.get(host, self.default_rate)
+        if self.robots is not None:
+            robots_rate = self.robots.max_rate(url)
+            if robots_rate is not None and robots_rate < rate:
+                logging.info(f"robots.txt limits {host} to {robots_rate:.3f} requests/s")
+                rate = robots_rate
+        with self.lock:
+            if host not in self.buckets and len(self.buckets) >= self.max_buckets:
+                self._evict_idle()
+            bucket = self.buckets.setdefault(host, TokenBucket(rate, self.burst))
+        return host, bucket
+
+    def _evict_idle(self):
+        """Drop buckets that have refilled completely; a fresh bucket would behave the same (lock held)"""
+        now = time.monotonic()
+        for host in [h for h, bucket in self.buckets.items() if bucket.is_full(now)]:
+            del self.buckets[host]
+
+    def acquire(self, url, timeout=None):
+        """Wait for url's host to allow another request; returns seconds waited (None on timeout)"""
+        if not urlsplit(url).netloc:
+            return 0.0
+        host, bucket = self._bucket(url)
+        waited = bucket.acquire(timeout)
+        if waited:
+            logging.debug(f"Rate limited {host} for {waited:.2f}s")
+        return waited
+
+
+# Shared by every automation instance in the process so parallel workers respect the same limits
+rate_limiter = DomainRateLimiter()
@@ -0,0 +1,197 @@
+import logging
+import random
+import threading
+import time
+
+from metrics import metrics
+from tracing import tracer
+
+# Exception class names treated as transient, so this module needs neither selenium nor anthropic
+TRANSIENT_WEBDRIVER_ERRORS = {
+    "StaleElementReferenceException", "ElementClickInterceptedException", "TimeoutException",
+    "JavascriptException", "NoSuchWindowException"
+}
+# A plain WebDriverException from browser.get is only retried when its message names a transient
+# network condition; DNS failures, invalid URLs and the like fail the same way on every attempt
+TRANSIENT_NAVIGATION_MESSAGES = (
+    "timed out", "timeout", "err_connection_reset", "err_connection_closed", "err_connection_refused",
+    "err_connection_aborted", "err_empty_response", "err_network_changed", "err_internet_disconnected",
+    "err_proxy_connection_failed", "connection reset", "connection refused", "connection aborted"
+)
+TRANSIENT_LLM_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+                        "OverloadedError"}
+TRANSIENT_HTTP_STATUSES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an operation whose circuit breaker is open"""
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter; retryable(exception) decides which failures are retried"""
+
+    def __init__(self, attempts=3, base_delay=0.5, max_delay=10.0, multiplier=2.0, retryable=None, name="default"):
+        self.name = name
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.retryable = retryable or (lambda e: True)
+
+    def delay(self, attempt, error=None):
+        """Seconds to wait before retry number attempt (0-based), honouring a server's retry-after"""
+        ceiling = min(self.max_delay, self.base_delay * self.multiplier ** attempt)
+        delay = random.uniform(0, ceiling)
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive failures and fails fast for reset_timeout seconds,
+    then lets a single trial call through (half-open) to decide whether to close again."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                logging.info(f"Circuit '{self.name}' closed")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def release(self):
+        """End a half-open trial that proved nothing either way, leaving the circuit as it was"""
+        with self.lock:
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logging.warning(f"Circuit '{self.name}' opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+
+class CircuitRegistry:
+    """Circuit breakers created on first use and keyed by name, e.g. "domain:example.com" or "llm:<model>" """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.breakers = {}
+
+    def get(self, name):
+        with self.lock:
+            breaker = self.breakers.get(name)
+            if breaker is None:
+                breaker = self.breakers[name] = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def report(self):
+        with self.lock:
+            return {name: {"state": b.state, "failures": b.failures} for name, b in self.breakers.items()}
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_transient_webdriver_error(error):
+    return type(error).__name__ in TRANSIENT_WEBDRIVER_ERRORS
+
+
+def is_transient_navigation_error(error):
+    if is_transient_webdriver_error(error) or isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ != "WebDriverException":
+        return False
+    message = str(error).lower()
+    return any(pattern in message for pattern in TRANSIENT_NAVIGATION_MESSAGES)
+
+
+def is_transient_llm_error(error):
+    return (type(error).__name__ in TRANSIENT_LLM_ERRORS
+            or getattr(error, "status_code", None) in TRANSIENT_HTTP_STATUSES)
+
+
+WEBDRIVER_POLICY = RetryPolicy(attempts=3, base_delay=0.25, max_delay=2.0, retryable=is_transient_webdriver_error,
+                               name="webdriver")
+NAVIGATION_POLICY = RetryPolicy(attempts=3, base_delay=1.0, max_delay=10.0, retryable=is_transient_navigation_error,
+                                name="navigation")
+LLM_POLICY = RetryPolicy(attempts=4, base_delay=1.0, max_delay=30.0, retryable=is_transient_llm_error, name="llm")
+
+# Shared by every automation instance in the process, so all workers see a dead site or API at once
+breakers = CircuitRegistry()
+
+
+def call_with_retry(func, policy, breaker=None, description="operation"):
+    """Call func() under policy, failing fast with CircuitOpenError while breaker is open.
+
+    Only retryable failures count against the breaker; other exceptions are raised immediately
+    and neither open nor close it.
+    """
+    for attempt in range(policy.attempts):
+        if breaker is not None and not breaker.allow():
+            metrics.inc("circuit_rejections_total", policy=policy.name)
+            raise CircuitOpenError(f"Circuit '{breaker.name}' is open; skipping {description}")
+        try:
+            result = func()
+        except Exception as e:
+            if not policy.retryable(e):
+                if breaker is not None:
+                    # Could be a bug on our side, so it says nothing about the endpoint's health
+                    breaker.release()
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt == policy.attempts - 1:
+                raise
+            delay = policy.delay(attempt, e)
+            metrics.inc("retries_total", policy=policy.name)
+            span = tracer.current_span()
+            if span is not None:
+                span.add("retries")
+            logging.warning("%s failed (%s: %.200s); retry %d/%d in %.2fs", description, type(e).__name__, e,
+                            attempt + 1, policy.attempts - 1, delay)
+            time.sleep(delay)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import threading
+
+
+class SelectorStats:
+    """Per-domain record of which selectors/patterns won for each field type, persisted as JSON"""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, filename="selector_stats.json", autosave_every=20):
+        self.filename = filename
+        self.autosave_every = autosave_every
+        self.lock = threading.Lock()
+        self.wins = {}
+        self.updates = 0
+        if filename and os.path.exists(filename):
+            try:
+                with open(filename, "r", encoding="utf-8") as f:
+                    self.wins = json.load(f).get("wins", {})
+            except Exception as e:
+                logging.warning(f"Could not load selector stats from {filename}: {str(e)}")
+
+    @classmethod
+    def shared(cls, filename="selector_stats.json"):
+        """One instance per file for the whole process, so parallel workers update and save the same stats"""
+        with cls._shared_lock:
+            if filename not in cls._shared:
+                cls._shared[filename] = cls(filename)
+            return cls._shared[filename]
+
+    @staticmethod
+    def _key(field_type, kind):
+        # Selectors and regex patterns are kept apart so one is never tried as the other
+        return f"{field_type}:{kind}"
+
+    def ranked(self, domain, field_type, candidates, kind="selector"):
+        """Order candidates so historical winners of this kind for this domain come first, then the defaults in order"""
+        with self.lock:
+            history = dict(self.wins.get(domain, {}).get(self._key(field_type, kind), {}))
+        known = sorted((c for c in history if c not in candidates), key=lambda c: -history[c])
+        defaults = sorted(candidates, key=lambda c: -history.get(c, 0))
+        return known + defaults
+
+    def record_win(self, domain, field_type, candidate, kind="selector"):
+        with self.lock:
+            field_wins = self.wins.setdefault(domain, {}).setdefault(self._key(field_type, kind), {})
+            field_wins[candidate] = field_wins.get(candidate, 0) + 1
+            self.updates += 1
+            should_save = self.autosave_every and self.updates % self.autosave_every == 0
+        if should_save:
+            self.save()
+
+    def save(self):
+        """Atomically write stats to disk"""
+        if not self.filename:
+            return
+        with self.lock:
+            data = json.dumps({"wins": self.wins}, indent=2)
+        try:
+            temp_file = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_file, self.filename)
+        except Exception as e:
+            logging.warning(f"Could not save selector stats to {self.filename}: {str(e)}")
+
+
+class SelectorHealth:
+    """Rolling per-domain, per-field success rates for extraction rules, plus promoted replacement rules"""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, filename="selector_health.json", window=20, threshold=0.5, min_samples=3,
+                 heal_cooldown=600):
+        self.filename = filename
+        self.window = window
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.heal_cooldown = heal_cooldown
+        self.lock = threading.Lock()
+        self.fields = {}
+        self.promoted = {}
+        if filename and os.path.exists(filename):
+            try:
+                with open(filename, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.fields = data.get("fields", {})
+                self.promoted = data.get("promoted", {})
+            except Exception as e:
+                logging.warning(f"Could not load selector health from {filename}: {str(e)}")
+
+    @classmethod
+    def shared(cls, filename="selector_health.json"):
+        """One instance per file for the whole process, so parallel workers update and save the same stats"""
+        with cls._shared_lock:
+            if filename not in cls._shared:
+                cls._shared[filename] = cls(filename)
+            return cls._shared[filename]
+
+    def _entry(self, domain, field):
+        return self.fields.setdefault(domain, {}).setdefault(
+            field, {"outcomes": [], "last_heal_attempt": 0, "alerted": False}
+        )
+
+    def record(self, domain, field, success):
+        """Record whether the rule for a field matched, alerting when the hit rate crosses the threshold"""
+        with self.lock:
+            entry = self._entry(domain, field)
+            entry["outcomes"] = (entry["outcomes"] + [1 if success else 0])[-self.window:]
+            rate = self._rate(entry)
+            if rate is not None and rate < self.threshold and not entry["alerted"]:
+                entry["alerted"] = True
+                logging.warning(f"ALERT: selector hit rate for '{field}' on {domain} dropped to {rate:.0%} "
+                                f"over the last {len(entry['outcomes'])} extractions")
+            elif rate is not None and rate >= self.threshold:
+                entry["alerted"] = False
+
+    def _rate(self, entry):
+        outcomes = entry["outcomes"]
+        if len(outcomes) < self.min_samples:
+            return None
+        return sum(outcomes) / len(outcomes)
+
+    def success_rate(self, domain, field):
+        with self.lock:
+            entry = self.fields.get(domain, {}).get(field)
+            return self._rate(entry) if entry else None
+
+    def needs_healing(self, domain, field, now):
+        """True when the field's hit rate is below threshold and no heal was attempted recently"""
+        with self.lock:
+            entry = self.fields.get(domain, {}).get(field)
+            if not entry:
+                return False
+            rate = self._rate(entry)
+            return rate is not None and rate < self.threshold and now - entry["last_heal_attempt"] >= self.heal_cooldown
+
+    def mark_heal_attempt(self, domain, field, now):
+        with self.lock:
+            self._entry(domain, field)["last_heal_attempt"] = now
+
+    def promote(self, domain, field, selector):
+        """Make a verified selector the preferred rule for a field and reset its health window"""
+        with self.lock:
+            self.promoted.setdefault(domain, {})[field] = selector
+            entry = self._entry(domain, field)
+            entry["outcomes"] = []
+            entry["alerted"] = False
+        logging.info(f"Promoted selector '{selector}' for '{field}' on {domain}")
+        self.save()
+
+    def apply_promoted(self, domain, rules):
+        """Return rules with promoted selectors tried before the original ones"""
+        with self.lock:
+            promoted = dict(self.promoted.get(domain, {}))
+        if not promoted:
+            return rules
+        merged = {}
+        for field, selectors in rules.items():
+            if field in promoted and isinstance(selectors, (str, list)):
+                original = [selectors] if isinstance(selectors, str) else selectors
+                merged[field] = [promoted[field]] + [s for s in original if s != promoted[field]]
+            else:
+                merged[field] = selectors
+        return merged
+
+    def report(self, domain=None):
+        """Success rates per domain and field"""
+        with self.lock:
+            return {
+                d: {field: self._rate(entry) for field, entry in fields.items()}
+                for d, fields in self.fields.items() if domain is None or d == domain
+            }
+
+    def save(self):
+        if not self.filename:
+            return
+        with self.lock:
+            data = json.dumps({"fields": self.fields, "promoted": self.promoted}, indent=2)
+        try:
+            temp_file = f"{self.filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_file, self.filename)
+        except Exception as e:
+            logging.warning(f"Could not save selector health to {self.filename}: {str(e)}")
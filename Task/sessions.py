@@ -0,0 +1,106 @@
+import json
+import logging
+import os
+import re
+import time
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = Exception
+
+
+class SessionStore:
+    """Encrypted cookie jars keyed by site identity (e.g. "github:alice"), shareable between browsers.
+
+    Jars hold every cookie in the browser (read through CDP, so not just the current domain)
+    and are encrypted with Fernet. The key comes from SESSION_STORE_KEY or a 0600 key file
+    created next to the jars.
+    """
+
+    def __init__(self, directory="sessions", key=None):
+        self.directory = directory
+        self.fernet = None
+        if Fernet is None:
+            logging.warning("cryptography is not installed; session persistence is disabled")
+            return
+        os.makedirs(directory, exist_ok=True)
+        key = key or os.getenv("SESSION_STORE_KEY") or self._load_or_create_key()
+        self.fernet = Fernet(key)
+
+    def _load_or_create_key(self):
+        key_file = os.path.join(self.directory, ".key")
+        if os.path.exists(key_file):
+            with open(key_file, "rb") as f:
+                return f.read().strip()
+        key = Fernet.generate_key()
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+        logging.info(f"Created session encryption key at {key_file}")
+        return key
+
+    @property
+    def enabled(self):
+        return self.fernet is not None
+
+    def _path(self, identity):
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", identity)
+        return os.path.join(self.directory, f"{safe}.session")
+
+    def exists(self, identity):
+        return self.enabled and os.path.exists(self._path(identity))
+
+    def save(self, identity, browser):
+        """Encrypt and store all of the browser's cookies under identity"""
+        if not self.enabled:
+            return False
+        try:
+            cookies = browser.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+            data = json.dumps({"saved_at": time.time(), "cookies": cookies}).encode("utf-8")
+            path = self._path(identity)
+            temp_file = f"{path}.tmp"
+            fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.fernet.encrypt(data))
+            os.replace(temp_file, path)
+            logging.info(f"Saved {len(cookies)} cookies for session '{identity}'")
+            return True
+        except Exception as e:
+            logging.error(f"Error saving session '{identity}': {str(e)}")
+            return False
+
+    def load(self, identity, browser):
+        """Restore the stored cookies for identity into the browser; returns the number restored"""
+        if not self.exists(identity):
+            return 0
+        try:
+            with open(self._path(identity), "rb") as f:
+                data = json.loads(self.fernet.decrypt(f.read()))
+            now = time.time()
+            cookies = [
+                self._to_cookie_param(cookie) for cookie in data["cookies"]
+                if cookie.get("session") or cookie.get("expires", -1) <= 0 or cookie["expires"] > now
+            ]
+            browser.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+            logging.info(f"Restored {len(cookies)} cookies for session '{identity}'")
+            return len(cookies)
+        except InvalidToken:
+            logging.error(f"Session '{identity}' could not be decrypted with the current key")
+        except Exception as e:
+            logging.error(f"Error loading session '{identity}': {str(e)}")
+        return 0
+
+    def delete(self, identity):
+        if os.path.exists(self._path(identity)):
+            os.remove(self._path(identity))
+
+    @staticmethod
+    def _to_cookie_param(cookie):
+        """Convert a Network.Cookie into the Network.CookieParam shape setCookies expects"""
+        allowed = ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite", "expires", "priority")
+        param = {key: cookie[key] for key in allowed if key in cookie}
+        if cookie.get("session") or param.get("expires", -1) <= 0:
+            param.pop("expires", None)
+        return param
@@ -0,0 +1,214 @@
+import re
+from html.parser import HTMLParser
+
+from page_scripts import PAGE_CHUNK_CLEANUP_SCRIPT, PAGE_CHUNK_SCRIPT
+
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+HEADER_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+# Block-level tags that implicitly close an open <p>
+P_CLOSERS = HEADER_TAGS | {"p", "div", "ul", "ol", "table", "section", "article", "header", "footer", "li",
+                           "blockquote", "pre", "form", "nav", "main", "aside"}
+
+
+def iter_page_chunks(browser, chunk_size=1_000_000):
+    """Yield the page HTML in chunks of about chunk_size characters.
+
+    The script returns the offset of the next chunk, since JavaScript counts UTF-16 code units
+    and Python counts code points. The page's copy of the HTML is dropped even if iteration stops early.
+    """
+    offset = 0
+    try:
+        while True:
+            result = browser.execute_script(PAGE_CHUNK_SCRIPT, offset, chunk_size)
+            if not result:
+                return
+            chunk, offset = result
+            yield chunk
+    finally:
+        try:
+            browser.execute_script(PAGE_CHUNK_CLEANUP_SCRIPT)
+        except Exception:
+            pass
+
+
+def _span(value):
+    try:
+        return max(1, min(int(value), 1000))
+    except (TypeError, ValueError):
+        return 1
+
+
+class StreamingContentParser(HTMLParser):
+    """Incremental HTML parser that emits content events instead of building a tree.
+
+    Events (collected into self.events, drained by the caller after each feed()):
+      ("title", text), ("header", level, text), ("paragraph", text),
+      ("list_start",), ("list_item", text), ("list_end",),
+      ("table_start",), ("table_row", cells, in_thead), ("table_end",), ("link", href)
+    where cells are (text, colspan, rowspan, is_header) tuples.
+    Text kept for any single element is capped at max_element_chars.
+    """
+
+    def __init__(self, max_element_chars=20000):
+        super().__init__(convert_charrefs=True)
+        self.max_element_chars = max_element_chars
+        self.events = []
+        self.skip_depth = 0
+        self.captures = []  # open text-collecting elements: [tag, parts, length, extra]
+        self.tables = []  # per open table, its open rows: [cells, in_thead]
+        self.thead_depth = 0
+        self.list_depth = 0
+
+    def _open(self, tag, extra=None):
+        self.captures.append([tag, [], 0, extra])
+
+    def _close(self, tag):
+        """Close the innermost open capture for tag (and anything opened inside it)"""
+        for index in range(len(self.captures) - 1, -1, -1):
+            if self.captures[index][0] == tag:
+                break
+        else:
+            return
+        while len(self.captures) > index:
+            self._emit(self.captures.pop())
+
+    def _is_open(self, *tags):
+        return any(capture[0] in tags for capture in self.captures)
+
+    def _emit(self, capture):
+        tag, parts, _, extra = capture
+        text = re.sub(r"\s+", " ", "".join(parts)).strip()
+        if tag in ("td", "th"):
+            colspan, rowspan, table_level = extra
+            if table_level <= len(self.tables) and self.tables[table_level - 1]:
+                self.tables[table_level - 1][-1][0].append((text, colspan, rowspan, tag == "th"))
+        elif not text:
+            return
+        elif tag == "title":
+            self.events.append(("title", text))
+        elif tag in HEADER_TAGS:
+            self.events.append(("header", int(tag[1]), text))
+        elif tag == "p":
+            self.events.append(("paragraph", text))
+        elif tag == "li":
+            self.events.append(("list_item", text))
+
+    def _close_cell(self):
+        """Close the open cell of the innermost table, leaving cells of enclosing tables open"""
+        for index in range(len(self.captures) - 1, -1, -1):
+            tag, _, _, extra = self.captures[index]
+            if tag in ("td", "th"):
+                if extra[2] == len(self.tables):
+                    while len(self.captures) > index:
+                        self._emit(self.captures.pop())
+                return
+
+    def _current_rows(self):
+        if not self.tables:
+            # Rows or cells outside any <table> get an implicit one
+            self.tables.append([])
+        return self.tables[-1]
+
+    def _close_row(self):
+        self._close_cell()
+        rows = self.tables[-1] if self.tables else []
+        if rows:
+            cells, in_thead = rows.pop()
+            if cells:
+                self.events.append(("table_row", cells, in_thead))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if self.skip_depth:
+            return
+        if tag in P_CLOSERS and self._is_open("p"):
+            self._close("p")
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.events.append(("link", href))
+
+        if tag == "title" or tag in HEADER_TAGS or tag == "p":
+            self._open(tag)
+        elif tag == "li":
+            # A new <li> closes its open sibling, but not an <li> of an enclosing list
+            if self.captures and self.captures[-1][0] == "li" and self.captures[-1][3] == self.list_depth:
+                self._close("li")
+            self._open(tag, self.list_depth)
+        elif tag in ("ul", "ol"):
+            self.list_depth += 1
+            self.events.append(("list_start",))
+        elif tag == "table":
+            self.tables.append([])
+            self.events.append(("table_start",))
+        elif tag == "thead":
+            self.thead_depth += 1
+        elif tag == "tr":
+            if self._current_rows():
+                self._close_row()
+            self.tables[-1].append([[], self.thead_depth > 0])
+        elif tag in ("td", "th"):
+            self._close_cell()
+            rows = self._current_rows()
+            if not rows:
+                rows.append([[], self.thead_depth > 0])
+            attributes = dict(attrs)
+            self._open(tag, (_span(attributes.get("colspan")), _span(attributes.get("rowspan")), len(self.tables)))
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+            return
+        if self.skip_depth:
+            return
+        if tag in ("td", "th"):
+            self._close_cell()
+        elif tag == "title" or tag in HEADER_TAGS or tag in ("p", "li"):
+            self._close(tag)
+        elif tag in ("ul", "ol"):
+            if self.captures and self.captures[-1][0] == "li" and self.captures[-1][3] == self.list_depth:
+                self._close("li")
+            self.list_depth = max(0, self.list_depth - 1)
+            self.events.append(("list_end",))
+        elif tag == "thead":
+            self.thead_depth = max(0, self.thead_depth - 1)
+        elif tag == "tr":
+            self._close_row()
+        elif tag == "table" and self.tables:
+            while self.tables[-1]:
+                self._close_row()
+            self.tables.pop()
+            self.events.append(("table_end",))
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        # Nested captures (e.g. a <p> inside an <li>) each see the text, like get_text() would
+        for capture in self.captures:
+            if capture[2] < self.max_element_chars:
+                capture[1].append(data)
+                capture[2] += len(data)
+
+    def close(self):
+        super().close()
+        while self.captures:
+            self._emit(self.captures.pop())
+        while self.tables:
+            while self.tables[-1]:
+                self._close_row()
+            self.tables.pop()
+
+
+def iter_content_events(chunks, max_element_chars=20000):
+    """Parse an iterable of HTML chunks and yield content events as soon as they complete"""
+    parser = StreamingContentParser(max_element_chars)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.events:
+            yield from parser.events
+            parser.events = []
+    parser.close()
+    yield from parser.events
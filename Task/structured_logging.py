@@ -0,0 +1,153 @@
+import atexit
+import itertools
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+from tracing import tracer
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s: %(message)s'
+
+# How many records of each sample key are written per one kept; override with LOG_SAMPLE_EVERY
+DEFAULT_SAMPLE_EVERY = {"selector": 20, "popup": 20}
+
+# Attributes every LogRecord has; anything else came from extra={...} and goes into the JSON output
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, level, thread, trace id and any extra fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage()
+        }
+        for key, value in record.__dict__.items():
+            if key not in STANDARD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in every N records logged with extra={"sample": key}; other records always pass.
+
+    Used for per-selector and per-popup debug events, which would otherwise dominate the output.
+    """
+
+    def __init__(self, sample_every=None):
+        super().__init__()
+        self.sample_every = dict(DEFAULT_SAMPLE_EVERY if sample_every is None else sample_every)
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None:
+            return True
+        every = self.sample_every.get(key, 1)
+        if every <= 1:
+            return True
+        counter = self.counters.get(key)
+        if counter is None:
+            with self.lock:
+                counter = self.counters.setdefault(key, itertools.count())
+        if next(counter) % every:
+            return False
+        record.sampled_every = every
+        return True
+
+
+class LazyQueueHandler(QueueHandler):
+    """Enqueues the record as-is instead of formatting it on the calling thread.
+
+    The message, arguments and exception are only rendered by the listener thread. Only the
+    current trace id is captured here, since spans are thread-local.
+    """
+
+    def prepare(self, record):
+        span = tracer.current_span()
+        if span is not None and not hasattr(record, "trace_id"):
+            record.trace_id = span.trace_id
+        return record
+
+
+_listener = None
+_handler = None
+_lock = threading.Lock()
+
+
+def _env_sample_every():
+    value = os.getenv("LOG_SAMPLE_EVERY")
+    if not value:
+        return None
+    # "20" applies to every key; "selector=50,popup=10" sets keys individually
+    if "=" not in value:
+        return {key: int(value) for key in DEFAULT_SAMPLE_EVERY}
+    return {key.strip(): int(every) for key, every in (item.split("=") for item in value.split(","))}
+
+
+def configure_logging(level=None, json_output=None, async_mode=True, sample_every=None, stream=None,
+                      filename=None):
+    """Install the root log handler; safe to call again to change settings.
+
+    Defaults come from LOG_LEVEL (INFO), LOG_FORMAT ("text" or "json") and LOG_SAMPLE_EVERY.
+    With async_mode the calling thread only checks the level, applies sampling and enqueues
+    the record; formatting and I/O happen on a background QueueListener thread.
+    """
+    global _listener, _handler
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if json_output is None:
+        json_output = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    if sample_every is None:
+        sample_every = _env_sample_every()
+
+    if filename:
+        output = logging.FileHandler(filename, encoding="utf-8")
+    else:
+        output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+
+    with _lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        if _handler is not None:
+            root.removeHandler(_handler)
+            _handler.close()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+        if async_mode:
+            records = queue.SimpleQueue()
+            _handler = LazyQueueHandler(records)
+            _listener = QueueListener(records, output, respect_handler_level=False)
+            _listener.start()
+        else:
+            _handler = output
+        _handler.addFilter(SamplingFilter(sample_every))
+        root.addHandler(_handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+    return _handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background writer"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,113 @@
+import collections
+import logging
+import time
+
+
+# Starts a navigation without blocking the WebDriver connection. The flag lives on the old
+# document's window, so it disappears once the new document has replaced it.
+START_NAVIGATION_SCRIPT = "window.__tabPending = true; window.location.href = arguments[0];"
+LOADED_SCRIPT = "return !window.__tabPending && document.readyState === 'complete';"
+
+
+class TabScheduler:
+    """Interleaves page loads across several tabs of one browser so their network waits overlap"""
+
+    def __init__(self, browser, max_tabs=4, load_timeout=30, poll_interval=0.1, rate_limiter=None):
+        self.browser = browser
+        self.rate_limiter = rate_limiter
+        self.max_tabs = max(1, max_tabs)
+        self.load_timeout = load_timeout
+        self.poll_interval = poll_interval
+
+    def _open_tabs(self, count):
+        handles = [self.browser.current_window_handle]
+        for _ in range(count - 1):
+            self.browser.switch_to.new_window("tab")
+            handles.append(self.browser.current_window_handle)
+        return handles
+
+    def _start(self, handle, url):
+        self.browser.switch_to.window(handle)
+        self.browser.execute_script(START_NAVIGATION_SCRIPT, url)
+
+    def _is_loaded(self, handle):
+        self.browser.switch_to.window(handle)
+        return self.browser.execute_script(LOADED_SCRIPT)
+
+    def run(self, urls, handler):
+        """Load every URL across the tabs and call handler(url) with that tab focused once it has loaded.
+
+        Returns a list of {"url", "result", "error", "load_time"} dicts in completion order.
+        """
+        pending = collections.deque(urls)
+        if not pending:
+            return []
+
+        original = self.browser.current_window_handle
+        handles = self._open_tabs(min(self.max_tabs, len(pending)))
+        free = list(handles)
+        busy = {}
+        results = []
+        try:
+            while pending or busy:
+                # Kick off navigations on every idle tab, skipping URLs whose domain is being rate limited
+                deferred = collections.deque()
+                while free and pending:
+                    url = pending.popleft()
+                    if self.rate_limiter is not None and self.rate_limiter.acquire(url, timeout=0) is None:
+                        deferred.append(url)
+                        continue
+                    handle = free.pop()
+                    try:
+                        self._start(handle, url)
+                        busy[handle] = (url, time.monotonic())
+                    except Exception as e:
+                        free.append(handle)
+                        results.append({"url": url, "result": None, "error": f"Navigation failed: {str(e)}",
+                                        "load_time": 0.0})
+
+                pending.extendleft(reversed(deferred))
+
+                progressed = False
+                for handle, (url, started) in list(busy.items()):
+                    load_time = time.monotonic() - started
+                    try:
+                        loaded = self._is_loaded(handle)
+                    except Exception as e:
+                        logging.debug(f"Load check failed for {url}: {str(e)}")
+                        loaded = False
+                    if not loaded and load_time < self.load_timeout:
+                        continue
+
+                    del busy[handle]
+                    free.append(handle)
+                    progressed = True
+                    entry = {"url": url, "result": None, "error": None, "load_time": round(load_time, 3)}
+                    if loaded:
+                        try:
+                            entry["result"] = handler(url)
+                        except Exception as e:
+                            entry["error"] = str(e)
+                    else:
+                        entry["error"] = f"Page load timed out after {self.load_timeout}s"
+                        try:
+                            self.browser.execute_script("window.stop();")
+                        except Exception:
+                            pass
+                    logging.info(f"Tab finished {url} in {entry['load_time']}s"
+                                 + (f" ({entry['error']})" if entry["error"] else ""))
+                    results.append(entry)
+
+                if not progressed:
+                    time.sleep(self.poll_interval)
+        finally:
+            for handle in handles:
+                if handle == original:
+                    continue
+                try:
+                    self.browser.switch_to.window(handle)
+                    self.browser.close()
+                except Exception:
+                    pass
+            self.browser.switch_to.window(original)
+        return results
@@ -0,0 +1,39 @@
+import types
+
+from Level1 import ADAPTIVE_FIELDS, BrowserAutomation
+from selector_stats import SelectorStats
+
+
+class FakeBackend:
+    def __init__(self, text):
+        self.text = text
+        self.selectors = []
+
+    def evaluate_candidates(self, selectors, max_chars, text_limit):
+        self.selectors = list(selectors)
+        return {"matches": [None] * len(selectors), "text": self.text}
+
+
+def make_automation(text):
+    automation = BrowserAutomation.__new__(BrowserAutomation)
+    automation.browser = types.SimpleNamespace(current_url="https://shop.example/item")
+    automation.backend = FakeBackend(text)
+    automation.selector_stats = SelectorStats(filename=None)
+    return automation
+
+
+def test_pattern_fallback_ignores_selector_wins():
+    automation = make_automation("Customers rated this 4.5 out of 5")
+    automation.selector_stats.record_win("shop.example", "rating", ".rating")
+
+    assert automation.try_adaptive_extraction("rating") == "4.5"
+    assert r'(\d+\.\d+|\d+) out of 5' in automation.selector_stats.wins["shop.example"]["rating:pattern"]
+
+
+def test_pattern_wins_are_not_used_as_selectors():
+    automation = make_automation("")
+    pattern = next(iter(ADAPTIVE_FIELDS["rating"]["patterns"]))
+    automation.selector_stats.record_win("shop.example", "rating", pattern, kind="pattern")
+
+    automation.try_adaptive_extraction("rating")
+    assert pattern not in automation.backend.selectors
@@ -0,0 +1,46 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from backends import CdpBackend
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append(command)
+        if command == "Runtime.evaluate":
+            return {"result": {"type": "string", "value": "<html><body>hi</body></html>"}}
+        return {}
+
+
+def test_cdp_page_html_is_a_single_round_trip():
+    browser = FakeBrowser()
+    backend = CdpBackend(browser)
+    browser.commands.clear()
+    assert backend.page_html() == "<html><body>hi</body></html>"
+    assert browser.commands == ["Runtime.evaluate"]
+
+
+class NodeBrowser(FakeBrowser):
+    """Evaluates Runtime.evaluate expressions in node, awaiting promises like awaitPromise does"""
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append(command)
+        if command != "Runtime.evaluate":
+            return {}
+        program = f"Promise.resolve({params['expression']}).then(v => console.log(JSON.stringify(v)))"
+        output = subprocess.run(["node", "-e", program], capture_output=True, text=True, check=True).stdout
+        return {"result": {"value": json.loads(output)}}
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_cdp_scripts_get_arguments_and_async_callback():
+    backend = CdpBackend(NodeBrowser())
+    assert backend.call_script("return arguments[0] + arguments[1].length;", 2, [1, 2, 3]) == 5
+    assert backend.call_async_script("var done = arguments[arguments.length - 1]; "
+                                     "var n = arguments[0]; setTimeout(function() { done(n * 2); }, 10);", 21) == 42
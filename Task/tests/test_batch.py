@@ -0,0 +1,19 @@
+from batch import read_jobs
+
+
+def test_read_jobs_skips_lines_that_are_not_objects(tmp_path):
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_text('{"type": "command", "command": "a"}\n[1, 2]\n42\n"text"\nnot json\n'
+                         '{"type": "command", "command": "b", "id": "x"}\n')
+    jobs = list(read_jobs(str(jobs_file)))
+    assert [job["command"] for job in jobs] == ["a", "b"]
+    assert [job["id"] for job in jobs] == [1, "x"]
+
+
+def test_supplied_job_code_is_dropped_unless_allowed(tmp_path):
+    from Level3 import _drop_supplied_code
+
+    jobs_file = tmp_path / "jobs.jsonl"
+    jobs_file.write_text('{"type": "command", "command": "a", "code": "import os"}\n')
+    assert "code" not in next(_drop_supplied_code(read_jobs(str(jobs_file))))
+    assert next(_drop_supplied_code(read_jobs(str(jobs_file)), allow_job_code=True))["code"] == "import os"
@@ -0,0 +1,29 @@
+from compaction import BoilerplateTracker, compact_content, dedupe_list_items
+
+
+def test_list_items_differing_only_in_numbers_survive():
+    items = ["- 128 GB: Rs 79,900", "- 256 GB: Rs 89,900", "- Step 1", "- Step 2"]
+    assert dedupe_list_items(items) == items
+
+
+def test_list_items_differing_in_case_and_spacing_are_dropped():
+    items = ["- Great phone, value for money", "- great  phone, value for money", "- Great phone, value for money!"]
+    assert dedupe_list_items(items) == items[:1]
+
+
+def test_content_shared_by_the_first_pages_of_a_site_is_kept():
+    tracker = BoilerplateTracker()
+    pages = [(f"https://shop.example/p/{index}", f"Warranty is 12 months.\n\nProduct {index}") for index in range(2)]
+    for url, content in pages:
+        tracker.observe(url, content)
+    text, stats = compact_content(pages[1][1], pages[1][0], tracker)
+    assert "Warranty is 12 months." in text
+    assert stats["boilerplate_removed"] == 0
+
+
+def test_blocks_on_most_pages_become_boilerplate():
+    tracker = BoilerplateTracker()
+    for index in range(6):
+        tracker.observe(f"https://shop.example/p/{index}", f"Home - Offers - Help\n\nProduct {index}")
+    text, _ = compact_content("Home - Offers - Help\n\nProduct 5", "https://shop.example/p/5", tracker)
+    assert text == "Product 5"
@@ -0,0 +1,113 @@
+import base64
+import json
+import time
+
+from crawler import BloomFilter, CrawlFrontier, Crawler
+
+
+def test_frontier_does_not_add_its_own_delay():
+    frontier = CrawlFrontier()
+    frontier.push("https://example.com/a")
+    frontier.push("https://example.com/b")
+    url, _ = frontier.pop()
+    frontier.done(url)
+    start = time.monotonic()
+    assert frontier.pop()[0] == "https://example.com/b"
+    assert time.monotonic() - start < 0.5
+
+
+def test_frontier_limits_concurrency_per_domain():
+    frontier = CrawlFrontier(max_per_domain=1)
+    for url in ("https://a.example/1", "https://a.example/2", "https://b.example/1"):
+        frontier.push(url)
+    first, _ = frontier.pop()
+    second, _ = frontier.pop()
+    assert {first, second} == {"https://a.example/1", "https://b.example/1"}
+
+
+class FakeAutomation:
+    """Serves https://site.example/N pages, each linking to the next one"""
+
+    def __init__(self):
+        self.current_url = None
+        self.soup = None
+        self.structured_data = {}
+        self.content = ""
+
+    def navigate(self, url):
+        self.current_url = url
+
+    def wait_for_page_load(self):
+        pass
+
+    def handle_popups(self):
+        pass
+
+    def extract_current_page_content(self):
+        # Like streaming extraction: no soup, links only in structured_data
+        number = int(self.current_url.rsplit("/", 1)[1])
+        self.structured_data = {"title": str(number), "links": [f"/{number + 1}"]}
+        self.content = f"page {number}"
+        return True
+
+
+def make_crawler(tmp_path, **kwargs):
+    return Crawler(FakeAutomation(), output_file=str(tmp_path / "out.jsonl"), max_depth=100,
+                   bloom_capacity=1000, **kwargs)
+
+
+def test_resumed_crawl_gets_a_fresh_page_budget(tmp_path):
+    crawler = make_crawler(tmp_path, max_pages=3, checkpoint_every=2)
+    crawler.add_seeds(["https://site.example/0"])
+    assert crawler.run()["pages_done"] == 3
+
+    resumed = make_crawler(tmp_path, max_pages=3, checkpoint_every=2)
+    assert resumed.pages_done == 3
+    assert resumed.run()["pages_done"] == 6
+    titles = [json.loads(line)["title"] for line in (tmp_path / "out.jsonl").read_text().splitlines()]
+    assert titles == [str(number) for number in range(6)]
+
+
+def test_bloom_filter_is_checkpointed_as_binary_sidecar(tmp_path):
+    crawler = make_crawler(tmp_path, max_pages=2)
+    crawler.add_seeds(["https://site.example/0"])
+    crawler.run()
+
+    state = json.loads((tmp_path / "out.jsonl.state.json").read_text())
+    assert "bits" not in state["frontier"]["bloom"]
+    bits = (tmp_path / "out.jsonl.state.json.bloom").read_bytes()
+    assert bits == bytes(crawler.frontier.seen.bits)
+
+    resumed = make_crawler(tmp_path, max_pages=2)
+    assert "https://site.example/1" in resumed.frontier.seen
+    assert "https://site.example/9" not in resumed.frontier.seen
+
+
+def test_old_checkpoints_with_embedded_bits_still_load():
+    bloom = BloomFilter(1000)
+    bloom.add("https://site.example/0")
+    data = dict(bloom.to_dict(), bits=base64.b64encode(bytes(bloom.bits)).decode("ascii"))
+    assert "https://site.example/0" in BloomFilter.from_dict(data)
+
+
+def test_records_after_the_last_checkpoint_are_not_duplicated_on_resume(tmp_path):
+    crawler = make_crawler(tmp_path, max_pages=3, checkpoint_every=1)
+    crawler.add_seeds(["https://site.example/0"])
+    checkpoint = crawler.checkpoint
+    saved = {}
+
+    def first_checkpoint_only():
+        checkpoint()
+        if not saved:
+            saved.update({path: path.read_bytes() for path in tmp_path.glob("out.jsonl.state.json*")})
+
+    crawler.checkpoint = first_checkpoint_only
+    crawler.run()
+    # Simulate a crash right after page 2: only the checkpoint taken after page 0 survives
+    for path, data in saved.items():
+        path.write_bytes(data)
+
+    resumed = make_crawler(tmp_path, max_pages=3)
+    resumed.run()
+    titles = [json.loads(line)["title"] for line in (tmp_path / "out.jsonl").read_text().splitlines()]
+    assert titles == ["0", "1", "2", "3"]
@@ -0,0 +1,16 @@
+from intent import IntentRouter
+
+
+def test_out_of_domain_input_is_not_confident():
+    router = IntentRouter()
+    for text in ("hello", "hello there", "thanks"):
+        assert not router.is_confident(router.classify(text)), text
+
+
+def test_clear_commands_are_routed_confidently():
+    router = IntentRouter()
+    for text, intent in (("go to flipkart.com", "automate"), ("scrape the page content now", "extract"),
+                         ("what's the battery life", "query")):
+        result = router.classify(text)
+        assert result["intent"] == intent
+        assert router.is_confident(result)
@@ -0,0 +1,27 @@
+from fields import classify_field
+from json_capture import candidate_keys, match_fields
+
+PAGE = "https://www.shop.example/item/1"
+PRODUCT = ("https://api.shop.example/v1/product/1",
+           {"product": {"name": "Phone", "price": {"amount": 199.0}, "ratingCount": 42}})
+ANALYTICS = ("https://collector.tracker.example/config", {"name": "site-config", "price": 0})
+
+
+def test_candidate_keys_use_the_shared_field_table():
+    assert classify_field("ratingCount") == "review_count"
+    assert classify_field("num_ratings") == "review_count"
+    assert "reviewcount" in candidate_keys("num_ratings")
+    assert "sellingprice" in candidate_keys("Price")
+
+
+def test_payloads_from_other_sites_are_ignored():
+    matches = match_fields([ANALYTICS, PRODUCT], ["title", "price"], page_url=PAGE)
+    assert matches["title"] == {"value": "Phone", "source": PRODUCT[0], "path": "product.name"}
+    assert matches["price"]["value"] == 199.0
+
+
+def test_payload_needs_several_requested_fields():
+    config = ("https://www.shop.example/config.json", {"name": "storefront"})
+    assert match_fields([config], ["title", "price", "rating"], page_url=PAGE) == {}
+    assert match_fields([config], ["title"], page_url=PAGE)["title"]["value"] == "storefront"
+    assert match_fields([PRODUCT], ["title", "price", "review_count"], page_url=PAGE)["review_count"]["value"] == 42
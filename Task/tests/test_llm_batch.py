@@ -0,0 +1,85 @@
+import datetime
+import types
+
+from Level3 import BrowserAutomationWithScraper, opens_own_page
+from llm_batch import run_message_batch
+from model_router import ModelRouter
+
+
+class FakeMessages:
+    def create(self, **params):
+        command = params["messages"][-1]["content"]
+        code = "print('ok')" if "good" in command else "print('broken'"
+        return types.SimpleNamespace(content=[types.SimpleNamespace(text=code)], usage=None)
+
+
+def make_automation():
+    automation = BrowserAutomationWithScraper.__new__(BrowserAutomationWithScraper)
+    automation.browser = None
+    automation.session_identity = None
+    automation.session_restored = False
+    automation.conversation_context = {"visited_urls": [], "last_command": None,
+                                       "session_start": datetime.datetime.now()}
+    automation.client = types.SimpleNamespace(messages=FakeMessages())
+    automation.model_router = ModelRouter(stats_file=None)
+    return automation
+
+
+def test_batched_generations_are_recorded_in_router_stats():
+    automation = make_automation()
+    codes = automation.get_code_for_commands(["good one", "bad one", "good two"], use_batch_api=False)
+    assert codes[0] == "print('ok')"
+
+    stats = automation.model_router.stats["code"]
+    assert sum(entry["calls"] for entry in stats.values()) == 3
+    assert sum(entry["successes"] for entry in stats.values()) == 2
+
+
+class FailingResultsBatches:
+    """Batches API whose result stream breaks after the first entry"""
+
+    def create(self, requests):
+        return types.SimpleNamespace(id="batch-1", processing_status="ended")
+
+    def results(self, batch_id):
+        message = types.SimpleNamespace(content=[types.SimpleNamespace(text="print('ok')")], usage=None)
+        yield types.SimpleNamespace(custom_id="command-0", result=types.SimpleNamespace(type="succeeded",
+                                                                                         message=message))
+        raise ConnectionError("stream closed")
+
+
+class CountingMessages(FakeMessages):
+    def __init__(self):
+        self.batches = FailingResultsBatches()
+        self.calls = 0
+
+    def create(self, **params):
+        self.calls += 1
+        return super().create(**params)
+
+
+def test_failed_batch_collection_is_not_resent():
+    client = types.SimpleNamespace(messages=CountingMessages())
+    requests = [{"custom_id": f"command-{index}", "params": {"model": "m", "messages": []}} for index in range(3)]
+    reported = []
+    messages = run_message_batch(client, requests, poll_interval=0,
+                                 on_result=lambda custom_id, message, latency: reported.append((custom_id, message)))
+    assert client.messages.calls == 0
+    assert messages["command-0"] is not None and messages["command-1"] is None
+    assert sorted(custom_id for custom_id, _ in reported) == ["command-0", "command-1", "command-2"]
+    assert [custom_id for custom_id, message in reported if message is None] == ["command-1", "command-2"]
+
+
+def test_prompt_cache_marked_only_above_model_minimum():
+    router = ModelRouter(stats_file=None)
+    params = {"system": [{"type": "text", "text": "x" * 4000}, {"type": "text", "text": "y" * 3000}]}
+    haiku = router.with_prompt_cache(params, "claude-3-5-haiku-20241022")
+    assert all("cache_control" not in block for block in haiku["system"])
+    sonnet = router.with_prompt_cache(params, "claude-3-5-sonnet-20241022")
+    assert ["cache_control" in block for block in sonnet["system"]] == [False, True]
+
+
+def test_only_commands_naming_a_site_are_pregenerated():
+    assert opens_own_page("go to https://github.com/x/y and star it")
+    assert opens_own_page("search for phones on amazon.in")
+    assert not opens_own_page("click the first result")
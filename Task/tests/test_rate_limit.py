@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from rate_limit import DomainRateLimiter, RobotsCache, TokenBucket, positive_rate
+
+
+def test_burst_is_available_immediately_then_rate_applies():
+    bucket = TokenBucket(rate=20, burst=3)
+    assert [bucket.acquire(timeout=0) for _ in range(3)] == [pytest.approx(0, abs=0.01)] * 3
+    assert bucket.acquire(timeout=0) is None
+    start = time.monotonic()
+    assert bucket.acquire() is not None
+    assert 0.03 <= time.monotonic() - start <= 0.5
+
+
+def test_acquire_respects_timeout():
+    bucket = TokenBucket(rate=1, burst=1)
+    bucket.acquire()
+    assert bucket.acquire(timeout=0.1) is None
+
+
+@pytest.mark.parametrize("rate", [0, -1, "0", float("nan")])
+def test_non_positive_rates_are_rejected(rate):
+    with pytest.raises(ValueError):
+        positive_rate(rate)
+    with pytest.raises(ValueError):
+        TokenBucket(rate)
+    limiter = DomainRateLimiter(respect_robots=False)
+    with pytest.raises(ValueError):
+        limiter.configure(default_rate=rate)
+    with pytest.raises(ValueError):
+        limiter.set_rate("example.com", rate)
+
+
+def test_idle_buckets_are_evicted_when_full():
+    limiter = DomainRateLimiter(default_rate=1000, burst=1, respect_robots=False, max_buckets=5)
+    for index in range(50):
+        limiter.acquire(f"https://host{index}.example.com/")
+        time.sleep(0.002)
+    assert len(limiter.buckets) <= 5
+
+
+def test_robots_cache_is_bounded(monkeypatch):
+    def unreachable(*args, **kwargs):
+        raise OSError("offline")
+
+    monkeypatch.setattr("urllib.request.urlopen", unreachable)
+    cache = RobotsCache(max_entries=3)
+    for index in range(10):
+        assert cache.max_rate(f"https://host{index}.example.com/page") is None
+    assert len(cache.parsers) <= 3
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from model_router import ModelRouter
+from resilience import (CircuitBreaker, CircuitOpenError, RetryPolicy, breakers, call_with_retry,
+                        is_transient_navigation_error)
+from tracing import tracer
+
+
+class WebDriverException(Exception):
+    """Stands in for selenium's exception, which resilience matches by class name"""
+
+
+class TimeoutException(WebDriverException):
+    pass
+
+
+@pytest.mark.parametrize("error, transient", [
+    (TimeoutException("Message: timeout: Timed out receiving message from renderer"), True),
+    (WebDriverException("Message: unknown error: net::ERR_CONNECTION_RESET"), True),
+    (WebDriverException("Message: unknown error: net::ERR_CONNECTION_REFUSED"), True),
+    (ConnectionResetError("Connection reset by peer"), True),
+    (WebDriverException("Message: unknown error: net::ERR_NAME_NOT_RESOLVED"), False),
+    (WebDriverException("Message: invalid argument"), False),
+    (ValueError("timeout"), False),
+])
+def test_navigation_errors_are_retried_only_when_transient(error, transient):
+    assert is_transient_navigation_error(error) is transient
+
+
+def test_non_retryable_error_releases_half_open_trial_without_closing():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+
+    def fail():
+        raise ValueError("bug in the caller")
+
+    policy = RetryPolicy(attempts=3, retryable=lambda e: False)
+    with pytest.raises(ValueError):
+        call_with_retry(fail, policy, breaker)
+    assert breaker.opened_at is not None
+    assert breaker.failures == 1
+    # The trial slot is free again, so the next call can still probe the endpoint
+    assert breaker.allow()
+
+
+def test_successful_trial_closes_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert call_with_retry(lambda: "ok", RetryPolicy(), breaker) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_retries_are_counted_on_the_current_span():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise TimeoutException("timed out")
+        return "ok"
+
+    policy = RetryPolicy(attempts=3, base_delay=0, retryable=lambda e: True)
+    with tracer.span("wait_for_selector") as span:
+        assert call_with_retry(flaky, policy) == "ok"
+    assert span.attributes["retries"] == 2
+
+
+def test_circuit_rejections_are_not_recorded_as_model_failures():
+    router = ModelRouter(stats_file=None)
+    model = router.choose("code")
+    breaker = breakers.get(f"llm:{model}")
+    breaker.opened_at = time.monotonic()
+    try:
+        with pytest.raises(CircuitOpenError):
+            router.call(object(), "code", {"messages": []})
+    finally:
+        breaker.record_success()
+    assert router.stats.get("code", {}).get(model) is None
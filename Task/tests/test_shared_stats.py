@@ -0,0 +1,34 @@
+import json
+import threading
+
+from model_router import ModelRouter
+from selector_stats import SelectorHealth, SelectorStats
+
+
+def test_workers_share_one_stats_object_per_file(tmp_path):
+    stats_file = str(tmp_path / "selector_stats.json")
+    workers = [SelectorStats.shared(stats_file) for _ in range(4)]
+    assert all(stats is workers[0] for stats in workers)
+    assert SelectorHealth.shared(str(tmp_path / "health.json")) is SelectorHealth.shared(str(tmp_path / "health.json"))
+
+    def work(index):
+        stats = SelectorStats.shared(stats_file)
+        for _ in range(50):
+            stats.record_win("example.com", "price", f"selector-{index}")
+        stats.save()
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(stats_file, encoding="utf-8") as f:
+        wins = json.load(f)["wins"]["example.com"]["price:selector"]
+    assert wins == {f"selector-{index}": 50 for index in range(4)}
+
+
+def test_model_router_shared_per_stats_file(tmp_path):
+    stats_file = str(tmp_path / "model_stats.json")
+    assert ModelRouter.shared(stats_file) is ModelRouter.shared(stats_file)
+    assert ModelRouter.shared(stats_file) is not ModelRouter.shared(str(tmp_path / "other.json"))
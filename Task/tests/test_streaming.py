@@ -0,0 +1,107 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+from page_scripts import PAGE_CHUNK_CLEANUP_SCRIPT, PAGE_CHUNK_SCRIPT
+from streaming import iter_content_events, iter_page_chunks
+
+PAGE = "<html><body>" + "".join(
+    f"<p>Paragraph {index} \U0001F600 café \U0001F4E6\U0001F4E6</p>" for index in range(200)
+) + "</body></html>"
+
+
+class NodeBrowser:
+    """Runs the page scripts in node against a fake document, so JS string semantics are real"""
+
+    def __init__(self, html):
+        self.html = html
+        self.window = {}
+
+    def execute_script(self, script, *args):
+        program = (
+            "var window = " + json.dumps(self.window) + ";"
+            "var document = {documentElement: {outerHTML: " + json.dumps(self.html) + "}};"
+            "var arguments_ = " + json.dumps(list(args)) + ";"
+            "var result = (function () { var arguments = arguments_;" + script + "})();"
+            "process.stdout.write(JSON.stringify({result: result === undefined ? null : result,"
+            " window: window}));"
+        )
+        output = json.loads(subprocess.run(["node", "-e", program], capture_output=True, check=True,
+                                           text=True, encoding="utf-8").stdout)
+        self.window = output["window"]
+        return output["result"]
+
+
+class FakeBrowser:
+    """Python model of PAGE_CHUNK_SCRIPT: offsets in UTF-16 code units, chunks never split a surrogate pair"""
+
+    def __init__(self, html):
+        self.units = html.encode("utf-16-le")
+        self.cleaned_up = False
+
+    def execute_script(self, script, *args):
+        if script == PAGE_CHUNK_CLEANUP_SCRIPT:
+            self.cleaned_up = True
+            return None
+        offset, length = args
+        total = len(self.units) // 2
+        if offset >= total:
+            return None
+        end = min(offset + length, total)
+        last = int.from_bytes(self.units[2 * end - 2:2 * end], "little")
+        if end < total and end - offset > 1 and 0xD800 <= last <= 0xDBFF:
+            end -= 1
+        return [self.units[2 * offset:2 * end].decode("utf-16-le"), end]
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1000])
+def test_chunks_reassemble_pages_with_astral_characters(chunk_size):
+    browser = FakeBrowser(PAGE)
+    assert "".join(iter_page_chunks(browser, chunk_size)) == PAGE
+    assert browser.cleaned_up
+
+
+def test_events_are_not_duplicated_across_chunks():
+    events = list(iter_content_events(iter_page_chunks(FakeBrowser(PAGE), 50)))
+    assert len([event for event in events if event[0] == "paragraph"]) == 200
+
+
+def test_abandoned_iteration_cleans_up():
+    browser = FakeBrowser(PAGE)
+    chunks = iter_page_chunks(browser, 10)
+    next(chunks)
+    chunks.close()
+    assert browser.cleaned_up
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_page_chunk_script_in_javascript():
+    html = PAGE[:600]
+    browser = NodeBrowser(html)
+    assert "".join(iter_page_chunks(browser, 33)) == html
+    assert "__pageHtml" not in browser.window
+
+
+def test_nested_tables_keep_their_own_rows():
+    html = ("<table><tr><td>outer1<table><tr><td>i1</td><td>i2</td></tr></table></td><td>outer2</td></tr>"
+            "<tr><td>o3</td><td>o4</td></tr></table>")
+    tables = []
+    open_tables = []
+    for event in iter_content_events([html]):
+        if event[0] == "table_start":
+            open_tables.append([])
+        elif event[0] == "table_row":
+            open_tables[-1].append([cell[0] for cell in event[1]])
+        elif event[0] == "table_end":
+            tables.append(open_tables.pop())
+    assert tables[0] == [["i1", "i2"]]
+    assert [row[1] for row in tables[1]] == ["outer2", "o4"]
+    assert len(tables[1]) == 2
+
+
+def test_links_are_emitted_as_events():
+    html = '<p>See <a href="/next">next</a> and <a name="anchor">here</a></p><ul><li><a href="/b">b</a></li></ul>'
+    links = [event[1] for event in iter_content_events([html]) if event[0] == "link"]
+    assert links == ["/next", "/b"]
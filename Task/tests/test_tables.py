@@ -0,0 +1,44 @@
+from bs4 import BeautifulSoup
+
+from Level3 import BrowserAutomationWithScraper
+
+
+def table_frame(html):
+    # Table conversion needs no browser, so skip __init__
+    automation = BrowserAutomationWithScraper.__new__(BrowserAutomationWithScraper)
+    return automation._table_to_frame(BeautifulSoup(html, "html.parser").find("table"))
+
+
+def test_rowspan_does_not_overwrite_following_cells():
+    frame = table_frame("""
+        <table>
+          <tr><th>Group</th><th>Item</th><th>Qty</th></tr>
+          <tr><td rowspan="2">A</td><td>x</td><td>1</td></tr>
+          <tr><td>y</td><td>2</td></tr>
+          <tr><td>B</td><td>z</td><td>9</td></tr>
+        </table>""")
+    assert list(frame.columns) == ["Group", "Item", "Qty"]
+    assert frame.values.tolist() == [["A", "x", 1], ["A", "y", 2], ["B", "z", 9]]
+
+
+def test_rowspan_in_middle_column():
+    frame = table_frame("""
+        <table>
+          <tr><th>Name</th><th>Cat</th><th>Qty</th></tr>
+          <tr><td>a</td><td rowspan="2">B</td><td>1</td></tr>
+          <tr><td>b</td><td>9</td></tr>
+        </table>""")
+    assert frame.values.tolist() == [["a", "B", 1], ["b", "B", 9]]
+
+
+def test_multi_row_header_with_rowspan_and_colspan():
+    frame = table_frame("""
+        <table>
+          <thead>
+            <tr><th rowspan="2">Name</th><th colspan="2">Price</th></tr>
+            <tr><th>Old</th><th>New</th></tr>
+          </thead>
+          <tr><td>Phone</td><td>100</td><td>90</td></tr>
+        </table>""")
+    assert list(frame.columns) == ["Name", "Price / Old", "Price / New"]
+    assert frame.values.tolist() == [["Phone", 100, 90]]
@@ -0,0 +1,178 @@
+import collections
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Span:
+    """A timed stage of a request, with attributes such as retries and payload sizes"""
+
+    def __init__(self, name, trace_id, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.attributes = dict(attributes or {})
+        self.children = []
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def duration(self):
+        """Duration in seconds (up to now if the span is still open)"""
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Collects nested spans per thread and exports finished traces"""
+
+    def __init__(self, max_traces=1000, enabled=True):
+        self.enabled = enabled
+        self.traces = collections.deque(maxlen=max_traces)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current_span(self):
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time a block as a span; nested spans on the same thread become children"""
+        if not self.enabled:
+            yield Span(name, None, attributes=attributes)
+            return
+
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        span = Span(name, trace_id, parent, attributes)
+        if parent:
+            parent.children.append(span)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            stack.pop()
+            if parent is None:
+                with self._lock:
+                    self.traces.append(span)
+
+    def record_llm_usage(self, response, model=None):
+        """Attach token usage from an Anthropic response to the current span"""
+        span = self.current_span()
+        usage = getattr(response, "usage", None)
+        if span is None or usage is None:
+            return
+        span.set("llm.model", model or getattr(response, "model", ""))
+        span.add("llm.input_tokens", getattr(usage, "input_tokens", 0) or 0)
+        span.add("llm.output_tokens", getattr(usage, "output_tokens", 0) or 0)
+        cached = getattr(usage, "cache_read_input_tokens", None)
+        if cached:
+            span.add("llm.cache_read_tokens", cached)
+
+    def export_otlp(self, filename):
+        """Write finished traces in OpenTelemetry (OTLP/JSON) format"""
+        with self._lock:
+            roots = list(self.traces)
+        spans = []
+        for root in roots:
+            for span in root.walk():
+                item = {
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(span.start_ns),
+                    "endTimeUnixNano": str(span.end_ns),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                }
+                if span.parent:
+                    item["parentSpanId"] = span.parent.span_id
+                spans.append(item)
+        document = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "browser-automation"}}]},
+                "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}]
+            }]
+        }
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        logging.info(f"Exported {len(roots)} traces ({len(spans)} spans) to {filename}")
+        return len(spans)
+
+    def flame_summary(self, root=None, width=40):
+        """Render a trace (default: the latest) as an indented flame summary"""
+        if root is None:
+            with self._lock:
+                if not self.traces:
+                    return "No traces recorded"
+                root = self.traces[-1]
+        total = root.duration or 1e-9
+        lines = [f"Trace {root.trace_id[:8]} - {root.name} ({root.duration:.3f}s)"]
+
+        def render(span, depth):
+            share = span.duration / total
+            bar = "#" * max(1, int(round(share * width)))
+            attributes = ", ".join(f"{k}={v}" for k, v in span.attributes.items())
+            status = " ERROR" if span.error else ""
+            lines.append(f"{'  ' * depth}{span.name:<{max(1, 32 - 2 * depth)}} {span.duration:8.3f}s "
+                         f"{share * 100:5.1f}% {bar}{status}" + (f"  [{attributes}]" if attributes else ""))
+            for child in span.children:
+                render(child, depth + 1)
+
+        render(root, 0)
+        return "\n".join(lines)
+
+
+tracer = Tracer()
+
+
+def traced(name=None):
+    """Decorator that wraps a function call in a span on the shared tracer"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator